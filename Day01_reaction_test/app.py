@@ -1,12 +1,265 @@
-import time
+#!/usr/bin/env python3
+# Day01: 反応速度テスト（計測エンジン版）
+# 使い方例:
+#   python app.py               # 既定: 5回計測
+#   python app.py --trials 10   # 10回計測
+#   python app.py --seed 42     # 待ち時間を再現
+#   python calibrate.py         # 計測オーバーヘッドを測って calibration.json に保存
+import argparse
+import json
+import math
+import os
 import random
+import select
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import termios
+    import tty
+except ImportError:  # Windows など termios が無い環境
+    termios = None
+    tty = None
+
+QUIT_KEYS = (b"q", b"Q", b"\x1b", b"")  # q / Esc / 入力終了(EOF)で中断
+CALIBRATION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "calibration.json")
+
+
+# ---------------------------
+# ストリーミング統計（サンプルを保存しない）
+# ---------------------------
+class P2Quantile:
+    """P²アルゴリズムで分位点を逐次推定する（マーカー5個だけ保持）"""
+
+    def __init__(self, p):
+        self.p = p
+        self.q = []                     # マーカーの高さ
+        self.n = [0, 1, 2, 3, 4]        # マーカーの位置
+        self.np = [0, 2 * p, 4 * p, 2 + 2 * p, 4]  # 理想位置
+        self.dn = [0, p / 2, p, (1 + p) / 2, 1]     # 理想位置の増分
+
+    def add(self, x):
+        q = self.q
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+        # xが入る区間kを探してマーカーを更新
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            self.n[i] += 1
+        for i in range(5):
+            self.np[i] += self.dn[i]
+        # 内側3つのマーカーを放物線補間で調整
+        for i in range(1, 4):
+            d = self.np[i] - self.n[i]
+            if (d >= 1 and self.n[i + 1] - self.n[i] > 1) or (d <= -1 and self.n[i - 1] - self.n[i] < -1):
+                s = 1 if d > 0 else -1
+                qi = self._parabolic(i, s)
+                if not q[i - 1] < qi < q[i + 1]:
+                    qi = q[i] + s * (q[i + s] - q[i]) / (self.n[i + s] - self.n[i])
+                q[i] = qi
+                self.n[i] += s
+
+    def _parabolic(self, i, s):
+        q, n = self.q, self.n
+        return q[i] + s / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + s) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - s) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self):
+        if not self.q:
+            return math.nan
+        if len(self.q) < 5:
+            # 5件未満は並べ替え済みの値から最近傍で返す
+            return self.q[min(len(self.q) - 1, round(self.p * (len(self.q) - 1)))]
+        return self.q[2]
+
+
+class StreamStats:
+    """件数・最小・最大・平均・標準偏差（Welford法）と中央値/p95を逐次計算"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.median = P2Quantile(0.5)
+        self.p95 = P2Quantile(0.95)
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        self.median.add(x)
+        self.p95.add(x)
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "min": self.min,
+            "median": self.median.value(),
+            "p95": self.p95.value(),
+            "mean": self.mean,
+            "stddev": self.stddev,
+            "max": self.max,
+        }
+
+
+# ---------------------------
+# キー入力（生モード・ノンブロッキング）
+# ---------------------------
+@contextmanager
+def raw_keys(fd):
+    """端末を cbreak モードにして1キーずつ読めるようにする（終了時に必ず戻す）"""
+    if termios is None or not os.isatty(fd):
+        yield False
+        return
+    old = termios.tcgetattr(fd)
+    try:
+        tty.setcbreak(fd)  # 行バッファとエコーを無効化（Ctrl-Cは有効のまま）
+        yield True
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, old)
+
+
+def read_key(fd, timeout=None):
+    """キーが来るまで最大timeout秒待つ。来なければNone、入力終了なら空バイトを返す"""
+    ready, _, _ = select.select([fd], [], [], timeout)
+    if not ready:
+        return None
+    return os.read(fd, 1)
+
+
+def drain(fd):
+    """溜まっている入力を捨てる（フライング分や押しすぎ対策）"""
+    while read_key(fd, 0):
+        pass
+
+
+def wait_or_false_start(fd, seconds):
+    """seconds秒待つ。途中でキーが押されたらフライングとしてそのキーを返す"""
+    deadline = time.monotonic_ns() + int(seconds * 1e9)
+    while True:
+        left = deadline - time.monotonic_ns()
+        if left <= 0:
+            return None
+        key = read_key(fd, left / 1e9)
+        if key is not None:
+            return key
+
+
+# ---------------------------
+# 計測
+# ---------------------------
+def run_trial(fd, rng, offset_ns=0, wait=(2, 5)):
+    """1回計測する。戻り値は ("ok", ナノ秒) / ("false", None) / ("quit", None)"""
+    print("...", flush=True)
+    key = wait_or_false_start(fd, rng.uniform(*wait))
+    if key is not None:
+        drain(fd)
+        if key in QUIT_KEYS:
+            return "quit", None
+        print("フライング！ もう一度。", flush=True)
+        return "false", None
+
+    print("今だ！ キーを押して！", flush=True)
+    start = time.perf_counter_ns()
+    key = read_key(fd)
+    end = time.perf_counter_ns()
+    drain(fd)
+    if key is None or key in QUIT_KEYS:
+        return "quit", None
+    # 計測オーバーヘッド（キャリブレーション値）を差し引く
+    return "ok", max(0, end - start - offset_ns)
+
+
+def load_offset_ms(path=CALIBRATION_PATH):
+    """calibrate.py が保存したオフセット(ms)を読む。無ければ0"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return float(json.load(f)["offset_ms"])
+    except (OSError, ValueError, KeyError):
+        return 0.0
+
+
+def print_summary(stats, false_starts):
+    print("\n===== 結果 =====")
+    if not stats.count:
+        print("有効な計測がありませんでした。")
+    else:
+        s = stats.summary()
+        print(f"回数: {s['count']}  フライング: {false_starts}")
+        print(f"最速: {s['min']:.3f} 秒  中央値: {s['median']:.3f} 秒  p95: {s['p95']:.3f} 秒")
+        print(f"平均: {s['mean']:.3f} 秒  標準偏差: {s['stddev']:.3f} 秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Day01: 反応速度テスト")
+    parser.add_argument("--trials", type=int, default=5, help="計測回数（フライングは数えない）")
+    parser.add_argument("--seed", type=int, default=None, help="待ち時間の乱数シード")
+    parser.add_argument("--offset-ms", type=float, default=None,
+                        help="計測オーバーヘッドとして差し引くミリ秒（既定: calibration.json の値）")
+    parser.add_argument("--wait", type=float, nargs=2, default=[2, 5], metavar=("MIN", "MAX"),
+                        help="合図までの待ち時間の範囲（秒）")
+    parser.add_argument("--ns", action="store_true", help="各回の結果をナノ秒でも表示")
+    args = parser.parse_args()
+
+    if args.trials < 1:
+        print("--trials は1以上を指定してください。")
+        return
+
+    rng = random.Random(args.seed)
+    offset_ms = load_offset_ms() if args.offset_ms is None else args.offset_ms
+    offset_ns = int(offset_ms * 1e6)
+    fd = sys.stdin.fileno()
+    stats = StreamStats()
+    false_starts = 0
+
+    with raw_keys(fd) as raw:
+        # cbreakへの切り替えで先行入力は捨てられるので、案内は切り替え後に出す
+        print("準備はいい？ 何かキーを押すとスタート！（q/Escで終了）", flush=True)
+        if not raw:
+            print("(端末ではないため行入力モードで計測します)", flush=True)
+        if offset_ns:
+            print(f"(計測オーバーヘッド {offset_ms:.3f} ms を差し引きます)", flush=True)
+        if read_key(fd) in QUIT_KEYS:
+            return
+        drain(fd)
+        while stats.count < args.trials:
+            print(f"\n--- Trial {stats.count + 1}/{args.trials} ---", flush=True)
+            result, ns = run_trial(fd, rng, offset_ns, args.wait)
+            if result == "quit":
+                break
+            if result == "false":
+                false_starts += 1
+                continue
+            sec = ns / 1e9
+            stats.add(sec)
+            extra = f" ({ns} ns)" if args.ns else ""
+            print(f"反応速度: {sec:.3f} 秒{extra}", flush=True)
+
+    print_summary(stats, false_starts)
+
 
-print("準備はいい？ Enterキーを押すとスタート！")
-input()
-print("...")
-time.sleep(random.uniform(2,5))
-print("今だ！ Enterキーを押して！")
-start = time.time()
-input()
-end = time.time()
-print(f"反応速度: {end - start:.3f} 秒")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# Day01: 計測オーバーヘッドのキャリブレーション / ベンチマーク
+# app.py を疑似端末(pty)の中で動かし、「今だ！」を見てから決まった時間後に
+# 自動でキーを押す。表示された反応時間と実際の待ち時間の差が「計測そのものの遅れ」。
+# 使い方例:
+#   python calibrate.py                        # 2000回測って calibration.json に保存
+#   python calibrate.py --trials 5000 --json   # 結果をJSONで出力
+#   python calibrate.py --max-p95-us 500       # p95が500µsを超えたら終了コード1（CI用）
+import argparse
+import json
+import os
+import re
+import select
+import subprocess
+import sys
+import time
+
+from app import CALIBRATION_PATH, StreamStats
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+START_PROMPT = re.compile("スタート".encode())
+GO_PROMPT = re.compile("今だ！".encode())
+RESULT_RE = re.compile(rb"\((\d+) ns\)")
+
+
+class PtyApp:
+    """疑似端末の向こうで app.py を動かし、出力を読んだりキーを送ったりする"""
+
+    def __init__(self, args):
+        self.master, slave = os.openpty()
+        self.proc = subprocess.Popen(
+            [sys.executable, APP] + args,
+            stdin=slave, stdout=slave, stderr=slave,
+            close_fds=True, start_new_session=True,
+        )
+        os.close(slave)
+        self.buf = b""
+        self.read_at = 0
+
+    def expect(self, pattern, timeout=30.0):
+        """patternが出力に現れるまで読む。見つかったらマッチを返し、その手前までを捨てる"""
+        deadline = time.monotonic() + timeout
+        while True:
+            m = pattern.search(self.buf)
+            if m:
+                self.buf = self.buf[m.end():]
+                return m
+            left = deadline - time.monotonic()
+            if left <= 0:
+                raise TimeoutError(f"出力待ちがタイムアウトしました: {pattern!r}")
+            ready, _, _ = select.select([self.master], [], [], left)
+            if not ready:
+                continue
+            try:
+                data = os.read(self.master, 4096)
+            except OSError:  # 子プロセス終了時のEIO
+                data = b""
+            if not data:
+                raise EOFError("app.py が終了しました")
+            self.read_at = time.perf_counter_ns()
+            self.buf += data
+
+    def press(self, key=b"k"):
+        os.write(self.master, key)
+        return time.perf_counter_ns()
+
+    def close(self):
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+        os.close(self.master)
+
+
+def sleep_until(t_ns):
+    """t_ns(perf_counter_ns)まで待つ。最後の少しはスピンして誤差を減らす"""
+    left = t_ns - time.perf_counter_ns()
+    if left > 2_000_000:
+        time.sleep((left - 1_000_000) / 1e9)
+    while time.perf_counter_ns() < t_ns:
+        pass
+
+
+def calibrate(trials, delay_ms, seed=0):
+    """trials回測って、計測オーバーヘッド(ns)のStreamStatsを返す"""
+    app = PtyApp(["--trials", str(trials), "--seed", str(seed), "--offset-ms", "0",
+                  "--wait", "0.001", "0.003", "--ns"])
+    stats = StreamStats()
+    try:
+        app.expect(START_PROMPT)
+        app.press(b" ")
+        for _ in range(trials):
+            app.expect(GO_PROMPT)
+            seen = app.read_at  # 合図を読み取った時刻
+            sleep_until(seen + int(delay_ms * 1e6))
+            pressed = app.press()
+            m = app.expect(RESULT_RE)
+            measured = int(m.group(1))
+            # 表示された時間 - 本当の「反応」時間 = 計測のオーバーヘッド
+            stats.add(measured - (pressed - seen))
+    finally:
+        app.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Day01: 計測オーバーヘッドのキャリブレーション")
+    parser.add_argument("--trials", type=int, default=2000, help="計測回数")
+    parser.add_argument("--delay-ms", type=float, default=5.0, help="合図からキーを押すまでの時間（ms）")
+    parser.add_argument("--seed", type=int, default=0, help="待ち時間の乱数シード")
+    parser.add_argument("--output", default=CALIBRATION_PATH, help="オフセットの保存先（空なら保存しない）")
+    parser.add_argument("--json", action="store_true", help="結果をJSONで出力")
+    parser.add_argument("--max-median-us", type=float, default=None, help="中央値の上限（超えたら終了コード1）")
+    parser.add_argument("--max-p95-us", type=float, default=None, help="p95の上限（超えたら終了コード1）")
+    args = parser.parse_args()
+
+    if args.trials < 1:
+        print("--trials は1以上を指定してください。")
+        return 2
+
+    start = time.perf_counter()
+    stats = calibrate(args.trials, args.delay_ms, args.seed)
+    elapsed = time.perf_counter() - start
+    s = stats.summary()
+    result = {
+        "trials": s["count"],
+        "delay_ms": args.delay_ms,
+        "elapsed_sec": round(elapsed, 3),
+        "overhead_us": {k: round(v / 1e3, 3) for k, v in s.items() if k != "count"},
+        "offset_ms": round(s["median"] / 1e6, 6),
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False))
+    else:
+        o = result["overhead_us"]
+        print(f"計測回数: {result['trials']}（{elapsed:.1f} 秒）")
+        print(f"オーバーヘッド[µs] 最小: {o['min']:.1f}  中央値: {o['median']:.1f}  p95: {o['p95']:.1f}"
+              f"  平均: {o['mean']:.1f}  標準偏差: {o['stddev']:.1f}  最大: {o['max']:.1f}")
+        if args.output:
+            print(f"オフセット {result['offset_ms']:.3f} ms を {args.output} に保存しました。")
+
+    failed = []
+    if args.max_median_us is not None and result["overhead_us"]["median"] > args.max_median_us:
+        failed.append(f"median {result['overhead_us']['median']} > {args.max_median_us}")
+    if args.max_p95_us is not None and result["overhead_us"]["p95"] > args.max_p95_us:
+        failed.append(f"p95 {result['overhead_us']['p95']} > {args.max_p95_us}")
+    if failed:
+        print("しきい値超過: " + ", ".join(failed), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
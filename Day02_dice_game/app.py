@@ -6,13 +6,19 @@
 #   python app.py --no-critical    # クリティカル無効
 #   python app.py --draw give      # 引き分けは両者に1点
 #   python app.py --name "Raiki"   # プレイヤー名
+#   python app.py --simulate 10000000            # 1000万試合を自動で対戦して集計
+#   python app.py --simulate 1000000 --all-rules # 全ルールの組み合わせを比較
+#   python app.py --solve --best 5               # 勝率と期待ラウンド数の厳密解（分数）
+#   python app.py stats                          # logs/dice_log.csv の集計（追記分だけ読む）
+#   python app.py tournament --players A B C     # 複数プレイヤーの総当たり戦（並列）
 
 import argparse
-import csv
-import os
 import random
+import sys
 from datetime import datetime
 
+from logsink import open_sink
+
 # ダイスのアスキーアート
 DICE_ART = {
     1: ["+-------+",
@@ -57,22 +63,17 @@ def print_dice(player_roll, cpu_roll, player_name="You", cpu_name="CPU"):
         print(f"{l}   {r}")
     print(f"{player_name}: {player_roll}   {cpu_name}: {cpu_roll}")
 
-#　対戦結果の記録
-def log_result(path, row):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    file_exists = os.path.exists(path)
-    with open(path, "a", newline="", encoding="utf-8-sig") as f:
-        w = csv.writer(f)
-        if not file_exists:
-            w.writerow(["timestamp","player","cpu","winner","player_point","cpu_point","rule"])
-        w.writerow(row)
-
-#　１ラウンド対戦する
-def play_round(args, player_name="You", cpu_name="CPU"):
-    input("Enterキーでサイコロを振る…")
-    player = random.randint(1, 6)
-    cpu = random.randint(1, 6)
-    print_dice(player, cpu, player_name, cpu_name)
+#　１ラウンド対戦する（結果は log に1行渡す。書き込みは logsink がまとめて行う）
+def play_round(args, log, player_name="You", cpu_name="CPU"):
+    # 引き分けのリロールは再帰せずループで振り直す
+    while True:
+        input("Enterキーでサイコロを振る…")
+        player = random.randint(1, 6)
+        cpu = random.randint(1, 6)
+        print_dice(player, cpu, player_name, cpu_name)
+        if player != cpu or args.draw != "reroll":
+            break
+        print("引き分け！リロールします。")
 
     # クリティカル計算
     p_point = 0
@@ -85,14 +86,10 @@ def play_round(args, player_name="You", cpu_name="CPU"):
         c_point = 1
         rule_note.append("lose")
     else:
-        # 引き分けの扱い
-        if args.draw == "reroll":
-            print("引き分け！リロールします。")
-            return play_round(args, player_name, cpu_name)
-        elif args.draw == "give":
-            p_point = 1
-            c_point = 1
-            rule_note.append("draw-give")
+        # 引き分けの扱い（give: 双方に1点）
+        p_point = 1
+        c_point = 1
+        rule_note.append("draw-give")
 
     if args.critical and player == 6 and p_point > 0:
         p_point += 1
@@ -113,15 +110,21 @@ def play_round(args, player_name="You", cpu_name="CPU"):
         print("→ 双方にポイント")
 
     # ログ
-    log_result(
-        path="logs/dice_log.csv",
-        row=[datetime.now().isoformat(timespec="seconds"),
-             player_name, cpu_name, winner, p_point, c_point, "|".join(rule_note)]
-    )
+    log.write([datetime.now().isoformat(timespec="seconds"),
+               player_name, cpu_name, winner, p_point, c_point, "|".join(rule_note)])
     return p_point, c_point
 
 #　プログラムのメイン機能
 def main():
+    if sys.argv[1:2] == ["stats"]:
+        import stats
+        stats.main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["tournament"]:
+        import tournament
+        tournament.main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(description="Day02: ダイス・デュエル")
     parser.add_argument("--best", type=int, default=3,
                         help="Best of N（奇数を推奨）。例: 3なら先取2、5なら先取3")
@@ -130,6 +133,18 @@ def main():
     parser.add_argument("--draw", choices=["reroll","give"], default="reroll",
                         help="引き分け時の処理: reroll(振り直し) / give(双方に1点)")
     parser.add_argument("--name", type=str, default="You", help="プレイヤー名")
+    parser.add_argument("--simulate", type=int, default=0, metavar="N",
+                        help="N試合をキー入力なしで自動対戦して集計する（NumPyが必要）")
+    parser.add_argument("--solve", action="store_true",
+                        help="勝率と期待ラウンド数を厳密に計算する（結果は cache/ に保存）")
+    parser.add_argument("--all-rules", action="store_true",
+                        help="--simulate / --solve 時にクリティカル×引き分けの全組み合わせを回す")
+    parser.add_argument("--seed", type=int, default=None, help="乱数シード（--simulate 用）")
+    parser.add_argument("--log", default="logs/dice_log.csv",
+                        help="ログの保存先（.bin で終わるとコンパクトなバイナリ形式）")
+    parser.add_argument("--log-max-kb", type=int, default=0,
+                        help="ログがこのサイズ(KB)を超えたら別名に退避して新しく始める（0で無効）")
+    parser.add_argument("--log-daily", action="store_true", help="日付が変わったらログを切り替える")
     args = parser.parse_args()
 
     if args.best < 1:
@@ -137,6 +152,23 @@ def main():
         return
     target = args.best // 2 + 1  # 先取ポイント
 
+    if args.solve:
+        import solver
+        solver.run(args.best, args.critical, args.draw,
+                   all_rules=args.all_rules, player_name=args.name)
+        return
+    if args.simulate > 0:
+        import simulate  # NumPyは自動対戦のときだけ読み込む
+        log = None
+        if args.log.endswith(".bin"):  # バイナリ指定のときだけ全ラウンドを書き出す
+            log = open_sink(args.log, player=args.name, cpu="CPU",
+                            max_bytes=args.log_max_kb * 1024, daily=args.log_daily)
+        simulate.run(args.simulate, args.best, args.critical, args.draw,
+                     seed=args.seed, all_rules=args.all_rules, player_name=args.name, log=log)
+        if log:
+            log.close()
+        return
+
     print("🎲 ダイス・デュエル（改良版）へようこそ！")
     print(f"- 先取: {target}（Best of {args.best}）")
     print(f"- クリティカル: {'有効' if args.critical else '無効'}")
@@ -147,13 +179,15 @@ def main():
     p_total = 0
     c_total = 0
     round_no = 1
-    while p_total < target and c_total < target:
-        print(f"\n--- Round {round_no} ---")
-        p, c = play_round(args, player_name=args.name, cpu_name="CPU")
-        p_total += p
-        c_total += c
-        print(f"[Score] {args.name}: {p_total}  CPU: {c_total}")
-        round_no += 1
+    with open_sink(args.log, player=args.name, cpu="CPU",
+                   max_bytes=args.log_max_kb * 1024, daily=args.log_daily) as log:
+        while p_total < target and c_total < target:
+            print(f"\n--- Round {round_no} ---")
+            p, c = play_round(args, log, player_name=args.name, cpu_name="CPU")
+            p_total += p
+            c_total += c
+            print(f"[Score] {args.name}: {p_total}  CPU: {c_total}")
+            round_no += 1
 
     print("\n===== 結果 =====")
     if p_total > c_total:
@@ -0,0 +1,224 @@
+# Day02: 対戦ログの書き込み（開きっぱなし + まとめ書き + ローテーション）
+# 1行ごとに open/close すると遅いので、セッション中はファイルを開いたままにして
+# 行をためておき、一定数・一定時間ごと、または終了時/シグナル受信時にまとめて書く。
+import atexit
+import csv
+import json
+import os
+import signal
+import time
+from datetime import datetime
+
+HEADER = ["timestamp", "player", "cpu", "winner", "player_point", "cpu_point", "rule"]
+
+# バイナリログの rule ビット
+RULE_BITS = {"win": 1, "lose": 2, "draw-give": 4, "critical+1": 8, "critical+1(cpu)": 16}
+WINNER_CODES = {"player": 0, "cpu": 1, "-": 2}
+BINARY_MAGIC = b"DICELOG1"
+BINARY_DTYPE = [("ts", "<i8"), ("winner", "u1"), ("player_point", "u1"), ("cpu_point", "u1"), ("rule", "u1")]
+
+
+class _Sink:
+    """ファイルを開いたまま行をため、まとめて書く共通部分"""
+
+    def __init__(self, path, batch_size=256, flush_interval=1.0, max_bytes=0, daily=False):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes    # 0ならサイズでのローテーションなし
+        self.daily = daily            # Trueなら日付が変わったらローテーション
+        self.buf = []
+        self.f = None
+        self.day = None
+        self.last_flush = time.monotonic()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._open()
+        _live.add(self)
+        _install_signal_handlers()
+
+    # --- サブクラスで実装 ---
+    def _open_file(self, fresh):
+        raise NotImplementedError
+
+    def _write_rows(self, rows):
+        raise NotImplementedError
+
+    # --- 共通 ---
+    def _open(self):
+        fresh = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self.f = self._open_file(fresh)
+        self.day = datetime.now().date()
+
+    def _rotated_name(self):
+        root, ext = os.path.splitext(self.path)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        name = f"{root}.{stamp}{ext}"
+        n = 1
+        while os.path.exists(name):
+            name = f"{root}.{stamp}-{n}{ext}"
+            n += 1
+        return name
+
+    def _maybe_rotate(self):
+        too_big = self.max_bytes and self.f.tell() >= self.max_bytes
+        new_day = self.daily and datetime.now().date() != self.day
+        if too_big or new_day:
+            self.f.close()
+            os.replace(self.path, self._rotated_name())
+            self._open()
+
+    def write(self, row):
+        """1行追加（すぐには書かない）"""
+        self.buf.append(row)
+        if len(self.buf) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.f is None:
+            return
+        if self.buf:
+            self._maybe_rotate()
+            self._write_rows(self.buf)
+            self.buf.clear()
+        self.f.flush()
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        if self.f is None:
+            return
+        self.flush()
+        self.f.close()
+        self.f = None
+        _live.discard(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvLogSink(_Sink):
+    """logs/dice_log.csv 形式（timestamp,player,cpu,winner,player_point,cpu_point,rule）"""
+
+    def _open_file(self, fresh):
+        f = open(self.path, "a", newline="", encoding="utf-8-sig")
+        self.writer = csv.writer(f)
+        if fresh:
+            self.writer.writerow(HEADER)
+        return f
+
+    def _write_rows(self, rows):
+        self.writer.writerows(rows)
+
+
+class BinaryLogSink(_Sink):
+    """大量の行向けの固定長バイナリ形式（1行8+4バイト）
+
+    ファイル先頭: b"DICELOG1" + 4バイト長 + JSON(プレイヤー名など)。続けて BINARY_DTYPE の行が並ぶ。
+    プレイヤー名やルール文字列は持たず、勝者コードと rule のビットで表す。
+    write_columns() に NumPy 配列を渡せば、シミュレーションの結果をそのまま流し込める。
+    """
+
+    def __init__(self, path, player="You", cpu="CPU", batch_size=65536, **kwargs):
+        self.meta = {"player": player, "cpu": cpu, "rule_bits": RULE_BITS, "winner_codes": WINNER_CODES}
+        super().__init__(path, batch_size=batch_size, **kwargs)
+
+    def _open_file(self, fresh):
+        f = open(self.path, "ab")
+        if fresh:
+            meta = json.dumps(self.meta, ensure_ascii=False).encode("utf-8")
+            f.write(BINARY_MAGIC + len(meta).to_bytes(4, "little") + meta)
+        return f
+
+    def write(self, row):
+        """CsvLogSink と同じ形の行も受け付ける（名前とルール文字列を数値に変換）"""
+        ts, player, cpu, winner, p_point, c_point, rule = row
+        code = WINNER_CODES["player"] if winner == player else WINNER_CODES["cpu"] if winner == cpu else WINNER_CODES["-"]
+        bits = sum(RULE_BITS[r] for r in rule.split("|") if r)
+        epoch = int(datetime.fromisoformat(ts).timestamp()) if isinstance(ts, str) else int(ts)
+        super().write((epoch, code, p_point, c_point, bits))
+
+    def _write_rows(self, rows):
+        import numpy as np
+
+        self.f.write(np.array(rows, dtype=BINARY_DTYPE).tobytes())
+
+    def write_columns(self, ts, winner, player_point, cpu_point, rule):
+        """列ごとの配列をまとめて書く（ため込まずに直接書く）"""
+        import numpy as np
+
+        self.flush()
+        self._maybe_rotate()
+        out = np.empty(len(winner), dtype=BINARY_DTYPE)
+        out["ts"], out["winner"], out["player_point"], out["cpu_point"], out["rule"] = (
+            ts, winner, player_point, cpu_point, rule)
+        self.f.write(out.tobytes())
+
+
+def read_binary(path):
+    """BinaryLogSink のファイルを (meta, NumPy構造化配列) で読む（メモリマップ）"""
+    import numpy as np
+
+    with open(path, "rb") as f:
+        head = f.read(len(BINARY_MAGIC) + 4)
+        if head[:len(BINARY_MAGIC)] != BINARY_MAGIC:
+            raise ValueError(f"{path} はダイスのバイナリログではありません。")
+        n = int.from_bytes(head[len(BINARY_MAGIC):], "little")
+        meta = json.loads(f.read(n).decode("utf-8"))
+    offset = len(BINARY_MAGIC) + 4 + n
+    if os.path.getsize(path) == offset:
+        return meta, np.empty(0, dtype=BINARY_DTYPE)
+    return meta, np.memmap(path, dtype=BINARY_DTYPE, mode="r", offset=offset)
+
+
+def open_sink(path, **kwargs):
+    """拡張子で形式を選ぶ（.bin ならバイナリ、それ以外はCSV）"""
+    if path.endswith(".bin"):
+        return BinaryLogSink(path, **kwargs)
+    kwargs.pop("player", None)
+    kwargs.pop("cpu", None)
+    return CsvLogSink(path, **kwargs)
+
+
+# ---------------------------
+# 終了時・シグナル受信時に書き残しを出す
+# ---------------------------
+_live = set()
+
+
+def _flush_all():
+    for sink in list(_live):
+        sink.close()
+
+
+def _on_signal(signum, frame):
+    _flush_all()
+    # 既定の動作（終了）に戻してから自分に送り直す
+    signal.signal(signum, signal.SIG_DFL)
+    os.kill(os.getpid(), signum)
+
+
+_handlers_installed = False
+
+
+def _install_signal_handlers():
+    """最初のシンクを作ったときに1回だけ、SIGTERM / SIGHUP で書き残しを出すようにする
+
+    import しただけでは何も変えない。呼び出し側がすでに自分のハンドラーを設定していれば、それは上書きしない。
+    """
+    global _handlers_installed
+    if _handlers_installed:
+        return
+    _handlers_installed = True
+    for sig in (getattr(signal, "SIGTERM", None), getattr(signal, "SIGHUP", None)):
+        if sig is None:
+            continue
+        try:
+            if signal.getsignal(sig) == signal.SIG_DFL:
+                signal.signal(sig, _on_signal)
+        except ValueError:  # メインスレッド以外からは設定できない（atexit だけに頼る）
+            pass
+
+
+atexit.register(_flush_all)
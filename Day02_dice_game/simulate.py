@@ -0,0 +1,191 @@
+# Day02: ダイス・デュエルの高速シミュレーション（NumPyでまとめて対戦）
+# app.py の --simulate から呼ばれる。単体でも使える:
+#   python simulate.py 10000000 --best 5 --draw give
+import argparse
+import time
+
+import numpy as np
+
+DRAW_RULES = ("reroll", "give")
+
+
+def target_of(best):
+    """Best of N の先取ポイント"""
+    return best // 2 + 1
+
+
+# 1試合の状態を int64 1つに詰める: [ラウンド数 | CPU点 | player点] 各21bit
+FIELD = 21
+OVER_BIT = 1 << (FIELD - 1)  # 点数欄はこのビットが立ったら先取に到達
+
+
+def outcome_table(critical, draw):
+    """36通りの出目(player*6+cpu)ごとの (player加点, cpu加点, 数えるか, 引き分けか, 各クリティカル) の表"""
+    p = np.repeat(np.arange(1, 7), 6)
+    c = np.tile(np.arange(1, 7), 6)
+    is_draw = p == c
+    p_pt = (p > c).astype(np.int64)
+    c_pt = (p < c).astype(np.int64)
+    if draw == "give":
+        p_pt += is_draw
+        c_pt += is_draw
+    p_crit = critical & (p == 6) & (p_pt > 0)
+    c_crit = critical & (c == 6) & (c_pt > 0)
+    p_pt += p_crit
+    c_pt += c_crit
+    counted = ~is_draw if draw == "reroll" else np.ones(36, dtype=bool)
+    return p_pt, c_pt, counted.astype(np.int64), is_draw, p_crit, c_crit
+
+
+def byte_table(p_pt, c_pt, counted):
+    """乱数1バイト(0〜255)→状態への加算値の表
+
+    0〜251 は 36通りの出目に7つずつ均等に対応させる。252〜255 は何もしない
+    （使わない）ことで、% による偏りを出さずに1バイト1ロールで振れる。
+    """
+    step = p_pt | (c_pt << FIELD) | (counted << (2 * FIELD))
+    table = np.zeros(256, dtype=np.int64)
+    table[:252] = step[np.arange(252) % 36]
+    return table
+
+
+def log_tables(p_pt, c_pt, counted, p_crit, c_crit):
+    """乱数1バイト→ログ1行分（数えるか, 勝者コード, 各加点, ruleビット）の表"""
+    from logsink import RULE_BITS, WINNER_CODES
+
+    winner = np.where(p_pt > c_pt, WINNER_CODES["player"],
+                      np.where(c_pt > p_pt, WINNER_CODES["cpu"], WINNER_CODES["-"]))
+    rule = np.where(p_pt > c_pt, RULE_BITS["win"], np.where(c_pt > p_pt, RULE_BITS["lose"], RULE_BITS["draw-give"]))
+    rule = rule | p_crit * RULE_BITS["critical+1"] | c_crit * RULE_BITS["critical+1(cpu)"]
+    tables = []
+    for col in (counted.astype(bool), winner, p_pt, c_pt, rule):
+        t = np.zeros(256, dtype=np.uint8)
+        t[:252] = col[np.arange(252) % 36]
+        tables.append(t)
+    return tables
+
+
+def simulate(n_matches, best=3, critical=True, draw="reroll", seed=None, batch=1_000_000, log=None):
+    """n_matches試合をまとめて対戦させ、集計結果のdictを返す
+
+    ルールは app.py の play_round と同じ:
+    - 出目が大きい方に1点、6で勝てばクリティカル+1
+    - 引き分けは reroll なら振り直し（ラウンド数に数えない）、give なら双方1点
+    - 先取ポイントに届いた時点で終了し、点数が多い方の勝ち（同点はCPU）
+    log に BinaryLogSink を渡すと、数えたラウンドをすべて1行ずつ書き出す。
+    """
+    if draw not in DRAW_RULES:
+        raise ValueError(f"draw は {DRAW_RULES} のどれかを指定してください。")
+    target = target_of(best)
+    if target >= OVER_BIT // 2:
+        raise ValueError(f"best が大きすぎます（先取 {OVER_BIT // 2} 未満まで）。")
+    rng = np.random.default_rng(seed)
+    p_pt, c_pt, counted, draw_lut, p_crit_lut, c_crit_lut = outcome_table(critical, draw)
+    table = byte_table(p_pt, c_pt, counted)
+    if log is not None:
+        row_mask, winner_t, p_pt_t, c_pt_t, rule_t = log_tables(p_pt, c_pt, counted, p_crit_lut, c_crit_lut)
+    # 点数欄を (OVER_BIT - target) から始めると、先取に届いた瞬間に OVER_BIT が立つ
+    init = (OVER_BIT - target) | ((OVER_BIT - target) << FIELD)
+    over_mask = OVER_BIT | (OVER_BIT << FIELD)
+    field = (1 << FIELD) - 1
+
+    player_wins = 0
+    rounds_hist = np.zeros(1, dtype=np.int64)
+    byte_hist = np.zeros(256, dtype=np.int64)  # 出目ごとの回数（引き分け・クリティカルの集計用）
+
+    start = time.perf_counter()
+    done = 0
+    while done < n_matches:
+        k = min(batch, n_matches - done)
+        state = np.full(k, init, dtype=np.int64)
+        finals = []
+
+        # 決着していない試合だけを詰めて残しながら、全試合を1ロールずつ進める
+        while state.size:
+            roll = np.frombuffer(rng.bytes(state.size), dtype=np.uint8)
+            byte_hist += np.bincount(roll, minlength=256)
+            state += table.take(roll)
+            if log is not None:
+                rows = roll[row_mask.take(roll).view(bool)]
+                log.write_columns(int(time.time()), winner_t.take(rows), p_pt_t.take(rows),
+                                  c_pt_t.take(rows), rule_t.take(rows))
+            over = (state & over_mask) != 0
+            if over.any():
+                finals.append(state[over])
+                state = state[~over]
+
+        final = np.concatenate(finals)
+        p_tot = final & field
+        c_tot = (final >> FIELD) & field
+        player_wins += int(np.count_nonzero(p_tot > c_tot))
+        hist = np.bincount(final >> (2 * FIELD))
+        if hist.size > rounds_hist.size:
+            hist[:rounds_hist.size] += rounds_hist
+            rounds_hist = hist
+        else:
+            rounds_hist[:hist.size] += hist
+        done += k
+    elapsed = time.perf_counter() - start
+
+    roll_hist = byte_hist[:252].reshape(7, 36).sum(axis=0)
+    rolls = int(roll_hist.sum())
+    return {
+        "matches": n_matches,
+        "best": best,
+        "target": target,
+        "critical": critical,
+        "draw": draw,
+        "player_win_rate": player_wins / n_matches,
+        "cpu_win_rate": 1 - player_wins / n_matches,
+        "mean_rounds": float((rounds_hist * np.arange(rounds_hist.size)).sum()) / n_matches,
+        "rounds_hist": {int(r): int(n) for r, n in enumerate(rounds_hist) if n},
+        "crit_rate_player": int(roll_hist[p_crit_lut].sum()) / max(1, rolls),
+        "crit_rate_cpu": int(roll_hist[c_crit_lut].sum()) / max(1, rolls),
+        "draw_rate": int(roll_hist[draw_lut].sum()) / max(1, rolls),
+        "rolls": rolls,
+        "elapsed_sec": elapsed,
+        "rolls_per_sec": rolls / elapsed if elapsed else float("inf"),
+    }
+
+
+def print_report(res, player_name="You"):
+    """シミュレーション結果を表示"""
+    print(f"\n=== Best of {res['best']}（先取{res['target']}） "
+          f"クリティカル:{'有効' if res['critical'] else '無効'} 引き分け:{res['draw']} ===")
+    print(f"試合数: {res['matches']:,}  {player_name}の勝率: {res['player_win_rate']*100:.3f}%"
+          f"  CPUの勝率: {res['cpu_win_rate']*100:.3f}%")
+    print(f"平均ラウンド数: {res['mean_rounds']:.3f}  引き分け率: {res['draw_rate']*100:.2f}%"
+          f"  クリティカル率 {player_name}: {res['crit_rate_player']*100:.2f}% CPU: {res['crit_rate_cpu']*100:.2f}%")
+    print("ラウンド数の分布:")
+    for r, n in list(res["rounds_hist"].items())[:15]:
+        print(f"  {r:>3}R: {n/res['matches']*100:6.2f}%")
+    if len(res["rounds_hist"]) > 15:
+        print(f"  ...（ほか{len(res['rounds_hist']) - 15}種類）")
+    print(f"速度: {res['rolls_per_sec']/1e6:.1f} M rolls/秒（{res['elapsed_sec']:.2f} 秒）")
+
+
+def run(n_matches, best, critical, draw, seed=None, all_rules=False, player_name="You", log=None):
+    """app.py --simulate の入口。all_rules ならクリティカル×引き分けの全組み合わせを回す"""
+    rules = [(c, d) for c in (True, False) for d in DRAW_RULES] if all_rules else [(critical, draw)]
+    results = []
+    for c, d in rules:
+        res = simulate(n_matches, best=best, critical=c, draw=d, seed=seed, log=log)
+        print_report(res, player_name)
+        results.append(res)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Day02: ダイス・デュエルのシミュレーション")
+    parser.add_argument("matches", type=int, help="試合数")
+    parser.add_argument("--best", type=int, default=3, help="Best of N")
+    parser.add_argument("--no-critical", dest="critical", action="store_false", help="クリティカル無効")
+    parser.add_argument("--draw", choices=DRAW_RULES, default="reroll", help="引き分け時の処理")
+    parser.add_argument("--seed", type=int, default=None, help="乱数シード")
+    parser.add_argument("--all-rules", action="store_true", help="全ルールの組み合わせを回す")
+    args = parser.parse_args()
+    run(args.matches, args.best, args.critical, args.draw, args.seed, args.all_rules)
+
+
+if __name__ == "__main__":
+    main()
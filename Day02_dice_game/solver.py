@@ -0,0 +1,218 @@
+# Day02: ダイス・デュエルの厳密解（マルコフ連鎖 + メモ化）
+# app.py の --solve から呼ばれる。単体でも使える:
+#   python solver.py --best 5 --draw give
+#   python solver.py --best 3001 --float   # 分数ではなく浮動小数で素早く
+#
+# 考え方:
+#   試合の状態は「あと何点で先取か」の組 (a, b) だけで決まる（a=プレイヤー, b=CPU）。
+#   1ラウンドで (a, b) → (a-da, b-db) に移り、どちらかが0以下になったら終了。
+#   勝者は点数が多い方 ⇔ 残りが少ない方（同点はCPU）。
+#   残り点数で表すと、先取Tの試合は (T, T) から始まるだけなので、
+#   1回計算した表は T 以下のすべての Best of N で使い回せる。
+import argparse
+import json
+import os
+import time
+from fractions import Fraction
+from math import gcd
+
+DRAW_RULES = ("reroll", "give")
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
+
+def target_of(best):
+    """Best of N の先取ポイント"""
+    return best // 2 + 1
+
+
+def transitions(critical, draw):
+    """1ラウンドの (player加点, cpu加点) → 重み の表と分母Dを返す
+
+    36通りの出目から数える。reroll のときは引き分けを除いた条件付き分布
+    （振り直しはラウンドに数えない）。重みは最大公約数で約分しておく。
+    """
+    counts = {}
+    for p in range(1, 7):
+        for c in range(1, 7):
+            if p == c and draw == "reroll":
+                continue
+            p_pt = 1 if p >= c else 0
+            c_pt = 1 if c >= p else 0
+            if critical and p == 6 and p_pt:
+                p_pt += 1
+            if critical and c == 6 and c_pt:
+                c_pt += 1
+            counts[(p_pt, c_pt)] = counts.get((p_pt, c_pt), 0) + 1
+    g = 0
+    for w in counts.values():
+        g = gcd(g, w)
+    table = [(dp, dc, w // g) for (dp, dc), w in sorted(counts.items())]
+    return table, sum(w for _, _, w in table)
+
+
+def solve_table(max_target, critical=True, draw="reroll"):
+    """先取 1..max_target すべての (プレイヤー勝率, 期待ラウンド数) を分数で返す
+
+    対角線 s=a+b ごとに小さい方から埋める（直前の数本だけ保持するのでメモリは O(T)）。
+    分数のままだと遅いので、W(a,b)*D^s と E(a,b)*D^s を整数で持つ。
+    """
+    table, D = transitions(critical, draw)
+    max_step = max(dp + dc for dp, dc, _ in table)
+    # 遷移先がまだ続く状態なら N' * w * D^(k-1)、終了なら W' * w * D^(s-1) を足す
+    steps = [(dp, dc, w, w * D ** (dp + dc - 1)) for dp, dc, w in table]
+    diags = {}  # s -> {a: (N, M)}
+    wins, rounds = [None], [None]
+    for s in range(2, 2 * max_target + 1):
+        d_pow = D ** (s - 1)
+        cur = {}
+        for a in range(max(1, s - max_target), min(max_target, s - 1) + 1):
+            b = s - a
+            n = m = 0
+            for dp, dc, w, mul in steps:
+                a2, b2 = a - dp, b - dc
+                if a2 <= 0 or b2 <= 0:
+                    if a2 < b2:  # プレイヤーの方が多く取った
+                        n += w * d_pow
+                    continue
+                n2, m2 = diags[s - dp - dc][a2]
+                n += mul * n2
+                m += mul * m2
+            cur[a] = (n, m + d_pow * D)
+        diags[s] = cur
+        diags.pop(s - max_step - 1, None)
+        if s % 2 == 0:
+            n, m = cur[s // 2]
+            scale = D ** s
+            wins.append(Fraction(n, scale))
+            rounds.append(Fraction(m, scale))
+    return wins, rounds
+
+
+def solve_table_float(max_target, critical=True, draw="reroll"):
+    """solve_table と同じ計算を NumPy の浮動小数で（大きなTでもすぐ終わる近似版）"""
+    import numpy as np  # 近似版のときだけ読み込む
+
+    table, D = transitions(critical, draw)
+    o = max(max(dp, dc) for dp, dc, _ in table)  # 負の残り点数を置くための余白
+    idx = np.arange(-o, max_target + 1)
+    a_all, b_all = np.meshgrid(idx, idx, indexing="ij")
+    # 終了状態（どちらかが0以下）は勝ち=1/負け=0、期待ラウンド数は0で初期化
+    W = ((a_all <= 0) | (b_all <= 0)) & (a_all < b_all)
+    W = W.astype(np.float64)
+    E = np.zeros_like(W)
+    wins, rounds = [None], [None]
+    for s in range(2, 2 * max_target + 1):
+        a = np.arange(max(1, s - max_target), min(max_target, s - 1) + 1) + o
+        b = s + 2 * o - a
+        w = np.zeros(a.size)
+        e = np.ones(a.size)
+        for dp, dc, q in table:
+            w += q / D * W[a - dp, b - dc]
+            e += q / D * E[a - dp, b - dc]
+        W[a, b] = w
+        E[a, b] = e
+        if s % 2 == 0:
+            wins.append(float(W[s // 2 + o, s // 2 + o]))
+            rounds.append(float(E[s // 2 + o, s // 2 + o]))
+    return wins, rounds
+
+
+def cache_path(critical, draw):
+    return os.path.join(CACHE_DIR, f"solver_{'crit' if critical else 'nocrit'}_{draw}.json")
+
+
+def load_cache(path):
+    """キャッシュを読む。分数への変換は使うときだけ（文字列のまま持つ）"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return [None] + data["win"], [None] + data["rounds"]
+    except (OSError, ValueError, KeyError):
+        return [None], [None]
+
+
+def save_cache(path, wins, rounds):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"win": [str(x) for x in wins[1:]], "rounds": [str(x) for x in rounds[1:]]}, f)
+    os.replace(tmp, path)  # 途中で落ちても壊れたキャッシュを残さない
+
+
+_memo = {}
+
+
+def solve(best, critical=True, draw="reroll"):
+    """Best of N の厳密なプレイヤー勝率・CPU勝率・期待ラウンド数（Fraction）を返す
+
+    一度計算した先取Tまでの結果はメモリとディスク(cache/)に残し、次からは表を引くだけ。
+    """
+    if draw not in DRAW_RULES:
+        raise ValueError(f"draw は {DRAW_RULES} のどれかを指定してください。")
+    if best < 1:
+        raise ValueError("Best of N は1以上を指定してください。")
+    target = target_of(best)
+    key = (critical, draw)
+    if key not in _memo:
+        _memo[key] = load_cache(cache_path(critical, draw))
+    wins, rounds = _memo[key]
+    if target >= len(wins):
+        wins, rounds = solve_table(target, critical, draw)
+        _memo[key] = (wins, rounds)
+        save_cache(cache_path(critical, draw), wins, rounds)
+    return {
+        "best": best,
+        "target": target,
+        "critical": critical,
+        "draw": draw,
+        "player_win": Fraction(wins[target]),
+        "cpu_win": 1 - Fraction(wins[target]),
+        "expected_rounds": Fraction(rounds[target]),
+    }
+
+
+def short(frac, limit=60):
+    """長すぎる分数は桁数だけ表示"""
+    text = str(frac)
+    if len(text) <= limit:
+        return text
+    return f"{frac.numerator.bit_length()}bit/{frac.denominator.bit_length()}bit の分数"
+
+
+def print_solution(res, player_name="You", title="厳密解"):
+    print(f"\n=== {title}: Best of {res['best']}（先取{res['target']}） "
+          f"クリティカル:{'有効' if res['critical'] else '無効'} 引き分け:{res['draw']} ===")
+    print(f"{player_name}の勝率: {float(res['player_win'])*100:.6f}%  = {short(res['player_win'])}")
+    print(f"CPUの勝率: {float(res['cpu_win'])*100:.6f}%  = {short(res['cpu_win'])}")
+    print(f"期待ラウンド数: {float(res['expected_rounds']):.6f}  = {short(res['expected_rounds'])}")
+
+
+def run(best, critical, draw, all_rules=False, player_name="You", use_float=False):
+    """app.py --solve の入口"""
+    rules = [(c, d) for c in (True, False) for d in DRAW_RULES] if all_rules else [(critical, draw)]
+    for c, d in rules:
+        start = time.perf_counter()
+        if use_float:
+            wins, rounds = solve_table_float(target_of(best), c, d)
+            res = {"best": best, "target": target_of(best), "critical": c, "draw": d,
+                   "player_win": wins[-1], "cpu_win": 1 - wins[-1], "expected_rounds": rounds[-1]}
+        else:
+            res = solve(best, c, d)
+        print_solution(res, player_name, "近似解" if use_float else "厳密解")
+        print(f"計算時間: {(time.perf_counter() - start)*1e3:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Day02: ダイス・デュエルの厳密解")
+    parser.add_argument("--best", type=int, default=3, help="Best of N")
+    parser.add_argument("--no-critical", dest="critical", action="store_false", help="クリティカル無効")
+    parser.add_argument("--draw", choices=DRAW_RULES, default="reroll", help="引き分け時の処理")
+    parser.add_argument("--all-rules", action="store_true", help="全ルールの組み合わせを解く")
+    parser.add_argument("--float", dest="use_float", action="store_true",
+                        help="分数ではなく浮動小数で計算（キャッシュなし・高速）")
+    args = parser.parse_args()
+    run(args.best, args.critical, args.draw, args.all_rules, use_float=args.use_float)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+# Day02: dice_log.csv の集計（差分だけ読む）
+# 使い方例:
+#   python app.py stats                 # logs/dice_log.csv を集計
+#   python app.py stats --json          # JSONで出力
+#   python app.py stats --reset         # 集計をやり直す
+#
+# ログはメモリマップで開き、前回どこまで読んだか（バイト位置）と集計値を
+# 小さな状態ファイル（<ログ名>.state.json）に残す。次からは追記された行だけを読む。
+import argparse
+import csv
+import glob
+import json
+import mmap
+import os
+import re
+import time
+from collections import Counter
+
+CHUNK = 64 * 1024 * 1024  # 一度に処理するバイト数
+TIME_RE = re.compile(rb"T\d\d:\d\d:\d\d")  # timestamp の時刻部分（日別集計には不要）
+ROTATED_RE = re.compile(r"(\d{8}-\d{6})(?:-(\d+))?")  # ローテーション後の名前の <日時>[-n] の部分
+
+
+def empty_state():
+    return {
+        "offset": 0,      # ここまで読んだ（改行の直後）
+        "inode": None,    # ローテーションで別ファイルになったら、前のファイルの残りを読んでから新しい方へ
+        "rounds": 0,
+        "draw_give": 0,
+        "players": {},    # 名前 -> {"rounds", "wins", "crits"}
+        "days": {},       # "YYYY-MM-DD" -> 行数
+    }
+
+
+def state_path(log_path):
+    return log_path + ".state.json"
+
+
+def load_state(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return empty_state()
+
+
+def save_state(path, state):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _player(state, name):
+    p = state["players"].get(name)
+    if p is None:
+        p = state["players"][name] = {"rounds": 0, "wins": 0, "crits": 0}
+    return p
+
+
+def add_rows(state, data):
+    """CSVの完全な行だけが入ったバイト列を集計に足す
+
+    時刻(THH:MM:SS)を消すと同じ日の同じ結果の行はまったく同じになるので、
+    Counter で重複をまとめてから、種類ごとに1回だけ解析する。
+    """
+    days = state["days"]
+    for line, n in Counter(TIME_RE.sub(b"", data).split(b"\n")).items():
+        line = line.rstrip(b"\r")
+        if not line or line.startswith((b"timestamp", b"\xef\xbb\xbftimestamp")):
+            continue
+        fields = next(csv.reader([line.decode("utf-8")]))
+        if len(fields) != 7:
+            continue
+        ts, player, cpu, winner, _, _, rule = fields
+        state["rounds"] += n
+        day = ts[:10]
+        days[day] = days.get(day, 0) + n
+        p = _player(state, player)
+        c = _player(state, cpu)
+        p["rounds"] += n
+        c["rounds"] += n
+        if winner == player:
+            p["wins"] += n
+        elif winner == cpu:
+            c["wins"] += n
+        rules = rule.split("|")
+        if "draw-give" in rules:
+            state["draw_give"] += n
+        if "critical+1" in rules:
+            p["crits"] += n
+        if "critical+1(cpu)" in rules:
+            c["crits"] += n
+
+
+def _read(path, state, start):
+    """path の start バイト目から、最後の完全な行までを集計に足す。読み終えた位置を返す"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size <= start:
+            return start
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = mm.rfind(b"\n", start) + 1  # 書きかけの最終行は次回に回す
+            pos = start
+            while pos < end:
+                stop = min(end, pos + CHUNK)
+                if stop < end:
+                    stop = mm.rfind(b"\n", pos, stop) + 1 or end
+                add_rows(state, mm[pos:stop])
+                pos = stop
+    return max(start, end)
+
+
+def rotated_logs(log_path):
+    """logsink がローテーションで付けた名前（<名前>.<日時>[-n].csv）のファイルを、古い順に [(パス, inode)] で返す"""
+    root, ext = os.path.splitext(log_path)
+    found = []
+    for path in glob.glob(glob.escape(root) + ".*" + glob.escape(ext)):
+        m = ROTATED_RE.fullmatch(path[len(root) + 1:len(path) - len(ext)])
+        if m is None:
+            continue
+        try:
+            inode = os.stat(path).st_ino
+        except OSError:
+            continue
+        found.append(((m.group(1), int(m.group(2) or 0)), path, inode))
+    return [(path, inode) for _, path, inode in sorted(found)]
+
+
+def update(log_path, state):
+    """前回の続きから読んで state を更新する。読んだバイト数を返す"""
+    st = os.stat(log_path)
+    read = 0
+    if state["inode"] is not None and state["inode"] != st.st_ino:
+        # 別ファイルになった。ローテーションなら集計は残し、前のファイルの残りと
+        # その後にローテーションされたファイル（前回から2回以上回ったとき）を読んでから新しいファイルの先頭へ
+        rotated = rotated_logs(log_path)
+        inodes = [inode for _, inode in rotated]
+        if state["inode"] in inodes:
+            i = inodes.index(state["inode"])
+            for k, (path, _) in enumerate(rotated[i:]):
+                start = state["offset"] if k == 0 else 0
+                read += _read(path, state, start) - start
+        else:
+            # ローテーションではない（エディタで保存し直した・別のファイルに置き換えた等）→ 最初から
+            state.clear()
+            state.update(empty_state())
+        state["offset"] = 0
+    elif st.st_size < state["offset"]:
+        # 同じファイルが切り詰められた → 最初から
+        state.clear()
+        state.update(empty_state())
+    state["inode"] = st.st_ino
+    start = state["offset"]
+    state["offset"] = _read(log_path, state, start)
+    return read + state["offset"] - start
+
+
+def summary(state):
+    rounds = state["rounds"]
+    return {
+        "rounds": rounds,
+        "draw_give_rate": state["draw_give"] / rounds if rounds else 0.0,
+        "players": {
+            name: {
+                "rounds": p["rounds"],
+                "win_rate": p["wins"] / p["rounds"] if p["rounds"] else 0.0,
+                "crit_rate": p["crits"] / p["rounds"] if p["rounds"] else 0.0,
+            }
+            for name, p in sorted(state["players"].items())
+        },
+        "days": dict(sorted(state["days"].items())),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="app.py stats", description="Day02: 対戦ログの集計")
+    parser.add_argument("--log", default="logs/dice_log.csv", help="集計するCSVログ")
+    parser.add_argument("--json", action="store_true", help="JSONで出力")
+    parser.add_argument("--reset", action="store_true", help="状態ファイルを捨てて最初から集計")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.log):
+        print(f"ログが見つかりません: {args.log}")
+        return
+    start = time.perf_counter()
+    spath = state_path(args.log)
+    state = empty_state() if args.reset else load_state(spath)
+    read = update(args.log, state)
+    save_state(spath, state)
+    elapsed = time.perf_counter() - start
+    res = summary(state)
+
+    if args.json:
+        print(json.dumps(res, ensure_ascii=False))
+        return
+    print(f"=== 集計: {args.log} ===")
+    print(f"ラウンド数: {res['rounds']:,}  双方加点(draw-give)率: {res['draw_give_rate']*100:.2f}%")
+    for name, p in res["players"].items():
+        print(f"  {name}: {p['rounds']:,} ラウンド  勝率 {p['win_rate']*100:.2f}%"
+              f"  クリティカル率 {p['crit_rate']*100:.2f}%")
+    print("日別ラウンド数:")
+    for day, n in list(res["days"].items())[-14:]:
+        print(f"  {day}: {n:,}")
+    print(f"(新しく読んだ分: {read:,} バイト / {elapsed*1e3:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
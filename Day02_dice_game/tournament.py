@@ -0,0 +1,229 @@
+# Day02: ダイス・デュエルのトーナメント（複数プロセスで並列対戦）
+# 使い方例:
+#   python app.py tournament --players Raiki Ken Aya --matches 100000
+#   python app.py tournament --players "A" "B:2,2,4,4,6,6" "C:1,3,3,5,5,6" --format bracket
+#   python app.py tournament --players A B C D --workers 8 --seed 42 --json
+#
+# プレイヤーは「名前」か「名前:6面の目」で指定する（目を書くとそのサイコロを使う作戦になる）。
+# 乱数は「対戦カードと何番目の塊か」から作るので、何プロセスで回しても結果は同じになる。
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from simulate import DRAW_RULES, target_of
+
+FAIR_DIE = (1, 2, 3, 4, 5, 6)
+CHUNK = 200_000  # 1ジョブで対戦する試合数
+
+
+def parse_player(spec):
+    """ "名前" / "名前:1,2,3,4,5,6" → (名前, 目のタプル)"""
+    name, _, faces = spec.partition(":")
+    if not faces:
+        return name, FAIR_DIE
+    die = tuple(int(x) for x in faces.split(","))
+    if len(die) != 6 or not all(1 <= x <= 6 for x in die):
+        raise ValueError(f"{spec}: サイコロの目は1〜6を6つ、カンマ区切りで指定してください。")
+    return name, die
+
+
+def always_draws(die_a, die_b):
+    """どの目の組み合わせでも引き分けになるか（reroll だと試合が終わらない）"""
+    return len(set(die_a) | set(die_b)) == 1
+
+
+def play_matches(die_a, die_b, n, best, critical, draw, seed_key):
+    """aとbでn試合対戦し、(aの勝ち数, 引き分けの試合数, ラウンド数の合計) を返す（ルールは app.py と同じ）
+
+    give では両者が同時に目標点に届いて同点になることがあり、それは引き分けの試合として数える。
+    """
+    if draw == "reroll" and always_draws(die_a, die_b):
+        raise ValueError("この2つのサイコロは必ず引き分けになるので、reroll では試合が終わりません。")
+    rng = np.random.default_rng(np.random.SeedSequence(seed_key[0], spawn_key=seed_key[1:]))
+    target = target_of(best)
+    fa = np.array(die_a, dtype=np.int8)
+    fb = np.array(die_b, dtype=np.int8)
+    a_tot = np.zeros(n, dtype=np.int32)
+    b_tot = np.zeros(n, dtype=np.int32)
+    rounds = 0
+    active = np.arange(n)
+    while active.size:
+        a = fa[rng.integers(0, 6, size=active.size)]
+        b = fb[rng.integers(0, 6, size=active.size)]
+        is_draw = a == b
+        a_pt = (a > b).astype(np.int32)
+        b_pt = (a < b).astype(np.int32)
+        if draw == "give":
+            a_pt += is_draw
+            b_pt += is_draw
+        if critical:
+            a_pt += (a == 6) & (a_pt > 0)
+            b_pt += (b == 6) & (b_pt > 0)
+        counted = active if draw == "give" else active[~is_draw]
+        if draw == "reroll":
+            a_pt, b_pt = a_pt[~is_draw], b_pt[~is_draw]
+        rounds += counted.size
+        a_tot[counted] += a_pt
+        b_tot[counted] += b_pt
+        active = active[(a_tot[active] < target) & (b_tot[active] < target)]
+    return int(np.count_nonzero(a_tot > b_tot)), int(np.count_nonzero(a_tot == b_tot)), rounds
+
+
+def _job(args):
+    return play_matches(*args)
+
+
+def series_jobs(i, j, players, n, best, critical, draw, seed, key):
+    """1つの対戦カードを CHUNK 試合ずつのジョブに分ける（乱数は key と塊番号で決まる）"""
+    jobs = []
+    for k, start in enumerate(range(0, n, CHUNK)):
+        jobs.append((players[i][1], players[j][1], min(CHUNK, n - start), best, critical, draw,
+                     (seed,) + key + (k,)))
+    return jobs
+
+
+def new_board(players):
+    return {name: {"name": name, "die": list(die), "series": 0, "series_wins": 0,
+                   "matches": 0, "wins": 0, "draws": 0, "rounds": 0} for name, die in players}
+
+
+def record(board, a, b, n, a_wins, draws, rounds):
+    """a対bのn試合の結果を順位表に足し、勝ち越した方の名前を返す（五分なら a）"""
+    b_wins = n - a_wins - draws
+    for name, wins in ((a, a_wins), (b, b_wins)):
+        row = board[name]
+        row["series"] += 1
+        row["matches"] += n
+        row["wins"] += wins
+        row["draws"] += draws
+        row["rounds"] += rounds
+    winner = a if a_wins >= b_wins else b
+    board[winner]["series_wins"] += 1
+    return winner
+
+
+def run_jobs(pool, jobs_by_pair):
+    """ペアごとのジョブ群をまとめて投げ、ペアごとに (aの勝ち数, 引き分け数, ラウンド数) を合計して返す"""
+    flat = [job for jobs in jobs_by_pair for job in jobs]
+    results = list(pool.map(_job, flat, chunksize=1)) if pool else [_job(j) for j in flat]
+    out, pos = [], 0
+    for jobs in jobs_by_pair:
+        part = results[pos:pos + len(jobs)]
+        out.append(tuple(sum(col) for col in zip(*part)))
+        pos += len(jobs)
+    return out
+
+
+def round_robin(players, n, best, critical, draw, seed, pool):
+    board = new_board(players)
+    pairs = [(i, j) for i in range(len(players)) for j in range(i + 1, len(players))]
+    jobs = [series_jobs(i, j, players, n, best, critical, draw, seed, (i, j)) for i, j in pairs]
+    for (i, j), (wins, draws, rounds) in zip(pairs, run_jobs(pool, jobs)):
+        record(board, players[i][0], players[j][0], n, wins, draws, rounds)
+    return board, None
+
+
+def bracket(players, n, best, critical, draw, seed, pool):
+    """シングルエリミネーション。人数が2のべき乗でなければ上位シードは不戦勝"""
+    board = new_board(players)
+    alive = list(range(len(players)))
+    size = 1
+    while size < len(alive):
+        size *= 2
+    alive += [None] * (size - len(alive))
+    # 1番シード対最下位シード…の並びにする
+    order = [alive[k] for pair in zip(range(size // 2), range(size - 1, size // 2 - 1, -1)) for k in pair]
+    rounds_log = []
+    rnd = 0
+    while len(order) > 1:
+        pairs = [(order[k], order[k + 1]) for k in range(0, len(order), 2)]
+        real = [(i, j) for i, j in pairs if i is not None and j is not None]
+        jobs = [series_jobs(i, j, players, n, best, critical, draw, seed, (1000 + rnd, i, j)) for i, j in real]
+        results = dict(zip(real, run_jobs(pool, jobs)))
+        nxt, log = [], []
+        for i, j in pairs:
+            if i is None or j is None:
+                nxt.append(i if j is None else j)
+                continue
+            wins, draws, rounds = results[(i, j)]
+            winner = record(board, players[i][0], players[j][0], n, wins, draws, rounds)
+            nxt.append(i if winner == players[i][0] else j)
+            log.append((players[i][0], players[j][0], wins, n - wins - draws))
+        rounds_log.append(log)
+        order = nxt
+        rnd += 1
+    return board, {"champion": players[order[0]][0], "rounds": rounds_log}
+
+
+def leaderboard(board):
+    rows = sorted(board.values(), key=lambda r: (-r["series_wins"], -r["wins"] / max(1, r["matches"]), r["name"]))
+    for r in rows:
+        r["win_rate"] = r["wins"] / r["matches"] if r["matches"] else 0.0
+        r["mean_rounds"] = r["rounds"] / r["matches"] if r["matches"] else 0.0
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="app.py tournament", description="Day02: ダイス・デュエルのトーナメント")
+    parser.add_argument("--players", nargs="+", required=True, help='参加者（"名前" または "名前:1,2,3,4,5,6"）')
+    parser.add_argument("--format", choices=["roundrobin", "bracket"], default="roundrobin", help="総当たり / 勝ち抜き")
+    parser.add_argument("--matches", type=int, default=10000, help="1つの対戦カードで行う試合数")
+    parser.add_argument("--best", type=int, default=3, help="Best of N")
+    parser.add_argument("--no-critical", dest="critical", action="store_false", help="クリティカル無効")
+    parser.add_argument("--draw", choices=DRAW_RULES, default="reroll", help="引き分け時の処理")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="プロセス数（1なら並列化しない）")
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード（同じなら何プロセスでも同じ結果）")
+    parser.add_argument("--json", action="store_true", help="JSONで出力")
+    args = parser.parse_args(argv)
+    if args.matches < 1:
+        parser.error("--matches は1以上にしてください。")
+
+    try:
+        players = [parse_player(p) for p in args.players]
+    except ValueError as e:
+        print(e)
+        return
+    if len(players) < 2 or len({name for name, _ in players}) != len(players):
+        print("参加者は2人以上、名前は重ならないように指定してください。")
+        return
+    if args.draw == "reroll":
+        stuck = [(a, b) for k, (a, da) in enumerate(players) for b, db in players[k + 1:] if always_draws(da, db)]
+        if stuck:
+            print(f"{stuck[0][0]} と {stuck[0][1]} のサイコロは必ず引き分けになるので、--draw reroll では対戦できません。"
+                  "（--draw give を使うか、目を変えてください）")
+            return
+
+    run = round_robin if args.format == "roundrobin" else bracket
+    start = time.perf_counter()
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            board, detail = run(players, args.matches, args.best, args.critical, args.draw, args.seed, pool)
+    else:
+        board, detail = run(players, args.matches, args.best, args.critical, args.draw, args.seed, None)
+    elapsed = time.perf_counter() - start
+    rows = leaderboard(board)
+
+    if args.json:
+        print(json.dumps({"leaderboard": rows, "bracket": detail, "elapsed_sec": elapsed}, ensure_ascii=False))
+        return
+    if detail:
+        for k, log in enumerate(detail["rounds"], 1):
+            print(f"--- {k}回戦 ---")
+            for a, b, wa, wb in log:
+                print(f"  {a} {wa:,} - {wb:,} {b}")
+        print(f"🏆 優勝: {detail['champion']}\n")
+    print("===== 順位表 =====")
+    print(f"{'順位':<4}{'名前':<12}{'カード勝ち':>8}{'試合':>12}{'勝率':>9}{'引分':>10}{'平均R':>7}")
+    for rank, r in enumerate(rows, 1):
+        print(f"{rank:<6}{r['name']:<12}{r['series_wins']:>4}/{r['series']:<4}{r['matches']:>12,}"
+              f"{r['win_rate']*100:>8.2f}%{r['draws']:>12,}{r['mean_rounds']:>7.2f}")
+    total = sum(r["matches"] for r in rows) // 2
+    print(f"({total:,} 試合 / {elapsed:.2f} 秒 / {args.workers} プロセス)")
+
+
+if __name__ == "__main__":
+    main()
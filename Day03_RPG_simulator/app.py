@@ -1,15 +1,22 @@
+import argparse
 import random
+import sys
 import time
 
-def do_attack(attacker, defender):
-    """攻撃関数：攻撃者が守備側にランダムなダメージを与える"""
-    if random.random() < 0.05:  #　5%でミス
-        print("ミス！")
+import events
+
+def do_attack(attacker, defender, rng=random, log=None):
+    """攻撃関数：攻撃者が守備側にランダムなダメージを与える（表示は log の購読者が行う）"""
+    if rng.random() < 0.05:  #　5%でミス
+        if log is not None:
+            log.emit(events.MISS, attacker, 0, defender["hp"])
         return 0
-    base = random.randint(*attacker["atk"])
-    if random.random() < 0.10:  # 10%でクリティカル
+    base = rng.randint(*attacker["atk"])
+    crit = rng.random() < 0.10  # 10%でクリティカル
+    if crit:
         base = int(base * 1.5)
-        print("クリティカル！")
+        if log is not None:
+            log.emit(events.CRIT, attacker, base, defender["hp"])
     
     #防御半減
     dmg = base // 2 if defender.get("guard") else base
@@ -18,38 +25,43 @@ def do_attack(attacker, defender):
     if defender.get("guard"):
         defender["guard"] = False
 
-    print(f"{attacker['name']}の攻撃！{defender['name']}に{dmg}のダメージ！")
+    if log is not None:
+        log.emit(events.ATTACK, attacker, dmg, defender["hp"])
     return dmg
 
-def do_heal(target):
+def do_heal(target, rng=random, log=None):
     low, high = target.get("heal", (8,14))
-    amt = random.randint(low, high)
+    amt = rng.randint(low, high)
     before = target["hp"]
     target["hp"] = min(target["hp_max"], target["hp"] + amt)
     real = target["hp"] - before
-    print(f"{target["name"]}は{real}回復した")
+    if log is not None:
+        log.emit(events.HEAL, target, real, target["hp"])
     return real
 
-def use_item(target,item):
+def use_item(target, item, log=None):
     if item["num"] <= 0:
-        print("ポーションがもうない！")
+        if log is not None:
+            log.emit(events.NO_POTION, target, 0, target["hp"])
         return 0
     before = target["hp"]
     target["hp"] = min(target["hp_max"], target["hp"] + item["heal"])
     item["num"] -= 1
     real = target["hp"] - before
-    print(f"{target["name"]}は{real}回復した")
+    if log is not None:
+        log.emit(events.POTION, target, real, target["hp"])
+    return real
 
-def start_guard(target):
+def start_guard(target, log=None):
     target["guard"] = True
-    print(f"{target["name"]}は身を守っている（次のダメ半減）")
+    if log is not None:
+        log.emit(events.GUARD, target, 0, target["hp"])
 
-def enemy_ai(enemy, player):
+def enemy_ai(enemy, player, rng=random):
      # HPが少ないときは回復 30% / それ以外は攻撃 90% / たまに防御 10%
-     import random
-     if enemy["hp"] <= enemy["hp_max"] * 0.35 and random.random() < 0.3:
+     if enemy["hp"] <= enemy["hp_max"] * 0.35 and rng.random() < 0.3:
          return "h"
-     r = random.random()
+     r = rng.random()
      if r < 0.9:
          return "a"
      else:
@@ -57,8 +69,8 @@ def enemy_ai(enemy, player):
 
 def show_status(player, enemy, item):
     """現在のHPを表示"""
-    print(f"{player['name']} HP： {player["hp"]}    {enemy['name']} HP： {enemy['hp']}")
-    print(f"{item["name"]} 　残り{item["num"]}個")
+    print(f"{player['name']} HP： {player['hp']}    {enemy['name']} HP： {enemy['hp']}")
+    print(f"{item['name']} 　残り{item['num']}個")
     print("-" * 30)
 
 def choose_command():
@@ -68,45 +80,139 @@ def choose_command():
             return cmd
         print("a/h/g/p のいずれかで入力してください。")
 
-def battle(player, enemy, item):
-    """戦闘メインループ"""
-    print("--- バトル開始！ ---")
+def battle(player, enemy, item, table=None, ai=False, seed=None, log=None, script=None):
+    """戦闘メインループ
+
+    table があればおすすめ行動を表示し、ai=True ならその通りに動く。
+    乱数は seed から作る random.Random を使い、seed と入力したコマンドを log に残すので、
+    script（コマンド文字のリスト）と同じ seed を渡せば同じ戦闘を再現できる。
+    """
+    if seed is None:
+        seed = random.getrandbits(63)
+    rng = random.Random(seed)
+    if log is None:
+        log = events.EventLog()
+        log.subscribe(events.TextRenderer())
+    log.begin(player, enemy, seed)
+    script = iter(script) if script is not None else None
     while player["hp"] > 0 and enemy["hp"] > 0:
+        log.turn += 1
         # プレイヤーのターン
         show_status(player, enemy, item)
-        cmd = choose_command()
+        if table is not None:
+            hint, win = table.best(player, enemy, item)
+            print(f"💡 おすすめ: {hint}（最適に戦ったときの勝率 {win*100:.1f}%）")
+        if script is not None:
+            cmd = next(script, "a")
+            print(f"> {cmd}")
+        elif ai:
+            cmd = hint
+            print(f"AI> {cmd}")
+            time.sleep(0.5)
+        else:
+            cmd = choose_command()
+        log.emit(events.COMMAND, player, "ahgp".index(cmd), player["hp"])
         if cmd == "a":
-            dmg = do_attack(player, enemy)
+            dmg = do_attack(player, enemy, rng, log)
         elif cmd == "h":
-            amt = do_heal(player)
+            amt = do_heal(player, rng, log)
         elif cmd == "g":
-            start_guard(player)
+            start_guard(player, log)
         elif cmd == "p":
-            use_item(player,item)
+            use_item(player, item, log)
 
         if enemy["hp"] <= 0:
-            print(f"{enemy["name"]}を倒した！")
+            log.emit(events.KO, enemy, 0, 0)
             break
 
         #　敵のターン
-        e_cmd = enemy_ai(enemy, player)     # "a"/"h"/"g"のいずれか
+        e_cmd = enemy_ai(enemy, player, rng)     # "a"/"h"/"g"のいずれか
         if e_cmd == "a":
-            dmg = do_attack(enemy, player)
+            dmg = do_attack(enemy, player, rng, log)
         elif e_cmd == "h":
-            amt = do_heal(enemy)
+            amt = do_heal(enemy, rng, log)
         elif e_cmd == "g":
-            start_guard(enemy)
+            start_guard(enemy, log)
 
         if player["hp"] <= 0:
-            print(f"{player["name"]}は負けてしまった")
+            log.emit(events.KO, player, 0, 0)
             break
+    return log
 
-    
-def main():
+
+def replay(path):
+    """--trace で保存した戦闘を、同じシードとコマンドでもう一度流して結果が一致するか確かめる"""
+    names, recorded = events.load(path)
+    start = max((k for k, e in enumerate(recorded) if e.kind == events.START), default=None)
+    if start is None:
+        print("記録に戦闘の開始（シード）が残っていません（リングバッファで上書きされた可能性があります）。")
+        return
+    recorded = recorded[start:]
+    seed = recorded[0].value
+    script = ["ahgp"[e.value] for e in recorded if e.kind == events.COMMAND]
+    player, enemy, item = default_stats()
+    print(f"シード {seed} / コマンド {''.join(script)} で再生します。")
+    log = battle(player, enemy, item, seed=seed, script=script)
+    same = log.last_battle() == recorded
+    print("✅ 記録と同じ展開になりました。" if same else "⚠ 記録と展開が違います（ステータスが変わった可能性があります）。")
+
+
+def default_stats():
+    """プレイヤー・敵・アイテムの初期ステータス"""
     player = {"name": "あなた", "hp": 60, "hp_max": 60, "atk":(10,18), "heal":(10,16), "guard":False}
     enemy = {"name": "ゴブリン", "hp": 55, "hp_max": 55, "atk":(8,16), "heal":(5,10), "guard":False}
     item = {"name": "ポーション", "heal": 20, "num": 3}
-    battle(player, enemy, item)
+    return player, enemy, item
+
+def main():
+    if sys.argv[1:2] == ["sweep"]:
+        import sweep  # バランス調整の総当たり（sweep.py）
+        sweep.main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["dungeon"]:
+        import dungeon  # 複数の敵・仲間とのダンジョン（dungeon.py）
+        dungeon.main(sys.argv[2:])
+        return
+    parser = argparse.ArgumentParser(description="Day03: RPG戦闘シミュレーター")
+    parser.add_argument("--batch", type=int, default=0, metavar="N",
+                        help="N戦を画面なしでまとめて回して集計する（NumPyが必要）")
+    parser.add_argument("--policy", default="cautious",
+                        help="--batch 時のプレイヤーの方針: attack / cautious / random / optimal")
+    parser.add_argument("--seed", type=int, default=None, help="乱数シード（--batch / 対戦。同じシードとコマンドなら同じ展開）")
+    parser.add_argument("--hint", action="store_true", help="毎ターンおすすめ行動と勝率を表示")
+    parser.add_argument("--ai", action="store_true", help="最適方針のAIに戦わせる")
+    parser.add_argument("--trace", default=None, metavar="FILE", help="対戦のイベントをJSONで保存する")
+    parser.add_argument("--replay", default=None, metavar="FILE", help="--trace で保存した対戦を再生する")
+    args = parser.parse_args()
+
+    player, enemy, item = default_stats()
+
+    if args.batch > 0:
+        import engine  # NumPyはまとめて回すときだけ読み込む
+        if args.policy == "optimal":
+            from solver import PolicyTable
+            policy = PolicyTable.load_or_solve(player, enemy, item).batch_policy
+        elif args.policy in engine.POLICIES:
+            policy = engine.POLICIES[args.policy]
+        else:
+            print(f"--policy は {' / '.join(engine.POLICIES)} / optimal のどれかを指定してください。")
+            return
+        res = engine.run_batch(args.batch, player, enemy, item, policy=policy, seed=args.seed)
+        engine.print_report(res, args.policy)
+        return
+
+    if args.replay:
+        replay(args.replay)
+        return
+
+    table = None
+    if args.hint or args.ai:
+        from solver import PolicyTable  # 表は optimal_policy.npz に保存され、次回からは読むだけ
+        table = PolicyTable.load_or_solve(player, enemy, item)
+    log = battle(player, enemy, item, table=table, ai=args.ai, seed=args.seed)
+    if args.trace:
+        log.save(args.trace)
+        print(f"イベントを {args.trace} に保存しました（--replay {args.trace} で再生できます）。")
     
 if __name__ == "__main__":
     main()
\ No newline at end of file
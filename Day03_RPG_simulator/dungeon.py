@@ -0,0 +1,231 @@
+# Day03: 複数の敵・仲間とのバトルと、何階もつづくダンジョン
+# 使い方例:
+#   python app.py dungeon                              # 仲間3人で5階まで（各階ゴブリン2匹）
+#   python app.py dungeon --party 6 --enemies 4 --floors 10 --seed 1
+#   python app.py dungeon --bench                      # キャラ数を増やしたときの1ターンの時間
+#
+# キャラクターは「1人=1行」の辞書ではなく、HP・攻撃力などの項目ごとに NumPy 配列を持つ
+# （Entities）。1ターンの処理は「生きている味方の行動」「生きている敵の行動」を配列でまとめて
+# 計算するので、何百体いてもループは回さない。敵の行動は app.py の enemy_ai と同じ確率。
+# 階をまたいでも味方のHP・ポーション（全員で共有）はそのまま持ち越す。
+import argparse
+import time
+
+import numpy as np
+
+from engine import (ATTACK, CRIT_MULT, CRIT_RATE, ENEMY_ATTACK_RATE, ENEMY_HEAL_HP, ENEMY_HEAL_RATE, GUARD,
+                    HEAL, MAX_TURNS, MISS_RATE, POTION)
+
+PARTY, ENEMY = 0, 1
+LOW_HP = 0.35  # 味方はHPがこの割合以下なら回復（engine の cautious と同じ）
+
+
+class Entities:
+    """キャラクターの状態を項目ごとの配列で持つ（1要素=1体）"""
+
+    FIELDS = ("team", "hp", "hp_max", "atk_lo", "atk_hi", "heal_lo", "heal_hi", "guard")
+
+    def __init__(self):
+        self.team = np.empty(0, dtype=np.int8)
+        self.hp = np.empty(0, dtype=np.int32)
+        self.hp_max = np.empty(0, dtype=np.int32)
+        self.atk_lo = np.empty(0, dtype=np.int32)
+        self.atk_hi = np.empty(0, dtype=np.int32)
+        self.heal_lo = np.empty(0, dtype=np.int32)
+        self.heal_hi = np.empty(0, dtype=np.int32)
+        self.guard = np.empty(0, dtype=bool)
+        self.names = []
+
+    @property
+    def size(self):
+        return self.hp.size
+
+    def add(self, team, stats, n=1, names=None):
+        """app.py と同じ形の辞書 stats のキャラを n 体足す"""
+        heal = stats.get("heal", (8, 14))
+        new = {
+            "team": team, "hp": stats["hp"], "hp_max": stats["hp_max"],
+            "atk_lo": stats["atk"][0], "atk_hi": stats["atk"][1],
+            "heal_lo": heal[0], "heal_hi": heal[1], "guard": stats.get("guard", False),
+        }
+        for f in self.FIELDS:
+            arr = getattr(self, f)
+            setattr(self, f, np.concatenate([arr, np.full(n, new[f], dtype=arr.dtype)]))
+        self.names += names or ([stats["name"]] if n == 1 else [f"{stats['name']}{k + 1}" for k in range(n)])
+
+    def keep(self, mask):
+        """倒れた敵などを取り除いて配列を詰める"""
+        for f in self.FIELDS:
+            setattr(self, f, getattr(self, f)[mask])
+        self.names = [name for name, m in zip(self.names, mask) if m]
+
+    def alive(self, team):
+        return np.flatnonzero((self.team == team) & (self.hp > 0))
+
+
+def resolve_attacks(rng, ent, attackers, targets):
+    """attackers[k] が targets[k] を攻撃する（全員同時）。与えたダメージの合計を返す
+
+    ミス・クリティカル・防御半減は engine と同じ。防御中の相手は、このフェイズで
+    最初に当たった1回だけが半減され、そこで防御が解ける。
+    """
+    k = attackers.size
+    if k == 0:
+        return 0
+    hit = rng.random(k) >= MISS_RATE
+    base = rng.integers(ent.atk_lo[attackers], ent.atk_hi[attackers] + 1)
+    crit = rng.random(k) < CRIT_RATE
+    base = np.where(crit, (base * CRIT_MULT).astype(np.int32), base)
+    t, dmg = targets[hit], base[hit]
+    if t.size:
+        _, first = np.unique(t, return_index=True)
+        halve = np.zeros(t.size, dtype=bool)
+        halve[first] = ent.guard[t[first]]
+        dmg = np.where(halve, dmg // 2, dmg)
+        ent.hp -= np.bincount(t, weights=dmg, minlength=ent.size).astype(np.int32)
+        np.maximum(ent.hp, 0, out=ent.hp)
+        ent.guard[t] = False
+    return int(dmg.sum())
+
+
+def heal_self(rng, ent, idx):
+    amt = rng.integers(ent.heal_lo[idx], ent.heal_hi[idx] + 1)
+    ent.hp[idx] = np.minimum(ent.hp_max[idx], ent.hp[idx] + amt)
+
+
+def party_commands(ent, party, potions):
+    """味方の行動（cautious と同じ）: HPが少なければポーション（残っている分だけ）、無ければ回復、それ以外は攻撃"""
+    low = ent.hp[party] <= ent.hp_max[party] * LOW_HP
+    cmd = np.where(low, HEAL, ATTACK)
+    want = np.flatnonzero(low)
+    cmd[want[:potions]] = POTION  # 共有のポーションは前の人から使う
+    return cmd
+
+
+def enemy_commands(rng, ent, enemies):
+    """enemy_ai と同じ確率を敵1体ずつに適用する"""
+    k = enemies.size
+    low = ent.hp[enemies] <= ent.hp_max[enemies] * ENEMY_HEAL_HP
+    heal = low & (rng.random(k) < ENEMY_HEAL_RATE)
+    attack = rng.random(k) < ENEMY_ATTACK_RATE
+    return np.where(heal, HEAL, np.where(attack, ATTACK, GUARD))
+
+
+def play_turn(rng, ent, item):
+    """1ターン（味方全員 → 敵全員）を進める。どちらかが全滅したら勝った側を返す（続くなら None）"""
+    party, enemies = ent.alive(PARTY), ent.alive(ENEMY)
+    cmd = party_commands(ent, party, item["num"])
+    who = party[cmd == ATTACK]
+    resolve_attacks(rng, ent, who, enemies[rng.integers(0, enemies.size, size=who.size)])
+    heal_self(rng, ent, party[cmd == HEAL])
+    drink = party[cmd == POTION]
+    ent.hp[drink] = np.minimum(ent.hp_max[drink], ent.hp[drink] + item["heal"])
+    item["num"] -= drink.size
+    enemies = ent.alive(ENEMY)
+    if enemies.size == 0:
+        return PARTY
+
+    cmd = enemy_commands(rng, ent, enemies)
+    who = enemies[cmd == ATTACK]
+    party = ent.alive(PARTY)
+    resolve_attacks(rng, ent, who, party[rng.integers(0, party.size, size=who.size)])
+    heal_self(rng, ent, enemies[cmd == HEAL])
+    ent.guard[enemies[cmd == GUARD]] = True
+    if ent.alive(PARTY).size == 0:
+        return ENEMY
+    return None
+
+
+def encounter(rng, ent, item, max_turns=MAX_TURNS):
+    """どちらかが全滅するまで戦う。(勝った側, ターン数)。打ち切りなら勝者は None"""
+    for turn in range(1, max_turns + 1):
+        winner = play_turn(rng, ent, item)
+        if winner is not None:
+            return winner, turn
+    return None, max_turns
+
+
+def floor_enemy(base, floor):
+    """階が深いほど強い敵（HP+10%/階、攻撃力+1/2階）"""
+    up = (floor - 1) // 2
+    hp = int(base["hp_max"] * (1 + 0.1 * (floor - 1)))
+    return dict(base, hp=hp, hp_max=hp, atk=(base["atk"][0] + up, base["atk"][1] + up))
+
+
+def dungeon_run(player, enemy, item, party_size=3, enemies=2, floors=5, loot=1, seed=None):
+    """階ごとに敵の群れと戦い、HPとポーションを持ち越して進む。階ごとの結果のリストを返す"""
+    rng = np.random.default_rng(seed)
+    item = dict(item)
+    ent = Entities()
+    ent.add(PARTY, player, names=[player["name"]])
+    if party_size > 1:
+        ent.add(PARTY, dict(player, name="仲間"), n=party_size - 1)
+    log = []
+    for floor in range(1, floors + 1):
+        ent.add(ENEMY, floor_enemy(enemy, floor), n=enemies)
+        winner, turns = encounter(rng, ent, item)
+        party = ent.alive(PARTY)
+        log.append({"floor": floor, "winner": winner, "turns": turns,
+                    "alive": [ent.names[i] for i in party], "hp": ent.hp[party].tolist(),
+                    "potions": item["num"]})
+        if winner != PARTY:
+            break
+        ent.keep(ent.team == PARTY)  # 倒した敵を片付ける（倒れた仲間はHP0のまま残る）
+        item["num"] += loot
+    return log
+
+
+def benchmark(counts=(2, 8, 32, 128, 512, 2048, 8192), turns=200, seed=0):
+    """キャラ数（味方と敵が半分ずつ）を増やしたときの1ターンあたりの時間"""
+    from app import default_stats
+
+    player, enemy, item = default_stats()
+    big = 10 ** 9  # 誰も倒れないようにしてターン数をそろえる
+    rows = []
+    for n in counts:
+        rng = np.random.default_rng(seed)
+        ent = Entities()
+        ent.add(PARTY, dict(player, hp=big, hp_max=big), n=n // 2)
+        ent.add(ENEMY, dict(enemy, hp=big, hp_max=big), n=n - n // 2)
+        it = dict(item)
+        start = time.perf_counter()
+        for _ in range(turns):
+            play_turn(rng, ent, it)
+        per_turn = (time.perf_counter() - start) / turns
+        rows.append((n, per_turn))
+    return rows
+
+
+def main(argv=None):
+    from app import default_stats
+
+    parser = argparse.ArgumentParser(prog="app.py dungeon", description="Day03: 複数の敵・仲間とのダンジョン")
+    parser.add_argument("--party", type=int, default=3, help="味方の人数（あなたを含む）")
+    parser.add_argument("--enemies", type=int, default=2, help="1階あたりの敵の数")
+    parser.add_argument("--floors", type=int, default=5, help="階数")
+    parser.add_argument("--loot", type=int, default=1, help="1階クリアごとに拾うポーションの数")
+    parser.add_argument("--seed", type=int, default=None, help="乱数シード")
+    parser.add_argument("--bench", action="store_true", help="キャラ数ごとの1ターンの処理時間を測る")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        print(f"{'キャラ数':>8}{'1ターン':>12}{'1体あたり':>12}")
+        for n, t in benchmark():
+            print(f"{n:>10,}{t*1e6:>10.1f}µs{t/n*1e9:>10.0f}ns")
+        return
+
+    if args.party < 1 or args.enemies < 1 or args.floors < 1:
+        print("味方と敵は1体以上、階数は1以上にしてください。")
+        return
+    player, enemy, item = default_stats()
+    log = dungeon_run(player, enemy, item, args.party, args.enemies, args.floors, args.loot, args.seed)
+    for r in log:
+        result = "突破" if r["winner"] == PARTY else "全滅…" if r["winner"] == ENEMY else "決着つかず"
+        members = " ".join(f"{name}:{hp}" for name, hp in zip(r["alive"], r["hp"]))
+        print(f"B{r['floor']}F  {result:<6}{r['turns']:>4}ターン  残り [{members}]  ポーション {r['potions']}")
+    if log[-1]["winner"] == PARTY:
+        print(f"🏆 {len(log)}階すべて突破！")
+
+
+if __name__ == "__main__":
+    main()
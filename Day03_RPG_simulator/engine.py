@@ -0,0 +1,310 @@
+# Day03: 画面なしで大量のバトルをまとめて回すエンジン
+# app.py の battle() と同じルールを、print/input なしで動かす。
+#   - run_batch(): 何千〜何百万のバトルを NumPy 配列で同時に1ターンずつ進める
+#   - run_one():   1戦だけを __slots__ のクラスで軽く回す（デバッグや確認用）
+# プレイヤーのコマンドは choose_command() の代わりに「方針(policy)」関数で決める。
+import random
+import time
+
+import numpy as np
+
+import events
+
+# コマンド番号（app.py の "a"/"h"/"g"/"p" に対応）
+ATTACK, HEAL, GUARD, POTION = 0, 1, 2, 3
+COMMANDS = "ahgp"
+
+MISS_RATE = 0.05      # 5%でミス
+CRIT_RATE = 0.10      # 10%でクリティカル
+CRIT_MULT = 1.5
+ENEMY_HEAL_HP = 0.35  # 敵はHPがこの割合以下なら
+ENEMY_HEAL_RATE = 0.3  # この確率で回復
+ENEMY_ATTACK_RATE = 0.9  # それ以外は攻撃90% / 防御10%
+MAX_TURNS = 1000      # 回復し合って終わらないときの打ち切り
+
+
+# ---------------------------
+# 1戦ずつ回す軽量版
+# ---------------------------
+class Fighter:
+    __slots__ = ("name", "hp", "hp_max", "atk_lo", "atk_hi", "heal_lo", "heal_hi", "guard")
+
+    def __init__(self, d):
+        """app.py と同じ形の辞書から作る"""
+        self.name = d["name"]
+        self.hp = d["hp"]
+        self.hp_max = d["hp_max"]
+        self.atk_lo, self.atk_hi = d["atk"]
+        self.heal_lo, self.heal_hi = d.get("heal", (8, 14))
+        self.guard = d.get("guard", False)
+
+
+class Item:
+    __slots__ = ("name", "heal", "num")
+
+    def __init__(self, d):
+        self.name = d["name"]
+        self.heal = d["heal"]
+        self.num = d["num"]
+
+
+def _attack(rng, attacker, defender, trace=None):
+    if rng.random() < MISS_RATE:
+        if trace is not None:
+            trace.emit(events.MISS, attacker, 0, defender.hp)
+        return 0
+    base = rng.randint(attacker.atk_lo, attacker.atk_hi)
+    if rng.random() < CRIT_RATE:
+        base = int(base * CRIT_MULT)
+        if trace is not None:
+            trace.emit(events.CRIT, attacker, base, defender.hp)
+    dmg = base // 2 if defender.guard else base
+    defender.hp = max(0, defender.hp - dmg)
+    defender.guard = False
+    if trace is not None:
+        trace.emit(events.ATTACK, attacker, dmg, defender.hp)
+    return dmg
+
+
+def _heal(rng, target, trace=None):
+    before = target.hp
+    target.hp = min(target.hp_max, target.hp + rng.randint(target.heal_lo, target.heal_hi))
+    if trace is not None:
+        trace.emit(events.HEAL, target, target.hp - before, target.hp)
+
+
+def _enemy_command(rng, enemy):
+    if enemy.hp <= enemy.hp_max * ENEMY_HEAL_HP and rng.random() < ENEMY_HEAL_RATE:
+        return HEAL
+    return ATTACK if rng.random() < ENEMY_ATTACK_RATE else GUARD
+
+
+def run_one(player, enemy, item, choose, seed=None, max_turns=MAX_TURNS, trace=None):
+    """1戦回して (勝ったか, ターン数) を返す。choose(player, enemy, item, rng) はコマンド番号を返す
+
+    choose に渡す rng は戦闘と同じ乱数なので、ランダムな方針でもシードだけで同じ戦闘になる。
+
+    trace に events.EventLog を渡すとイベントを記録する（None なら記録しない）。
+    seed を省いたときも実際に使ったシードを START イベントに残すので、同じ戦闘を再現できる。
+    """
+    if trace is not None and seed is None:
+        seed = random.getrandbits(63)
+    rng = random.Random(seed)
+    p, e, it = Fighter(player), Fighter(enemy), Item(item)
+    if trace is not None:
+        trace.begin(p, e, seed)
+    for turn in range(1, max_turns + 1):
+        cmd = choose(p, e, it, rng)
+        if trace is not None:
+            trace.turn = turn
+            trace.emit(events.COMMAND, p, cmd, p.hp)
+        if cmd == ATTACK:
+            _attack(rng, p, e, trace)
+        elif cmd == HEAL:
+            _heal(rng, p, trace)
+        elif cmd == GUARD:
+            p.guard = True
+            if trace is not None:
+                trace.emit(events.GUARD, p, 0, p.hp)
+        elif cmd == POTION and it.num > 0:
+            before = p.hp
+            p.hp = min(p.hp_max, p.hp + it.heal)
+            it.num -= 1
+            if trace is not None:
+                trace.emit(events.POTION, p, p.hp - before, p.hp)
+        if e.hp <= 0:
+            if trace is not None:
+                trace.emit(events.KO, e, 0, 0)
+            return True, turn
+
+        e_cmd = _enemy_command(rng, e)
+        if e_cmd == ATTACK:
+            _attack(rng, e, p, trace)
+        elif e_cmd == HEAL:
+            _heal(rng, e, trace)
+        else:
+            e.guard = True
+            if trace is not None:
+                trace.emit(events.GUARD, e, 0, e.hp)
+        if p.hp <= 0:
+            if trace is not None:
+                trace.emit(events.KO, p, 0, 0)
+            return False, turn
+    return False, max_turns
+
+
+# ---------------------------
+# まとめて回す版（NumPy）
+# ---------------------------
+class BattleState:
+    """進行中のバトルの状態を配列で持つ（1要素=1バトル）"""
+
+    def __init__(self, n, player, enemy, item):
+        self.p_max = player["hp_max"]
+        self.e_max = enemy["hp_max"]
+        self.p_atk = player["atk"]
+        self.e_atk = enemy["atk"]
+        self.p_heal = player.get("heal", (8, 14))
+        self.e_heal = enemy.get("heal", (8, 14))
+        self.item_heal = item["heal"]
+        self.turn = 0
+        self.ids = np.arange(n)
+        self.p_hp = np.full(n, player["hp"], dtype=np.int32)
+        self.e_hp = np.full(n, enemy["hp"], dtype=np.int32)
+        self.p_guard = np.full(n, player.get("guard", False), dtype=bool)
+        self.e_guard = np.full(n, enemy.get("guard", False), dtype=bool)
+        self.potions = np.full(n, item["num"], dtype=np.int32)
+
+    @property
+    def size(self):
+        return self.ids.size
+
+    def keep(self, mask):
+        """終わったバトルを取り除いて配列を詰める"""
+        self.ids = self.ids[mask]
+        self.p_hp = self.p_hp[mask]
+        self.e_hp = self.e_hp[mask]
+        self.p_guard = self.p_guard[mask]
+        self.e_guard = self.e_guard[mask]
+        self.potions = self.potions[mask]
+
+
+def _attack_batch(rng, mask, atk, hp, guard):
+    """mask のバトルで攻撃を解決（hp, guard をその場で書き換える）"""
+    k = hp.size
+    hit = mask & (rng.random(k) >= MISS_RATE)
+    base = rng.integers(atk[0], atk[1] + 1, size=k)
+    crit = rng.random(k) < CRIT_RATE
+    base = np.where(crit, (base * CRIT_MULT).astype(np.int32), base)
+    dmg = np.where(guard, base // 2, base)
+    np.subtract(hp, dmg, out=hp, where=hit)
+    np.maximum(hp, 0, out=hp)
+    guard &= ~hit  # 1回食らったら防御解除
+
+
+def _heal_batch(rng, mask, heal, hp, hp_max):
+    amt = rng.integers(heal[0], heal[1] + 1, size=hp.size)
+    np.add(hp, amt, out=hp, where=mask)
+    np.minimum(hp, hp_max, out=hp)
+
+
+def player_turn(rng, s, cmd):
+    """プレイヤーのコマンド配列 cmd を全バトルに適用"""
+    _attack_batch(rng, cmd == ATTACK, s.p_atk, s.e_hp, s.e_guard)
+    _heal_batch(rng, cmd == HEAL, s.p_heal, s.p_hp, s.p_max)
+    s.p_guard |= cmd == GUARD
+    drink = (cmd == POTION) & (s.potions > 0)
+    np.add(s.p_hp, s.item_heal, out=s.p_hp, where=drink)
+    np.minimum(s.p_hp, s.p_max, out=s.p_hp)
+    s.potions -= drink
+
+
+def enemy_commands(rng, s):
+    """enemy_ai と同じ確率で敵のコマンド配列を作る"""
+    k = s.size
+    heal = (s.e_hp <= s.e_max * ENEMY_HEAL_HP) & (rng.random(k) < ENEMY_HEAL_RATE)
+    attack = rng.random(k) < ENEMY_ATTACK_RATE
+    return np.where(heal, HEAL, np.where(attack, ATTACK, GUARD))
+
+
+def enemy_turn(rng, s, cmd):
+    _attack_batch(rng, cmd == ATTACK, s.e_atk, s.p_hp, s.p_guard)
+    _heal_batch(rng, cmd == HEAL, s.e_heal, s.e_hp, s.e_max)
+    s.e_guard |= cmd == GUARD
+
+
+# --- プレイヤーの方針（choose_command の代わり） ---
+def policy_attack(s, rng):
+    """ずっと攻撃"""
+    return np.full(s.size, ATTACK, dtype=np.int8)
+
+
+def policy_cautious(s, rng):
+    """HPが35%以下ならポーション、無ければ回復。それ以外は攻撃"""
+    low = s.p_hp <= s.p_max * 0.35
+    return np.where(low & (s.potions > 0), POTION, np.where(low, HEAL, ATTACK)).astype(np.int8)
+
+
+def policy_random(s, rng):
+    """4つのコマンドから等確率"""
+    return rng.integers(0, 4, size=s.size, dtype=np.int8)
+
+
+POLICIES = {"attack": policy_attack, "cautious": policy_cautious, "random": policy_random}
+
+
+# --- 同じ方針の1戦用（run_one に渡す） ---
+def choose_attack(p, e, item, rng):
+    return ATTACK
+
+
+def choose_cautious(p, e, item, rng):
+    low = p.hp <= p.hp_max * 0.35
+    if low and item.num > 0:
+        return POTION
+    return HEAL if low else ATTACK
+
+
+def choose_random(p, e, item, rng):
+    return rng.randrange(4)
+
+
+SCALAR_POLICIES = {"attack": choose_attack, "cautious": choose_cautious, "random": choose_random}
+
+
+def run_batch(n, player, enemy, item, policy=policy_cautious, seed=None, max_turns=MAX_TURNS, batch=1_000_000):
+    """n戦をまとめて回し、勝率やターン数の集計を返す
+
+    player/enemy/item は app.py の main() と同じ形の辞書。policy(state, rng) はコマンド番号の配列を返す。
+    """
+    rng = np.random.default_rng(seed)
+    wins = losses = 0
+    turns_hist = np.zeros(max_turns + 1, dtype=np.int64)
+    hp_left = 0
+    start = time.perf_counter()
+    done = 0
+    while done < n:
+        s = BattleState(min(batch, n - done), player, enemy, item)
+        while s.size and s.turn < max_turns:
+            s.turn += 1
+            player_turn(rng, s, policy(s, rng))
+            won = s.e_hp <= 0
+            if won.any():
+                wins += int(won.sum())
+                turns_hist[s.turn] += int(won.sum())
+                hp_left += int(s.p_hp[won].sum())
+                s.keep(~won)
+
+            enemy_turn(rng, s, enemy_commands(rng, s))
+            lost = s.p_hp <= 0
+            if lost.any():
+                losses += int(lost.sum())
+                turns_hist[s.turn] += int(lost.sum())
+                s.keep(~lost)
+        turns_hist[max_turns] += s.size  # 打ち切り
+        done += min(batch, n - done)
+    elapsed = time.perf_counter() - start
+
+    turns = np.arange(max_turns + 1)
+    return {
+        "battles": n,
+        "win_rate": wins / n,
+        "lose_rate": losses / n,
+        "timeout_rate": (n - wins - losses) / n,
+        "mean_turns": float((turns_hist * turns).sum()) / n,
+        "turns_hist": {int(t): int(c) for t, c in enumerate(turns_hist) if c},
+        "mean_hp_left": hp_left / wins if wins else 0.0,
+        "elapsed_sec": elapsed,
+        "battles_per_sec": n / elapsed if elapsed else float("inf"),
+    }
+
+
+def print_report(res, policy_name):
+    print(f"=== {res['battles']:,} 戦（方針: {policy_name}） ===")
+    print(f"勝率: {res['win_rate']*100:.2f}%  敗北: {res['lose_rate']*100:.2f}%"
+          f"  打ち切り: {res['timeout_rate']*100:.2f}%")
+    print(f"平均ターン数: {res['mean_turns']:.2f}  勝ったときの残りHP平均: {res['mean_hp_left']:.1f}")
+    print("ターン数の分布:")
+    for t, c in list(res["turns_hist"].items())[:12]:
+        print(f"  {t:>3}T: {c/res['battles']*100:6.2f}%")
+    print(f"速度: {res['battles_per_sec']*60/1e6:.1f} M 戦/分（{res['elapsed_sec']:.2f} 秒）")
@@ -0,0 +1,135 @@
+# Day03: 戦闘イベントの記録（リングバッファ）と再生
+# 使い方例:
+#   python app.py --trace trace.json      # 対戦のイベントを記録して保存
+#   python app.py --replay trace.json     # 同じ乱数シードとコマンドで対戦をそのまま再現
+#
+# do_attack() などは print せずにイベント（種類・誰が・値・残りHP）を EventLog に出すだけにして、
+# 文字の表示は TextRenderer という「購読者」の1つにする。記録は最初に確保した配列を
+# 使い回すリングバッファなので、何戦回しても一定のメモリで最新のイベントだけが残る。
+# 記録しないときは engine.run_one(trace=None) のように None を渡せば、判定1回ぶんの手間しかかからない。
+import json
+from array import array
+from collections import namedtuple
+
+# イベントの種類
+START, COMMAND, ATTACK, MISS, CRIT, GUARD, HEAL, POTION, NO_POTION, KO = range(10)
+KIND_NAMES = ("start", "command", "attack", "miss", "crit", "guard", "heal", "potion", "no_potion", "ko")
+
+# side: 0 = プレイヤー / 1 = 敵
+PLAYER, ENEMY = 0, 1
+
+Event = namedtuple("Event", "turn kind side value hp")
+
+
+class EventLog:
+    """固定長のリングバッファにイベントを記録し、購読者に配る
+
+    1イベント = (ターン, 種類, 誰が, 値, その後のHP)。値は種類によって
+    ダメージ量・回復量・コマンド番号・乱数シード（START）などになる。
+    """
+
+    __slots__ = ("capacity", "count", "turn", "names", "subscribers", "_side",
+                 "_turn", "_kind", "_who", "_value", "_hp")
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.count = 0        # これまでに出たイベントの総数（capacity を超えたら古いものから上書き）
+        self.turn = 0
+        self.names = ("", "")
+        self.subscribers = []
+        self._side = {}
+        self._turn = array("i", bytes(4 * capacity))
+        self._kind = array("b", bytes(capacity))
+        self._who = array("b", bytes(capacity))
+        self._value = array("q", bytes(8 * capacity))
+        self._hp = array("i", bytes(4 * capacity))
+
+    def subscribe(self, fn):
+        """fn(log, event) をイベントごとに呼ぶ"""
+        self.subscribers.append(fn)
+        return fn
+
+    def begin(self, player, enemy, seed):
+        """1戦の始まり。誰がどちら側かを覚え、乱数シードを START イベントに残す"""
+        self.names = (player["name"], enemy["name"]) if isinstance(player, dict) else (player.name, enemy.name)
+        self._side = {id(player): PLAYER, id(enemy): ENEMY}
+        self.turn = 0
+        self.emit(START, player, seed)
+
+    def emit(self, kind, who, value=0, hp=0):
+        """イベントを1つ記録する。who は app.py の辞書か engine の Fighter"""
+        i = self.count % self.capacity
+        side = self._side.get(id(who), PLAYER)
+        self._turn[i] = self.turn
+        self._kind[i] = kind
+        self._who[i] = side
+        self._value[i] = value
+        self._hp[i] = hp
+        self.count += 1
+        if self.subscribers:
+            ev = Event(self.turn, kind, side, value, hp)
+            for fn in self.subscribers:
+                fn(self, ev)
+
+    def events(self):
+        """残っているイベントを古い順に返す"""
+        n = min(self.count, self.capacity)
+        first = self.count - n
+        out = []
+        for k in range(first, self.count):
+            i = k % self.capacity
+            out.append(Event(self._turn[i], self._kind[i], self._who[i], self._value[i], self._hp[i]))
+        return out
+
+    def last_battle(self):
+        """最後の1戦ぶんのイベント（START から）。START が上書きされていたら None"""
+        evs = self.events()
+        for k in range(len(evs) - 1, -1, -1):
+            if evs[k].kind == START:
+                return evs[k:]
+        return None
+
+    def save(self, path):
+        """JSONで保存（1イベント = [ターン, 種類名, 誰が, 値, HP]）"""
+        rows = [[e.turn, KIND_NAMES[e.kind], e.side, e.value, e.hp] for e in self.events()]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"names": list(self.names), "dropped": max(0, self.count - self.capacity),
+                       "events": rows}, f, ensure_ascii=False)
+
+
+def load(path):
+    """save() したファイルを (名前のタプル, Event のリスト) で読む"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    kinds = {name: k for k, name in enumerate(KIND_NAMES)}
+    return tuple(data["names"]), [Event(t, kinds[k], s, v, hp) for t, k, s, v, hp in data["events"]]
+
+
+class TextRenderer:
+    """イベントを今までと同じ日本語の文で表示する購読者"""
+
+    def __call__(self, log, ev):
+        name = log.names[ev.side]
+        other = log.names[1 - ev.side]
+        if ev.kind == START:
+            print("--- バトル開始！ ---")
+        elif ev.kind == MISS:
+            print("ミス！")
+        elif ev.kind == CRIT:
+            print("クリティカル！")
+        elif ev.kind == ATTACK:
+            print(f"{name}の攻撃！{other}に{ev.value}のダメージ！")
+        elif ev.kind in (HEAL, POTION):
+            print(f"{name}は{ev.value}回復した")
+        elif ev.kind == NO_POTION:
+            print("ポーションがもうない！")
+        elif ev.kind == GUARD:
+            print(f"{name}は身を守っている（次のダメ半減）")
+        elif ev.kind == KO:
+            # KO は倒れた側で出す
+            print(f"{name}を倒した！" if ev.side == ENEMY else f"{name}は負けてしまった")
+
+
+def format_event(names, ev):
+    """デバッグ表示用の1行"""
+    return f"T{ev.turn:<4}{KIND_NAMES[ev.kind]:<10}{names[ev.side]:<10}value={ev.value:<6}hp={ev.hp}"
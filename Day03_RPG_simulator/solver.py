@@ -0,0 +1,243 @@
+# Day03: 最適な行動の計算（マルコフ決定過程 / 価値反復）
+# 使い方例:
+#   python solver.py                 # 既定ステータスで解いて optimal_policy.npz に保存
+#   python solver.py --scale 1 2     # HPを1倍/2倍にしたときの状態数と計算時間を表示
+#   python app.py --hint             # 対戦中に「おすすめ行動」と勝率を表示
+#   python app.py --ai               # 最適方針のAIに戦わせる
+#
+# 状態 = (プレイヤーHP, 敵HP, プレイヤー防御中か, 敵防御中か, ポーション残り)。
+# プレイヤーの番で4つの行動それぞれの「最終的に勝つ確率」を計算し、一番高いものを選ぶ。
+# 回復があるので状態はループする → 勝率が変わらなくなるまで価値反復で更新する。
+# t 回目の反復の値は「t ターン以内に勝つ確率」なので、ターン数つきの勝率も同じ計算で求まる。
+# ただしそのとき保存される行動は「残り t ターンのとき（1手目）」のものだけなので、
+# --horizon の表は別のファイルに保存し、--hint / --ai / --policy optimal には使わない。
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from engine import (ATTACK, COMMANDS, CRIT_MULT, CRIT_RATE, ENEMY_ATTACK_RATE, ENEMY_HEAL_HP,
+                    ENEMY_HEAL_RATE, GUARD, HEAL, MISS_RATE, POTION)
+
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "optimal_policy.npz")
+
+
+def damage_dist(atk):
+    """攻撃1回のダメージ分布 {ダメージ: 確率}（ミスは含まない。合計は 1-MISS_RATE）"""
+    lo, hi = atk
+    dist = {}
+    q = (1 - MISS_RATE) / (hi - lo + 1)
+    for base in range(lo, hi + 1):
+        for dmg, p in ((base, 1 - CRIT_RATE), (int(base * CRIT_MULT), CRIT_RATE)):
+            dist[dmg] = dist.get(dmg, 0.0) + q * p
+    return dist
+
+
+def params_key(player, enemy, item, horizon=None):
+    """ステータス（と horizon）から表のキー（ハッシュ）を作る"""
+    keys = {"player": [player["hp_max"], list(player["atk"]), list(player.get("heal", (8, 14)))],
+            "enemy": [enemy["hp_max"], list(enemy["atk"]), list(enemy.get("heal", (8, 14)))],
+            "item": [item["heal"], item["num"]],
+            "horizon": horizon}
+    return hashlib.sha1(json.dumps(keys, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def move_matrix(n, moves):
+    """長さnの軸で「値が delta だけ動く（0〜n-1に張り付く）」確率の行列 T[i, j]"""
+    T = np.zeros((n, n))
+    for delta, q in moves.items():
+        for i in range(n):
+            T[i, min(max(i + delta, 0), n - 1)] += q
+    return T
+
+
+def apply_axis(a, axis, T):
+    """out[..., i, ...] = Σ_j T[i, j] * a[..., j, ...]（axis 方向に行列をかける）"""
+    return np.moveaxis(np.moveaxis(a, axis, -1) @ T.T, -1, axis)
+
+
+def solve(player, enemy, item, tol=1e-10, max_iter=100_000, horizon=None):
+    """最適方針と勝率の表を返す
+
+    戻り値: (policy, value, info)
+      policy[p, e, pg, eg, k] = 最適な行動番号（ATTACK/HEAL/GUARD/POTION）
+      value[p, e, pg, eg, k]  = その状態から最適に戦ったときの勝率
+    horizon を指定すると value は「そのターン数以内に勝つ確率」の最大値、policy は残り horizon ターンの
+    ときの最適な行動になる（ターンごとには変わらない方針ではないので、1手目にだけ使える）。
+    HPの増減は軸ごとの遷移行列にまとめ、1回の更新を数回の行列積で済ませる。
+    """
+    P, E, K = player["hp_max"], enemy["hp_max"], item["num"]
+    shape = (P + 1, E + 1, 2, 2, K + 1)
+    p_dmg = damage_dist(player["atk"])
+    e_dmg = damage_dist(enemy["atk"])
+    p_lo, p_hi = player.get("heal", (8, 14))
+    e_lo, e_hi = enemy.get("heal", (8, 14))
+
+    # 敵の攻撃: プレイヤーHPの軸（防御なし / 防御中は半減）。ミスはそのまま
+    E_HIT = move_matrix(P + 1, {-d: q for d, q in e_dmg.items()})
+    E_HIT_G = move_matrix(P + 1, _halve(e_dmg))
+    E_HEAL = move_matrix(E + 1, {u: 1 / (e_hi - e_lo + 1) for u in range(e_lo, e_hi + 1)})
+    P_HIT = move_matrix(E + 1, {-d: q for d, q in p_dmg.items()})
+    P_HIT_G = move_matrix(E + 1, _halve(p_dmg))
+    P_HEAL = move_matrix(P + 1, {u: 1 / (p_hi - p_lo + 1) for u in range(p_lo, p_hi + 1)})
+    POTION_UP = np.minimum(np.arange(P + 1) + item["heal"], P)
+
+    # 敵が回復を考えるHPか（敵HPの軸に沿ったマスク）
+    e_low = (np.arange(E + 1) <= E * ENEMY_HEAL_HP).reshape(1, E + 1, 1, 1, 1)
+    e_heal_p = np.where(e_low, ENEMY_HEAL_RATE, 0.0)
+    e_atk_p = (1 - e_heal_p) * ENEMY_ATTACK_RATE
+    e_grd_p = (1 - e_heal_p) * (1 - ENEMY_ATTACK_RATE)
+
+    V = np.zeros(shape)
+    Q = np.empty((4,) + shape)
+    start = time.perf_counter()
+    iters = 0
+    limit = horizon if horizon is not None else max_iter
+    while iters < limit:
+        iters += 1
+
+        # --- 敵の番: A = プレイヤーの行動直後の状態の価値（敵がどう動くかの期待値） ---
+        atk = MISS_RATE * V
+        atk[:, :, 0] += apply_axis(V[:, :, 0], 0, E_HIT)
+        atk[:, :, 1] += apply_axis(V[:, :, 0], 0, E_HIT_G)  # 防御は解除される
+        heal = apply_axis(V, 1, E_HEAL)
+        grd = np.repeat(V[:, :, :, 1:2], 2, axis=3)
+        A = e_atk_p * atk + e_heal_p * heal + e_grd_p * grd
+        A[:, 0] = 1.0  # 敵が倒れた（プレイヤーの行動で決着）
+
+        # --- プレイヤーの番: 4つの行動の価値 ---
+        Q[ATTACK] = MISS_RATE * A
+        Q[ATTACK][:, :, :, 0] += apply_axis(A[:, :, :, 0], 1, P_HIT)
+        Q[ATTACK][:, :, :, 1] += apply_axis(A[:, :, :, 0], 1, P_HIT_G)
+        Q[HEAL] = apply_axis(A, 0, P_HEAL)
+        Q[GUARD] = np.repeat(A[:, :, 1:2], 2, axis=2)
+        Q[POTION] = A  # ポーションが無いときは何も起きない
+        if K > 0:
+            Q[POTION][..., 1:] = A[POTION_UP][..., :-1]
+
+        new_V = Q.max(axis=0)
+        new_V[0] = 0.0      # プレイヤーが倒れた
+        new_V[:, 0] = 1.0   # 敵が倒れた
+        delta = float(np.abs(new_V - V).max())
+        V = new_V
+        if horizon is None and delta < tol:
+            break
+    elapsed = time.perf_counter() - start
+
+    policy = Q.argmax(axis=0).astype(np.int8)
+    info = {
+        "states": int(np.prod(shape)),
+        "decision_states": int(P * E * 4 * (K + 1)),
+        "iterations": iters,
+        "solve_sec": elapsed,
+        "horizon": horizon,
+        "key": params_key(player, enemy, item, horizon),
+    }
+    return policy, V, info
+
+
+def _halve(dist):
+    """防御中（ダメージ半減）の移動量の分布"""
+    out = {}
+    for d, q in dist.items():
+        out[-(d // 2)] = out.get(-(d // 2), 0.0) + q
+    return out
+
+
+def save_table(path, policy, value, info):
+    np.savez_compressed(path, policy=policy, value=value.astype(np.float32), info=json.dumps(info))
+
+
+class PolicyTable:
+    """保存した表を読み込み、状態から O(1) で行動と勝率を引く"""
+
+    def __init__(self, policy, value):
+        self.policy = policy
+        self.value = value
+
+    @classmethod
+    def load_or_solve(cls, player, enemy, item, path=TABLE_PATH):
+        """ステータスが同じなら保存済みの表を使い、違えば解き直して保存する（ターン数の制限なしの表だけ使う）"""
+        key = params_key(player, enemy, item)
+        try:
+            with np.load(path) as data:
+                info = json.loads(str(data["info"]))
+                if info["key"] == key and info.get("horizon") is None:
+                    return cls(data["policy"], data["value"])
+        except (OSError, KeyError, ValueError):
+            pass
+        policy, value, info = solve(player, enemy, item)
+        save_table(path, policy, value, info)
+        return cls(policy, value)
+
+    def _index(self, player, enemy, item):
+        return (player["hp"], enemy["hp"], int(bool(player.get("guard"))),
+                int(bool(enemy.get("guard"))), item["num"])
+
+    def best(self, player, enemy, item):
+        """(おすすめコマンド文字 "a"/"h"/"g"/"p", 勝率)"""
+        i = self._index(player, enemy, item)
+        return COMMANDS[self.policy[i]], float(self.value[i])
+
+    def batch_policy(self, s, rng):
+        """engine.run_batch に渡せる方針（配列でまとめて引く）"""
+        return self.policy[s.p_hp, s.e_hp, s.p_guard.astype(np.intp), s.e_guard.astype(np.intp), s.potions]
+
+
+def horizon_path(horizon):
+    """--horizon の表の既定の保存先（ターン数の制限なしの表を上書きしないように）"""
+    root, ext = os.path.splitext(TABLE_PATH)
+    return f"{root}_h{horizon}{ext}"
+
+
+def scale_stats(d, k):
+    """HP関係の値をk倍にしたステータス（状態数の伸び方を見る用）"""
+    d = dict(d)
+    d["hp"] = d["hp"] * k
+    d["hp_max"] = d["hp_max"] * k
+    return d
+
+
+def main():
+    from app import default_stats
+
+    parser = argparse.ArgumentParser(description="Day03: 最適な行動の計算")
+    parser.add_argument("--output", default=None,
+                        help="表の保存先（既定は optimal_policy.npz、--horizon N のときは optimal_policy_hN.npz）")
+    parser.add_argument("--horizon", type=int, default=None, help="このターン数以内に勝つ確率を最大にする")
+    parser.add_argument("--scale", type=int, nargs="+", default=None, metavar="K",
+                        help="HPをK倍にしたときの状態数と計算時間を表示（保存はしない）")
+    args = parser.parse_args()
+
+    player, enemy, item = default_stats()
+    if args.scale:
+        print(f"{'HP倍率':>6}{'状態数':>12}{'反復':>8}{'計算時間':>12}{'勝率':>10}")
+        for k in args.scale:
+            p, e = scale_stats(player, k), scale_stats(enemy, k)
+            _, value, info = solve(p, e, item)
+            win = value[p["hp"], e["hp"], 0, 0, item["num"]]
+            print(f"{k:>6}{info['states']:>12,}{info['iterations']:>8}{info['solve_sec']*1e3:>10.1f}ms{win*100:>9.3f}%")
+        return
+
+    if args.horizon is not None and args.horizon < 1:
+        parser.error("--horizon は1以上にしてください。")
+    if args.output is None:
+        args.output = TABLE_PATH if args.horizon is None else horizon_path(args.horizon)
+    policy, value, info = solve(player, enemy, item, horizon=args.horizon)
+    save_table(args.output, policy, value, info)
+    win = value[player["hp"], enemy["hp"], 0, 0, item["num"]]
+    print(f"状態数: {info['states']:,}（プレイヤーの判断が要る状態 {info['decision_states']:,}）")
+    print(f"反復回数: {info['iterations']}  計算時間: {info['solve_sec']*1e3:.1f} ms")
+    if args.horizon is None:
+        print(f"開始時の勝率（最適に戦った場合）: {win*100:.3f}%")
+    else:
+        print(f"開始時に {args.horizon} ターン以内に勝つ確率（最適に戦った場合）: {win*100:.3f}%")
+    first = COMMANDS[policy[player["hp"], enemy["hp"], 0, 0, item["num"]]]
+    print(f"最初のおすすめ行動: {first}  →  {args.output} に保存しました。")
+
+
+if __name__ == "__main__":
+    main()
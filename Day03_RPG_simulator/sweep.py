@@ -0,0 +1,224 @@
+# Day03: ステータスのバランス調整用スイープ（複数プロセス + 結果のキャッシュ）
+# 使い方例:
+#   python app.py sweep --set e_hp=40:80:5 e_atk_hi=12:20            # 敵HPと敵の最大攻撃力を総当たり
+#   python app.py sweep --set p_hp=50:70:5 potion_num=0:5 --battles 20000 --target 0.7
+#   python app.py sweep --set e_hp=40:80:5 --csv sweep.csv            # 全セルをCSVに書き出す
+#
+# 範囲は「開始:終了:刻み」（終了を含む。刻みを省くと1）か「値,値,…」。指定しなかった項目は
+# app.py の default_stats() のまま。各セル（ステータスの組み合わせ）を engine.run_batch で
+# まとめて回し、結果を sweep_cache/results.jsonl に1行ずつ追記する。キーはパラメータのハッシュ
+# なので、途中で止めても範囲を広げても、計算済みのセルは読むだけで済む。
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import engine
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sweep_cache")
+CACHE_FILE = os.path.join(CACHE_DIR, "results.jsonl")
+
+# 項目名 -> (辞書の種類, キー, タプルの何番目か（Noneなら数値そのもの）)
+PARAMS = {
+    "p_hp": ("player", "hp_max", None),
+    "p_atk_lo": ("player", "atk", 0),
+    "p_atk_hi": ("player", "atk", 1),
+    "p_heal_lo": ("player", "heal", 0),
+    "p_heal_hi": ("player", "heal", 1),
+    "e_hp": ("enemy", "hp_max", None),
+    "e_atk_lo": ("enemy", "atk", 0),
+    "e_atk_hi": ("enemy", "atk", 1),
+    "e_heal_lo": ("enemy", "heal", 0),
+    "e_heal_hi": ("enemy", "heal", 1),
+    "potion_heal": ("item", "heal", None),
+    "potion_num": ("item", "num", None),
+}
+RESULT_KEYS = ("win_rate", "lose_rate", "timeout_rate", "mean_turns", "mean_hp_left")
+
+
+def parse_range(spec):
+    """ "p_hp=50:70:5" / "potion_num=0,2,4" → ("p_hp", [50, 55, 60, 65, 70])。同じ値は1つにまとめる"""
+    name, _, values = spec.partition("=")
+    if name not in PARAMS or not values:
+        raise ValueError(f"{spec}: 「項目=開始:終了[:刻み]」か「項目=値,値,…」で指定してください"
+                         f"（項目: {', '.join(PARAMS)}）")
+    if ":" in values:
+        parts = [int(x) for x in values.split(":")]
+        if len(parts) not in (2, 3) or (len(parts) == 3 and parts[2] <= 0):
+            raise ValueError(f"{spec}: 範囲は 開始:終了 か 開始:終了:刻み（刻みは1以上）です。")
+        lo, hi, step = parts[0], parts[1], parts[2] if len(parts) == 3 else 1
+        return name, list(range(lo, hi + 1, step))
+    return name, list(dict.fromkeys(int(x) for x in values.split(",")))
+
+
+def base_params(player, enemy, item):
+    """default_stats() の辞書を PARAMS の項目名の平らな辞書にする"""
+    src = {"player": player, "enemy": enemy, "item": item}
+    out = {}
+    for name, (who, key, idx) in PARAMS.items():
+        v = src[who].get(key, (8, 14)) if key == "heal" and who != "item" else src[who][key]
+        out[name] = v if idx is None else v[idx]
+    return out
+
+
+def build_stats(params):
+    """平らな辞書 → (player, enemy, item)（HPは満タンで開始）"""
+    player = {"name": "あなた", "hp": params["p_hp"], "hp_max": params["p_hp"],
+              "atk": (params["p_atk_lo"], params["p_atk_hi"]),
+              "heal": (params["p_heal_lo"], params["p_heal_hi"]), "guard": False}
+    enemy = {"name": "ゴブリン", "hp": params["e_hp"], "hp_max": params["e_hp"],
+             "atk": (params["e_atk_lo"], params["e_atk_hi"]),
+             "heal": (params["e_heal_lo"], params["e_heal_hi"]), "guard": False}
+    item = {"name": "ポーション", "heal": params["potion_heal"], "num": params["potion_num"]}
+    return player, enemy, item
+
+
+def valid(params):
+    """範囲が壊れている組み合わせ（下限>上限、HP0など）は飛ばす"""
+    return (params["p_hp"] > 0 and params["e_hp"] > 0 and params["potion_num"] >= 0
+            and all(params[f"{s}_lo"] <= params[f"{s}_hi"] for s in ("p_atk", "p_heal", "e_atk", "e_heal")))
+
+
+def cell_key(params, battles, policy, seed, max_turns):
+    """セルのキー（シミュレーションの条件も含めたハッシュ）"""
+    blob = json.dumps({"params": params, "battles": battles, "policy": policy, "seed": seed,
+                       "max_turns": max_turns}, sort_keys=True)
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+
+def load_cache(path=CACHE_FILE):
+    """キー -> 結果。書きかけの最終行（中断時）は読み飛ばす"""
+    cache = {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue
+                cache[row["key"]] = row
+    except OSError:
+        pass
+    return cache
+
+
+def _torn(path):
+    """ファイルが改行で終わっていなければ True"""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return False
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+def run_cell(key, params, battles, policy, max_turns):
+    """1セルを回す（ワーカープロセスで動く）。乱数はキーから作るので実行順に依存しない"""
+    player, enemy, item = build_stats(params)
+    res = engine.run_batch(battles, player, enemy, item, policy=engine.POLICIES[policy],
+                           seed=int(key[:16], 16), max_turns=max_turns)
+    row = {"key": key, "params": params}
+    row.update({k: res[k] for k in RESULT_KEYS})
+    return row
+
+
+def sweep(grid, base, battles=10000, policy="cautious", seed=0, max_turns=engine.MAX_TURNS,
+          workers=None, cache_path=CACHE_FILE, progress=True):
+    """grid = [(項目名, 値のリスト), ...] の総当たりを回し、(全セルの結果リスト, 新しく計算した数) を返す"""
+    names = [name for name, _ in grid]
+    cells = []
+    for values in itertools.product(*(vals for _, vals in grid)):
+        params = dict(base)
+        params.update(zip(names, values))
+        if valid(params):
+            cells.append((cell_key(params, battles, policy, seed, max_turns), params))
+
+    cache = load_cache(cache_path)
+    todo = list({key: params for key, params in cells if key not in cache}.items())  # 同じセルは1回だけ計算
+    os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+    if todo:
+        start = time.perf_counter()
+        with open(cache_path, "a", encoding="utf-8") as out:
+            if _torn(cache_path):
+                out.write("\n")  # 中断で書きかけになった行を閉じる
+
+            def done(row, k):
+                cache[row["key"]] = row
+                out.write(json.dumps(row, ensure_ascii=False) + "\n")
+                if k % 200 == 0:
+                    out.flush()  # 中断しても終わった分は残す
+                if progress and (k % 200 == 0 or k == len(todo)):
+                    rate = k / (time.perf_counter() - start)
+                    print(f"\r  {k:,}/{len(todo):,} セル（{rate:,.0f} セル/秒）", end="", flush=True)
+
+            if workers == 1:
+                for k, (key, params) in enumerate(todo, 1):
+                    done(run_cell(key, params, battles, policy, max_turns), k)
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    futures = [pool.submit(run_cell, key, params, battles, policy, max_turns)
+                               for key, params in todo]
+                    for k, fut in enumerate(as_completed(futures), 1):
+                        done(fut.result(), k)
+        if progress:
+            print()
+    return [cache[key] for key, _ in cells], len(todo)
+
+
+def main(argv=None):
+    from app import default_stats
+
+    parser = argparse.ArgumentParser(prog="app.py sweep", description="Day03: ステータスのバランス調整スイープ")
+    parser.add_argument("--set", nargs="+", default=[], metavar="項目=範囲",
+                        help=f"動かす項目と範囲（項目: {', '.join(PARAMS)}）")
+    parser.add_argument("--battles", type=int, default=10000, help="1セルあたりの戦闘数")
+    parser.add_argument("--policy", choices=sorted(engine.POLICIES), default="cautious", help="プレイヤーの方針")
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード（キャッシュのキーにも入る）")
+    parser.add_argument("--max-turns", type=int, default=engine.MAX_TURNS, help="1戦の打ち切りターン数")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="プロセス数（1なら並列化しない）")
+    parser.add_argument("--target", type=float, default=None, help="この勝率に近い順に表示（例: 0.7）")
+    parser.add_argument("--top", type=int, default=20, help="表示するセル数")
+    parser.add_argument("--csv", default=None, help="全セルの結果を書き出すCSV")
+    args = parser.parse_args(argv)
+    if args.battles < 1:
+        parser.error("--battles は1以上にしてください。")
+
+    try:
+        grid = [parse_range(s) for s in args.set]
+    except ValueError as e:
+        print(e)
+        return
+    start = time.perf_counter()
+    rows, computed = sweep(grid, base_params(*default_stats()), args.battles, args.policy, args.seed,
+                           args.max_turns, args.workers)
+    elapsed = time.perf_counter() - start
+    if not rows:
+        print("有効な組み合わせがありません。")
+        return
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8-sig") as f:
+            w = csv.writer(f)
+            w.writerow(list(PARAMS) + list(RESULT_KEYS))
+            for r in rows:
+                w.writerow([r["params"][k] for k in PARAMS] + [r[k] for k in RESULT_KEYS])
+
+    names = [name for name, _ in grid]
+    if args.target is not None:
+        rows = sorted(rows, key=lambda r: abs(r["win_rate"] - args.target))
+    print(f"=== {len(rows):,} セル × {args.battles:,} 戦（方針: {args.policy}） ===")
+    print("".join(f"{n:>12}" for n in names) + f"{'勝率':>9}{'平均T':>8}{'残りHP':>8}")
+    for r in rows[:args.top]:
+        print("".join(f"{r['params'][n]:>12}" for n in names)
+              + f"{r['win_rate']*100:>8.2f}%{r['mean_turns']:>8.2f}{r['mean_hp_left']:>8.1f}")
+    print(f"(新しく計算: {computed:,} セル / キャッシュ: {len(rows) - computed:,} セル / {elapsed:.1f} 秒)")
+    if args.csv:
+        print(f"{args.csv} に書き出しました。")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,65 +1,32 @@
 # app.py
-import secrets
-import string
 import streamlit as st
 
-AMBIGUOUS = "Il1O0"  # 紛らわしい文字
+# 生成ロジックは passgen.py（Streamlit なしの CLI / まとめて生成からも使う）
+from passgen import generate_password
+# 強さは「推測回数」で見積もる（辞書・キーボードの並び・日付などを見つける。strength.py）
+from strength import PATTERN_LABELS, crack_time, estimate
+# 漏えいパスワードの一覧（手元のファイル。BREACH_DB か breach/pwned.bin があるときだけ使う。breach.py）
+from breach import open_default as open_breach_db
 
-def build_pool(use_upper, use_lower, use_digits, use_symbols, exclude_ambiguous):
-    pools = []
-    if use_upper:
-        pools.append(string.ascii_uppercase)
-    if use_lower:
-        pools.append(string.ascii_lowercase)
-    if use_digits:
-        pools.append(string.digits)
-    if use_symbols:
-        pools.append("!@#$%^&*()-_=+[]{};:,<.>/?")
+LABELS = ["弱い", "やや弱い", "普通", "やや強い", "強い", "とても強い"]
 
-    pool = "".join(pools)
-    if exclude_ambiguous:
-        pool = "".join(ch for ch in pool if ch not in AMBIGUOUS)
-    return pools, pool
 
-def generate_password(length, use_upper, use_lower, use_digits, use_symbols, exclude_ambiguous):
-    pools, pool = build_pool(use_upper, use_lower, use_digits, use_symbols, exclude_ambiguous)
-    # 安全チェック
-    if not pool:
-        raise ValueError("文字の種類を1つ以上選んでください。")
-    need = len([p for p in (use_upper, use_lower, use_digits, use_symbols) if p])
-    if length < need:
-        raise ValueError(f"長さが短すぎます。選んだ種類の数（{need}）以上にしてください。")
-
-    # 各カテゴリから最低1文字ずつ
-    required = []
-    if use_upper:  required.append(secrets.choice(string.ascii_uppercase))
-    if use_lower:  required.append(secrets.choice(string.ascii_lowercase))
-    if use_digits: required.append(secrets.choice(string.digits))
-    if use_symbols: required.append(secrets.choice("!@#$%^&*()-_=+[]{};:,<.>/?"))
-
-    if exclude_ambiguous:
-        required = [c for c in required if c not in AMBIGUOUS] or [secrets.choice(pool)]
-
-    remain = [secrets.choice(pool) for _ in range(length - len(required))]
-    chars = required + remain
-
-    # シャッフル（secretsで安全に）
-    for i in range(len(chars) - 1, 0, -1):
-        j = secrets.randbelow(i + 1)
-        chars[i], chars[j] = chars[j], chars[i]
-    return "".join(chars)
-
-def score_password(pwd):
-    """超シンプル強度スコア（0〜4）"""
-    score = 0
-    if any(c.islower() for c in pwd): score += 1
-    if any(c.isupper() for c in pwd): score += 1
-    if any(c.isdigit() for c in pwd): score += 1
-    if any(c in "!@#$%^&*()-_=+[]{};:,<.>/?"
-           for c in pwd): score += 1
-    # 長さボーナス
-    if len(pwd) >= 16: score += 1
-    return min(score, 5)
+def show_strength(pwd):
+    r = estimate(pwd)
+    s = r["score"]
+    st.progress(s / 5)
+    st.write(f"強度の目安: **{LABELS[s]}**（推測回数 約 {r['guesses']:.2g} 回 / {r['bits']:.0f} ビット、"
+             f"1秒に100億回試されて {crack_time(r['guesses'])}）")
+    found = [m for m in r["sequence"] if m["pattern"] != "bruteforce"]
+    if found:
+        st.caption("見つかったパターン: " + "、".join(f"{PATTERN_LABELS[m['pattern']]}「{m['token']}」" for m in found))
+    db = open_breach_db()
+    if db is not None:
+        n = db.lookup(pwd)
+        if n:
+            st.error(f"⚠ 漏えいしたパスワードの一覧に載っています（{n:,} 回）。使わないでください。")
+        else:
+            st.caption("✅ 漏えいしたパスワードの一覧には見つかりませんでした（手元のファイルで確認）")
 
 # ===== Streamlit UI =====
 st.set_page_config(page_title="パスワード生成器", page_icon="🔐", layout="centered")
@@ -83,14 +50,16 @@ if submitted:
         pwd = generate_password(length, use_upper, use_lower, use_digits, use_symbols, exclude_ambiguous)
         st.success("パスワードを生成しました")
         st.code(pwd)  # コードブロックはコピーしやすい
-        s = score_password(pwd)
-        labels = ["弱い", "やや弱い", "普通", "やや強い", "強い", "とても強い"]
-        st.progress(s / 5)
-        st.write(f"強度の目安: **{labels[s]}**")
+        show_strength(pwd)
         st.download_button("テキストとして保存", data=pwd, file_name="password.txt")
     except ValueError as e:
         st.error(str(e))
 
+with st.expander("手持ちのパスワードの強さを調べる"):
+    mine = st.text_input("パスワード", type="password")
+    if mine:
+        show_strength(mine)
+
 with st.expander("使い方メモ"):
     st.markdown(
         "- **長さは16以上**がおすすめ\n"
@@ -0,0 +1,367 @@
+# Day04: 漏えいパスワードのオフライン確認（SHA-1 を並べ替えたバイナリファイル + メモリマップ）
+# 使い方例:
+#   python breach.py build pwned-passwords-sha1.txt -o breach/pwned.bin        # テキストから作る
+#   python breach.py build hashes.txt -o breach/pwned.bin --width 8 --bloom-bits 10
+#   python breach.py check "P@ssw0rd" "kT7#qP2!xW9m"                            # 調べる
+#   BREACH_DB=breach/pwned.bin streamlit run app.py                            # 画面でも調べる
+#
+# 元のテキストは1行1ハッシュ（"SHA1の16進40文字" か HIBP形式の "SHA1:件数"）。パスワードは外に送らない。
+# ファイル: ヘッダ + 先頭2バイトごとの開始位置の表(65537個) + (ハッシュ width バイト + 件数4バイト) の並び。
+# 調べるときはファイルをメモリマップで開き、先頭2バイトの範囲の中だけを二分探索する（全体は読まない）。
+# ブルームフィルタ（.bloom）があればメモリに読み込み、「確実に無い」ものは二分探索の前に返す。
+# .bloom には作ったときの本体の目印（ヘッダと開始位置の表の SHA-1 の先頭8バイト）を入れておき、
+# 本体を作り直して合わなくなった .bloom は使わない（古いフィルタで漏えい済みを「無い」と答えないように）。
+import argparse
+import hashlib
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+
+MAGIC = b"PWNSHA1\0"
+HEADER = struct.Struct("<8sIIQ")  # magic, version, width, count
+VERSION = 1
+BUCKETS = 1 << 16
+TABLE_SIZE = 8 * (BUCKETS + 1)
+COUNT_SIZE = 4
+DEFAULT_PATH = os.environ.get("BREACH_DB") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "breach", "pwned.bin")
+GOLDEN = 0x9E3779B97F4A7C15
+MASK64 = (1 << 64) - 1
+
+
+# ---------------------------
+# ブルームフィルタ（ハッシュの先頭8バイトから k か所を決める）
+# ---------------------------
+class Bloom:
+    """ビット配列 + k 個の位置。位置はダブルハッシュ h1 + i*h2（SHA-1 はもともと一様なので追加のハッシュは不要）"""
+
+    HEAD = struct.Struct("<8sQI8s")  # magic, m, k, 本体の目印
+    MAGIC = b"PWNBLOM2"
+
+    def __init__(self, bits, m, k, tag=b""):
+        self.bits = bits   # bytearray / NumPy uint8 配列
+        self.m = m         # ビット数
+        self.k = k
+        self.tag = tag     # どの本体のために作ったか（db_tag）
+
+    @staticmethod
+    def _h(prefix8):
+        h1 = int.from_bytes(prefix8, "little")
+        h2 = ((h1 * GOLDEN) & MASK64) | 1
+        return h1, h2
+
+    def __contains__(self, digest):
+        h1, h2 = self._h(digest[:8])
+        bits, m = self.bits, self.m
+        for i in range(self.k):
+            pos = ((h1 + i * h2) & MASK64) % m  # NumPy 側（uint64 で桁あふれ）と同じ計算にする
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    @classmethod
+    def build(cls, prefixes, m, k):
+        """prefixes: (n, 8) uint8 のハッシュの先頭8バイト（何回かに分けて add_many してもよい）"""
+        import numpy as np
+
+        bloom = cls(np.zeros((m + 7) // 8, dtype=np.uint8), m, k)
+        if prefixes is not None:
+            bloom.add_many(prefixes)
+        return bloom
+
+    def add_many(self, prefixes):
+        import numpy as np
+
+        h1 = np.ascontiguousarray(prefixes).view("<u8").ravel()
+        h2 = (h1 * np.uint64(GOLDEN)) | np.uint64(1)
+        m = np.uint64(self.m)
+        for i in range(self.k):
+            pos = (h1 + np.uint64(i) * h2) % m
+            np.bitwise_or.at(self.bits, (pos >> np.uint64(3)).astype(np.intp),
+                             (np.uint8(1) << (pos & np.uint64(7)).astype(np.uint8)))
+
+    def save(self, path):
+        """一時ファイルに書いてから置き換える（書きかけの .bloom が読まれないように）"""
+        with open(path + ".tmp", "wb") as f:
+            f.write(self.HEAD.pack(self.MAGIC, self.m, self.k, self.tag))
+            f.write(memoryview(self.bits))
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        """ファイル全体をメモリに読み込む（小さいので RAM に置いて使う）"""
+        with open(path, "rb") as f:
+            head = f.read(cls.HEAD.size)
+            if len(head) < cls.HEAD.size or head[:8] != cls.MAGIC:
+                raise ValueError(f"{path} はブルームフィルタのファイルではありません。")
+            magic, m, k, tag = cls.HEAD.unpack(head)
+            return cls(bytearray(f.read()), m, k, tag)
+
+
+def bloom_path(path):
+    return os.path.splitext(path)[0] + ".bloom"
+
+
+def db_tag(head):
+    """本体の目印：ヘッダ + 開始位置の表（件数と中身の分布が入る）の SHA-1 の先頭8バイト"""
+    return hashlib.sha1(head).digest()[:8]
+
+
+# ---------------------------
+# 調べる側
+# ---------------------------
+class BreachIndex:
+    """並べ替えたハッシュファイルをメモリマップで開いて二分探索する"""
+
+    def __init__(self, path, use_bloom=True):
+        import mmap
+
+        self.path = path
+        self.f = open(path, "rb")
+        self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.width, self.count = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} は漏えいハッシュのファイルではありません。")
+        self.rec = self.width + COUNT_SIZE
+        self.table = memoryview(self.mm)[HEADER.size:HEADER.size + TABLE_SIZE].cast("Q")
+        self.base = HEADER.size + TABLE_SIZE
+        self.bloom = self._load_bloom() if use_bloom else None
+
+    def _load_bloom(self):
+        """この本体のために作った .bloom なら読み込む。無い・古い・壊れていれば None（二分探索だけで調べる）"""
+        try:
+            bloom = Bloom.load(bloom_path(self.path))
+        except (OSError, ValueError, struct.error):
+            return None
+        return bloom if bloom.tag == db_tag(self.mm[:self.base]) else None
+
+    def close(self):
+        self.table.release()
+        self.mm.close()
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def lookup_digest(self, digest):
+        """SHA-1（20バイト）が載っていれば件数、無ければ 0"""
+        if self.bloom is not None and digest not in self.bloom:
+            return 0
+        key = digest[:self.width]
+        bucket = (digest[0] << 8) | digest[1]
+        lo, hi = self.table[bucket], self.table[bucket + 1]
+        mm, rec, base, width = self.mm, self.rec, self.base, self.width
+        while lo < hi:
+            mid = (lo + hi) // 2
+            off = base + mid * rec
+            h = mm[off:off + width]
+            if h < key:
+                lo = mid + 1
+            elif h > key:
+                hi = mid
+            else:
+                return int.from_bytes(mm[off + width:off + rec], "little") or 1
+        return 0
+
+    def lookup(self, password):
+        return self.lookup_digest(hashlib.sha1(password.encode("utf-8")).digest())
+
+
+_index = None
+
+
+def open_default():
+    """BREACH_DB（または breach/pwned.bin）があれば開く。無ければ None"""
+    global _index
+    if _index is None and os.path.exists(DEFAULT_PATH):
+        _index = BreachIndex(DEFAULT_PATH)
+    return _index
+
+
+# ---------------------------
+# 作る側（テキスト → 並べ替えたバイナリ）
+# ---------------------------
+def parse_chunk(data, width):
+    """テキストの塊（完全な行だけ）→ (ハッシュ (n, width) uint8, 件数 uint32)"""
+    import numpy as np
+
+    buf = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(buf == ord("\n"))
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    # 空行・短すぎる行は飛ばす（"\r\n" の行末にも対応）
+    ok = ends - starts >= 40
+    starts, ends = starts[ok], ends[ok]
+    ends = ends - (buf[np.maximum(ends - 1, 0)] == ord("\r"))
+
+    hexval = np.full(256, 255, dtype=np.uint8)
+    for i, ch in enumerate(b"0123456789abcdef"):
+        hexval[ch] = i
+    for i, ch in enumerate(b"ABCDEF"):
+        hexval[ch] = 10 + i
+    nib = hexval[buf[starts[:, None] + np.arange(2 * width)]]
+    good = (nib != 255).all(axis=1)
+    hashes = (nib[:, 0::2] << 4) | nib[:, 1::2]
+
+    # "HASH:件数" の件数（最大10桁）
+    has_count = (ends - starts > 41) & (buf[np.minimum(starts + 40, buf.size - 1)] == ord(":"))
+    digits = np.where(has_count, np.minimum(ends - starts - 41, 10), 0)
+    pos = starts[:, None] + 41 + np.arange(10)
+    raw = buf[np.minimum(pos, buf.size - 1)].astype(np.int64) - ord("0")
+    use = np.arange(10) < digits[:, None]
+    raw = np.where(use & (raw >= 0) & (raw <= 9), raw, 0)
+    scale = 10 ** np.maximum(digits[:, None] - 1 - np.arange(10), 0)
+    counts = np.where(use, raw * scale, 0).sum(axis=1)
+    counts = np.where(has_count, counts, 1).clip(0, 0xFFFFFFFF).astype(np.uint32)
+    return hashes[good], counts[good]
+
+
+def _records(hashes, counts, width):
+    import numpy as np
+
+    out = np.empty((hashes.shape[0], width + COUNT_SIZE), dtype=np.uint8)
+    out[:, :width] = hashes
+    out[:, width:] = counts.astype("<u4").view(np.uint8).reshape(-1, COUNT_SIZE)
+    return out
+
+
+def build(src, dst, width=20, bloom_bits=0, chunk_bytes=256 << 20, progress=True):
+    """テキストのハッシュ一覧から並べ替えたファイルを作る（大きなファイルでもメモリは一定）
+
+    1回目: 塊ごとに読んで、ハッシュの先頭1バイトで256個の一時ファイルに振り分ける。
+    2回目: 一時ファイルを1つずつ読み込んで並べ替え、重複をまとめて書き出す。
+    """
+    import numpy as np
+
+    if not 4 <= width <= 20:
+        raise ValueError("--width は 4〜20 バイトにしてください。")
+    if bloom_bits and width < 8:
+        raise ValueError("ブルームフィルタを使うときは --width 8 以上にしてください。")
+    start = time.perf_counter()
+    tmp = tempfile.mkdtemp(prefix="breach-", dir=os.path.dirname(os.path.abspath(dst)) or ".")
+    try:
+        parts = [open(os.path.join(tmp, f"{b:02x}.part"), "wb") for b in range(256)]
+        rest = b""
+        read = 0
+        total = os.path.getsize(src)
+        with open(src, "rb") as f:
+            while True:
+                chunk = f.read(chunk_bytes)
+                if chunk:
+                    data = rest + chunk
+                    cut = data.rfind(b"\n") + 1
+                    data, rest = data[:cut], data[cut:]
+                else:
+                    data, rest = (rest + b"\n" if rest.strip() else b""), b""  # 改行で終わらない最終行
+                if data:
+                    read += len(data)
+                    hashes, counts = parse_chunk(data, width)
+                    recs = _records(hashes, counts, width)
+                    recs = recs[np.argsort(recs[:, 0], kind="stable")]
+                    bounds = np.searchsorted(recs[:, 0], np.arange(257))
+                    for b in range(256):
+                        if bounds[b] < bounds[b + 1]:
+                            parts[b].write(recs[bounds[b]:bounds[b + 1]].tobytes())
+                    if progress:
+                        print(f"\r  振り分け {min(read, total) / max(total, 1) * 100:5.1f}%", end="", flush=True)
+                if not chunk:
+                    break
+        for p in parts:
+            p.close()
+
+        rec = width + COUNT_SIZE
+        table = np.zeros(BUCKETS + 1, dtype="<u8")
+        n = 0
+        bloom = None
+        if bloom_bits:
+            sizes = sum(os.path.getsize(p.name) for p in parts) // rec
+            m = max(64, bloom_bits * sizes)
+            k = max(1, round(bloom_bits * 0.693))
+            bloom = Bloom.build(None, m, k)
+        with open(dst + ".tmp", "wb") as out:
+            out.write(HEADER.pack(MAGIC, VERSION, width, 0))
+            out.write(table.tobytes())  # 後で書き直す
+            for b, p in enumerate(parts):
+                recs = np.fromfile(p.name, dtype=np.uint8).reshape(-1, rec)
+                os.remove(p.name)
+                if recs.size:
+                    key = np.ascontiguousarray(recs[:, :width]).view(f"S{width}").ravel()
+                    order = np.argsort(key, kind="stable")
+                    recs, key = recs[order], key[order]
+                    # 同じハッシュは1つにまとめ、件数を足す
+                    first = np.concatenate([[True], key[1:] != key[:-1]])
+                    counts = recs[:, width:].copy().view("<u4").ravel().astype(np.uint64)
+                    group = np.cumsum(first) - 1
+                    summed = np.bincount(group, weights=counts).clip(0, 0xFFFFFFFF).astype(np.uint32)
+                    recs = recs[first]
+                    recs[:, width:] = summed.astype("<u4").view(np.uint8).reshape(-1, COUNT_SIZE)
+                    # 先頭2バイトごとの開始位置
+                    b2 = recs[:, 1].astype(np.int64)
+                    table[(b << 8):(b << 8) + 257] = n + np.searchsorted(b2, np.arange(257))
+                    if bloom is not None:
+                        bloom.add_many(np.ascontiguousarray(recs[:, :8]))
+                    out.write(recs.tobytes())
+                    n += recs.shape[0]
+                else:
+                    table[(b << 8):(b << 8) + 257] = n
+                if progress and (b % 16 == 15):
+                    print(f"\r  並べ替え {(b + 1) / 256 * 100:5.1f}%  ", end="", flush=True)
+            table[BUCKETS] = n
+            head = HEADER.pack(MAGIC, VERSION, width, n) + table.tobytes()
+            out.seek(0)
+            out.write(head)
+        os.replace(dst + ".tmp", dst)
+        if bloom is not None:
+            bloom.tag = db_tag(head)
+            bloom.save(bloom_path(dst))
+        elif os.path.exists(bloom_path(dst)):
+            os.remove(bloom_path(dst))  # 前の本体の .bloom を残すと、載っているものを「無い」と答えてしまう
+        if progress:
+            print()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return n, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Day04: 漏えいパスワードのオフライン確認")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("build", help="SHA-1 の一覧（テキスト）から並べ替えたファイルを作る")
+    p.add_argument("src", help='1行1ハッシュ（"SHA1" または "SHA1:件数"）')
+    p.add_argument("-o", "--output", default=DEFAULT_PATH, help="作るファイル")
+    p.add_argument("--width", type=int, default=20, help="1件に残すハッシュのバイト数（4〜20。小さいほどファイルが小さい）")
+    p.add_argument("--bloom-bits", type=int, default=0, help="ブルームフィルタも作る（1件あたりのビット数。10で誤検出約1%%）")
+    p = sub.add_parser("check", help="パスワードが一覧に載っているか調べる")
+    p.add_argument("passwords", nargs="+")
+    p.add_argument("--db", default=DEFAULT_PATH, help="build で作ったファイル")
+    p.add_argument("--no-bloom", action="store_true", help="ブルームフィルタを使わない")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "build":
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        try:
+            n, sec = build(args.src, args.output, args.width, args.bloom_bits)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"{n:,} 件を {args.output} に書き出しました（{sec:.1f} 秒）")
+        return
+
+    if not os.path.exists(args.db):
+        print(f"ファイルが見つかりません: {args.db}（先に python breach.py build で作ってください）")
+        return 1
+    with BreachIndex(args.db, use_bloom=not args.no_bloom) as idx:
+        for pwd in args.passwords:
+            start = time.perf_counter()
+            n = idx.lookup(pwd)
+            us = (time.perf_counter() - start) * 1e6
+            status = f"⚠ 漏えいリストに載っています（{n:,} 回）" if n else "✅ 見つかりませんでした"
+            print(f"{pwd}: {status}  ({us:.1f} µs)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
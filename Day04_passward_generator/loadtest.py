@@ -0,0 +1,104 @@
+# Day04: server.py の負荷テスト（localhost）
+# 使い方例:
+#   python loadtest.py                                 # サーバーも自分で立てて 5秒間、同時 32接続
+#   python loadtest.py -c 64 -d 10 --count 100         # 1リクエストで100個ずつ
+#   python loadtest.py --strength                      # 強度スコアも付けてもらう
+#   python loadtest.py --url http://127.0.0.1:8765     # 別に起動した server.py に対して測る
+#
+# 接続ごとに keep-alive で「送る → 返事を全部読む」をくり返し、1回ごとの時間を記録して
+# p50 / p99 と 1秒あたりのリクエスト数を出す。
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+async def request(reader, writer, host, path, payload):
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n")[1:]:
+        k, _, v = line.partition(b":")
+        if k.strip().lower() == b"content-length":
+            length = int(v)
+    data = await reader.readexactly(length)
+    return status, data
+
+
+async def client(host, port, path, payload, until, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < until:
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, host, path, payload)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+def percentile(xs, q):
+    """xs（並べ替え済み）の q パーセンタイル（最近傍）"""
+    return xs[min(len(xs) - 1, int(len(xs) * q / 100))]
+
+
+async def run(url, connections, duration, payload, path="/generate"):
+    u = urlsplit(url)
+    host, port = u.hostname, u.port or 80
+    latencies, errors = [], []
+    start = time.perf_counter()
+    until = start + duration
+    await asyncio.gather(*(client(host, port, path, payload, until, latencies, errors)
+                           for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+async def run_local(connections, duration, payload):
+    """server.py を同じプロセスで立ち上げて測る"""
+    from server import serve
+
+    ready = asyncio.get_running_loop().create_future()
+    task = asyncio.create_task(serve("127.0.0.1", 0, ready=ready))
+    port = await ready
+    try:
+        return await run(f"http://127.0.0.1:{port}", connections, duration, payload)
+    finally:
+        task.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Day04: パスワードサービスの負荷テスト")
+    parser.add_argument("--url", default=None, help="測るサーバー（省略時は同じプロセスで立てる）")
+    parser.add_argument("-c", "--connections", type=int, default=32, help="同時接続数")
+    parser.add_argument("-d", "--duration", type=float, default=5.0, help="測る秒数")
+    parser.add_argument("-l", "--length", type=int, default=16)
+    parser.add_argument("--count", type=int, default=1, help="1リクエストで作る個数")
+    parser.add_argument("--symbols", action="store_true")
+    parser.add_argument("--strength", action="store_true", help="強度スコアも付ける")
+    args = parser.parse_args(argv)
+
+    payload = {"length": args.length, "count": args.count, "symbols": args.symbols, "strength": args.strength}
+    if args.url:
+        latencies, errors, elapsed = asyncio.run(run(args.url, args.connections, args.duration, payload))
+    else:
+        latencies, errors, elapsed = asyncio.run(run_local(args.connections, args.duration, payload))
+    if not latencies:
+        print("リクエストが1つも終わりませんでした。")
+        return
+    latencies.sort()
+    n = len(latencies)
+    print(f"リクエスト数 : {n:,}（エラー {len(errors):,}）  {elapsed:.1f}秒  同時接続 {args.connections}")
+    print(f"スループット : {n / elapsed:,.0f} req/s  （{n * args.count / elapsed:,.0f} パスワード/秒）")
+    print(f"レイテンシ   : p50 {percentile(latencies, 50) * 1e3:.2f}ms  p99 {percentile(latencies, 99) * 1e3:.2f}ms"
+          f"  平均 {statistics.fmean(latencies) * 1e3:.2f}ms  最大 {latencies[-1] * 1e3:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
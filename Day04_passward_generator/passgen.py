@@ -0,0 +1,219 @@
+# Day04: パスワード生成の本体（Streamlit なしでも使える）
+# 使い方例:
+#   python passgen.py                              # 16文字を1つ
+#   python passgen.py -n 100000 -l 20 --symbols -o passwords.txt
+#   python passgen.py -n 1000000 > /dev/null       # 標準出力へ流す（1行1パスワード）
+#   python passgen.py --bench                      # 1文字ずつ secrets で作る方法との速さ比較
+#
+# generate_batch() は N 個のパスワードをまとめて作る。乱数は os.urandom から大きな塊で読み
+# （EntropyPool）、1バイトを「文字集合の大きさ m の倍数」未満のときだけ使う（棄却サンプリング）
+# ので、どの文字も同じ確率で出る。「各種類を最低1文字」を満たさない行は丸ごと作り直すため、
+# 結果は条件を満たすパスワード全体からの一様な選び方になる。
+import argparse
+import os
+import secrets
+import string
+import sys
+import time
+
+AMBIGUOUS = "Il1O0"  # 紛らわしい文字
+SYMBOLS = "!@#$%^&*()-_=+[]{};:,<.>/?"
+CHUNK = 65536  # まとめて作る個数（この単位で書き出す）
+
+
+def build_pool(use_upper, use_lower, use_digits, use_symbols, exclude_ambiguous):
+    pools = []
+    if use_upper:
+        pools.append(string.ascii_uppercase)
+    if use_lower:
+        pools.append(string.ascii_lowercase)
+    if use_digits:
+        pools.append(string.digits)
+    if use_symbols:
+        pools.append(SYMBOLS)
+
+    pool = "".join(pools)
+    if exclude_ambiguous:
+        pool = "".join(ch for ch in pool if ch not in AMBIGUOUS)
+    return pools, pool
+
+
+def check_options(length, use_upper, use_lower, use_digits, use_symbols, exclude_ambiguous):
+    """文字集合を作り、長さが足りるか確かめる（ダメなら ValueError）"""
+    pools, pool = build_pool(use_upper, use_lower, use_digits, use_symbols, exclude_ambiguous)
+    # 安全チェック
+    if not pool:
+        raise ValueError("文字の種類を1つ以上選んでください。")
+    need = len([p for p in (use_upper, use_lower, use_digits, use_symbols) if p])
+    if length < need:
+        raise ValueError(f"長さが短すぎます。選んだ種類の数（{need}）以上にしてください。")
+    return pools, pool
+
+
+def generate_password(length, use_upper, use_lower, use_digits, use_symbols, exclude_ambiguous):
+    pools, pool = check_options(length, use_upper, use_lower, use_digits, use_symbols, exclude_ambiguous)
+    # 紛らわしい文字を除いた後の、カテゴリごとの文字
+    classes = [set(p) & set(pool) for p in pools]
+
+    # 全文字を文字集合から選び、どれかのカテゴリが欠けていたら作り直す。
+    # 「各カテゴリから1文字ずつ選んで混ぜる」方法だと、数字や記号が出すぎる（quality.py で検出できる）
+    while True:
+        chars = [secrets.choice(pool) for _ in range(length)]
+        if all(not c.isdisjoint(chars) for c in classes):
+            return "".join(chars)
+
+
+def score_password(pwd):
+    """超シンプル強度スコア（0〜4）"""
+    score = 0
+    if any(c.islower() for c in pwd): score += 1
+    if any(c.isupper() for c in pwd): score += 1
+    if any(c.isdigit() for c in pwd): score += 1
+    if any(c in SYMBOLS
+           for c in pwd): score += 1
+    # 長さボーナス
+    if len(pwd) >= 16: score += 1
+    return min(score, 5)
+
+
+# ---------------------------
+# まとめて生成（NumPy）
+# ---------------------------
+class EntropyPool:
+    """os.urandom から大きな塊で読んだバイト列を少しずつ切り出して使う"""
+
+    def __init__(self, block=1 << 20):
+        self.block = block
+        self.buf = b""
+        self.pos = 0
+
+    def take(self, n):
+        """n バイトを返す（足りなければ os.urandom で読み足す）"""
+        if self.pos + n > len(self.buf):
+            self.buf = self.buf[self.pos:] + os.urandom(max(self.block, n))
+            self.pos = 0
+        out = self.buf[self.pos:self.pos + n]
+        self.pos += n
+        return out
+
+    def below(self, m, n):
+        """0〜m-1 の一様な整数を n 個（uint8 配列、m <= 256）
+
+        1バイト(0〜255)のうち m の倍数ぶん（limit 未満）だけを使い、残りは捨てて引き直す。
+        単純に b % m とすると小さい値が出やすくなる（偏る）ため。
+        """
+        import numpy as np
+
+        limit = 256 - 256 % m
+        out = np.empty(n, dtype=np.uint8)
+        got = 0
+        while got < n:
+            want = n - got
+            # 捨てる割合を見込んで少し多めに読む
+            raw = np.frombuffer(self.take(want * 256 // limit + 64), dtype=np.uint8)
+            ok = raw[raw < limit][:want]
+            out[got:got + ok.size] = ok % m
+            got += ok.size
+        return out
+
+
+def generate_batch(n, length, use_upper=True, use_lower=True, use_digits=True, use_symbols=False,
+                   exclude_ambiguous=True, entropy=None):
+    """n 個のパスワードを (n, length) の uint8（ASCIIコード）配列で返す
+
+    各行は文字集合から一様に選び、選んだ種類がどれか欠けている行だけを作り直す。
+    文字列のリストが欲しいときは to_strings() を使う。
+    """
+    import numpy as np
+
+    pools, pool = check_options(length, use_upper, use_lower, use_digits, use_symbols, exclude_ambiguous)
+    entropy = entropy or EntropyPool()
+    chars = np.frombuffer(pool.encode("ascii"), dtype=np.uint8)
+    # 文字集合の各文字がどの種類か（除外した後の pool の並びで、種類ごとに1ビット）
+    bit = np.array([1 << next(k for k, p in enumerate(pools) if ch in p) for ch in pool], dtype=np.uint8)
+    full = (1 << len(pools)) - 1
+
+    out = np.empty((n, length), dtype=np.uint8)
+    todo = np.arange(n)
+    while todo.size:
+        idx = entropy.below(len(pool), todo.size * length).reshape(todo.size, length)
+        ok = np.bitwise_or.reduce(bit[idx], axis=1) == full
+        out[todo[ok]] = chars[idx[ok]]
+        todo = todo[~ok]
+    return out
+
+
+def to_strings(arr):
+    return [row.tobytes().decode("ascii") for row in arr]
+
+
+def write_batch(f, n, length, chunk=CHUNK, **options):
+    """n 個を1行ずつ f（バイナリ）に書く。CHUNK 個ずつ作って書くのでメモリは一定"""
+    import numpy as np
+
+    entropy = EntropyPool()
+    done = 0
+    while done < n:
+        k = min(chunk, n - done)
+        arr = generate_batch(k, length, entropy=entropy, **options)
+        lines = np.empty((k, length + 1), dtype=np.uint8)
+        lines[:, :length] = arr
+        lines[:, length] = ord("\n")
+        f.write(lines.tobytes())
+        done += k
+
+
+def bench(length=16, n=200_000, **options):
+    """1文字ずつ secrets で作る generate_password と、まとめて作る generate_batch の速さ比較"""
+    import numpy  # noqa: F401  読み込みの時間を測らないように先に読む
+
+    flags = (options.get("use_upper", True), options.get("use_lower", True), options.get("use_digits", True),
+             options.get("use_symbols", False), options.get("exclude_ambiguous", True))
+    slow_n = max(1, n // 100)
+    start = time.perf_counter()
+    for _ in range(slow_n):
+        generate_password(length, *flags)
+    slow = slow_n / (time.perf_counter() - start)
+    start = time.perf_counter()
+    with open(os.devnull, "wb") as f:
+        write_batch(f, n, length, **options)
+    fast = n / (time.perf_counter() - start)
+    print(f"generate_password（1文字ずつ）: {slow:>12,.0f} 個/秒")
+    print(f"generate_batch（まとめて）    : {fast:>12,.0f} 個/秒  （{fast / slow:,.0f} 倍）")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Day04: パスワードをまとめて生成（1行1個）")
+    parser.add_argument("-n", "--count", type=int, default=1, help="作る個数")
+    parser.add_argument("-l", "--length", type=int, default=16, help="長さ")
+    parser.add_argument("--no-upper", dest="use_upper", action="store_false", help="大文字 A-Z を使わない")
+    parser.add_argument("--no-lower", dest="use_lower", action="store_false", help="小文字 a-z を使わない")
+    parser.add_argument("--no-digits", dest="use_digits", action="store_false", help="数字 0-9 を使わない")
+    parser.add_argument("--symbols", dest="use_symbols", action="store_true", help="記号 !@#$... も使う")
+    parser.add_argument("--keep-ambiguous", dest="exclude_ambiguous", action="store_false",
+                        help="紛らわしい文字(I l 1 O 0)も使う")
+    parser.add_argument("-o", "--output", default=None, help="書き出すファイル（省略時は標準出力）")
+    parser.add_argument("--bench", action="store_true", help="1文字ずつ作る方法との速さ比較")
+    args = parser.parse_args(argv)
+
+    options = {k: getattr(args, k) for k in ("use_upper", "use_lower", "use_digits", "use_symbols",
+                                             "exclude_ambiguous")}
+    try:
+        check_options(args.length, **options)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.bench:
+        bench(args.length, **options)
+        return
+    if args.output:
+        # パスワードのファイルは自分だけが読めるように作る
+        fd = os.open(args.output, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            write_batch(f, args.count, args.length, **options)
+    else:
+        write_batch(sys.stdout.buffer, args.count, args.length, **options)
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
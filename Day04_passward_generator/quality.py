@@ -0,0 +1,295 @@
+# Day04: パスワード生成の速さと偏りの検査
+# 使い方例:
+#   python quality.py                                  # 速さの測定と偏りの検定（結果は表で表示）
+#   python quality.py --json result.json               # 結果を JSON でも書き出す（CI で比べる用）
+#   python quality.py --baseline result.json           # 前回より 30% 以上遅くなっていたら失敗
+#   python quality.py --samples 5000000 --skip-bench   # 偏りの検定だけ、サンプルを増やして
+#
+# 偏りの検定は「条件（各種類を最低1文字）を満たすパスワード全体から一様に選んでいる」場合の
+# 期待値と比べるカイ二乗検定。位置ごと（1文字目に何が出たか…）と種類ごと（大文字・数字…の割合）に
+# 数え、どれかの p 値が alpha / 検定数 を下回ったら「偏りあり」とする（ボンフェローニ補正）。
+# 比較用に「b % m で作る、わざと偏らせた生成器」も検定し、これを偏りありと見抜けることも確かめる。
+# どれかの検査に落ちると終了コード 1 を返す。
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+from itertools import combinations
+
+import numpy as np
+
+from passgen import EntropyPool, check_options, generate_batch, generate_password
+
+CONFIGS = {
+    "default": dict(use_upper=True, use_lower=True, use_digits=True, use_symbols=False, exclude_ambiguous=True),
+    "symbols": dict(use_upper=True, use_lower=True, use_digits=True, use_symbols=True, exclude_ambiguous=True),
+    "ambiguous": dict(use_upper=True, use_lower=True, use_digits=True, use_symbols=True, exclude_ambiguous=False),
+    "lower_digits": dict(use_upper=False, use_lower=True, use_digits=True, use_symbols=False,
+                         exclude_ambiguous=True),
+}
+BENCH_LENGTHS = (8, 16, 32, 64)
+SLOWDOWN = 0.30  # --baseline と比べてこれ以上遅くなったら失敗
+
+
+# ---------------------------
+# 期待値とカイ二乗検定
+# ---------------------------
+def _pools(options):
+    """紛らわしい文字を除いた後の、種類ごとの文字列のリストと文字集合全体"""
+    pools, pool = check_options(sum(options[k] for k in ("use_upper", "use_lower", "use_digits", "use_symbols")),
+                                **options)
+    return ["".join(c for c in p if c in pool) for p in pools], pool
+
+
+def covering(length, sizes, need):
+    """大きさ sizes の種類から length 文字並べたとき、need の種類を全部含む並べ方の数（包除原理）"""
+    total = sum(sizes)
+    count = 0
+    for r in range(len(need) + 1):
+        for drop in combinations(need, r):
+            count += (-1) ** r * (total - sum(sizes[k] for k in drop)) ** length
+    return count
+
+
+def expected_char_probs(length, options):
+    """1つの位置に文字集合の各文字が出る確率（条件を満たすパスワード全体から一様に選ぶとき）
+
+    どの位置でも同じ。種類 k の文字が1つの位置に来るとき、残りの length-1 文字で
+    k 以外の種類を全部含めばよいので、その数を全体の数で割る。
+    """
+    pools, pool = _pools(options)
+    sizes = [len(p) for p in pools]
+    everything = list(range(len(pools)))
+    valid = covering(length, sizes, everything)
+    per_class = [covering(length - 1, sizes, [j for j in everything if j != k]) / valid
+                 for k in everything]
+    probs = np.array([per_class[next(k for k, p in enumerate(pools) if ch in p)] for ch in pool])
+    return probs, pools, pool
+
+
+def chi2_sf(x, df):
+    """カイ二乗分布の上側確率 P(X >= x)（正則化された不完全ガンマ関数 Q(df/2, x/2)）"""
+    a, x = df / 2.0, x / 2.0
+    if x <= 0:
+        return 1.0
+    if x < a + 1:
+        # 級数で P を求めて 1 - P
+        term = total = 1.0 / a
+        n = a
+        while abs(term) > abs(total) * 1e-15:
+            n += 1
+            term *= x / n
+            total += term
+        return max(0.0, 1.0 - total * math.exp(-x + a * math.log(x) - math.lgamma(a)))
+    # 連分数で Q を直接（Lentz 法）
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 10_000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return math.exp(-x + a * math.log(x) - math.lgamma(a)) * h
+
+
+def chi_square(observed, expected):
+    """(カイ二乗値, 自由度, p値)"""
+    observed = np.asarray(observed, dtype=np.float64)
+    expected = np.asarray(expected, dtype=np.float64)
+    stat = float(((observed - expected) ** 2 / expected).sum())
+    df = observed.size - 1
+    return stat, df, chi2_sf(stat, df)
+
+
+def to_indices(arr, pool):
+    """(n, L) の ASCII 配列 → 文字集合の中の番号（集合にない文字は -1）"""
+    lut = np.full(256, -1, dtype=np.int16)
+    lut[np.frombuffer(pool.encode("ascii"), dtype=np.uint8)] = np.arange(len(pool))
+    return lut[arr]
+
+
+def uniformity(arr, length, options):
+    """パスワードの配列 arr を検定して、検定ごとの結果のリストと「集合外の文字」「種類の欠け」の数を返す"""
+    probs, pools, pool = expected_char_probs(length, options)
+    idx = to_indices(arr, pool)
+    n = arr.shape[0]
+    outside = int((idx < 0).sum())
+    idx = np.where(idx < 0, 0, idx)
+    cls = np.array([next(k for k, p in enumerate(pools) if ch in p) for ch in pool])
+    missing = int(sum((~(cls[idx] == k).any(axis=1)).sum() for k in range(len(pools))))
+
+    tests = []
+    counts = np.stack([np.bincount(idx[:, pos], minlength=len(pool)) for pos in range(length)])
+    for pos in range(length):
+        stat, df, p = chi_square(counts[pos], probs * n)
+        tests.append({"test": f"position[{pos}]", "chi2": stat, "df": df, "p": p})
+    total = counts.sum(axis=0)
+    stat, df, p = chi_square(total, probs * n * length)
+    tests.append({"test": "characters", "chi2": stat, "df": df, "p": p})
+    per_class = np.bincount(cls, weights=total, minlength=len(pools))
+    expect_class = np.bincount(cls, weights=probs, minlength=len(pools)) * n * length
+    if len(pools) > 1:
+        stat, df, p = chi_square(per_class, expect_class)
+        tests.append({"test": "classes", "chi2": stat, "df": df, "p": p})
+    return tests, outside, missing
+
+
+# ---------------------------
+# 検定する生成器
+# ---------------------------
+def sample_batch(n, length, options):
+    return generate_batch(n, length, **options)
+
+
+def sample_password(n, length, options):
+    flags = [options[k] for k in ("use_upper", "use_lower", "use_digits", "use_symbols", "exclude_ambiguous")]
+    text = "".join(generate_password(length, *flags) for _ in range(n))
+    return np.frombuffer(text.encode("ascii"), dtype=np.uint8).reshape(n, length)
+
+
+def sample_modulo(n, length, options):
+    """わざと偏らせた生成器（1バイトを b % m で使う）。検定がこれを見抜けるかの確認用"""
+    pools, pool = _pools(options)
+    chars = np.frombuffer(pool.encode("ascii"), dtype=np.uint8)
+    cls = np.array([next(k for k, p in enumerate(pools) if ch in p) for ch in pool])
+    entropy = EntropyPool()
+    out = np.empty((n, length), dtype=np.uint8)
+    todo = np.arange(n)
+    while todo.size:
+        raw = np.frombuffer(entropy.take(todo.size * length), dtype=np.uint8).reshape(todo.size, length)
+        idx = raw % len(pool)
+        ok = np.all([(cls[idx] == k).any(axis=1) for k in range(len(pools))], axis=0)
+        out[todo[ok]] = chars[idx[ok]]
+        todo = todo[~ok]
+    return out
+
+
+GENERATORS = {
+    # 名前: (作り方, 偏りがない前提か, サンプル数の倍率)
+    "generate_batch": (sample_batch, True, 1.0),
+    "generate_password": (sample_password, True, 0.05),  # 1文字ずつなので少なめ
+    "modulo(control)": (sample_modulo, False, 1.0),
+}
+
+
+def run_uniformity(samples, length=16, configs=("default", "symbols"), alpha=1e-3):
+    results = []
+    for name, (sample, unbiased, scale) in GENERATORS.items():
+        for config in configs:
+            options = CONFIGS[config]
+            n = max(1000, int(samples * scale))
+            start = time.perf_counter()
+            arr = sample(n, length, options)
+            tests, outside, missing = uniformity(arr, length, options)
+            limit = alpha / len(tests)
+            worst = min(tests, key=lambda t: t["p"])
+            biased = worst["p"] < limit or outside > 0 or missing > 0
+            results.append({
+                "generator": name, "config": config, "length": length, "samples": n,
+                "seconds": time.perf_counter() - start, "alpha": alpha, "threshold": limit,
+                "min_p": worst["p"], "worst_test": worst["test"], "outside_pool": outside,
+                "missing_class": missing, "biased": biased, "expect_biased": not unbiased,
+                "ok": biased != unbiased, "tests": tests,
+            })
+    return results
+
+
+# ---------------------------
+# 速さ
+# ---------------------------
+def run_bench(lengths=BENCH_LENGTHS, configs=CONFIGS, seconds=0.5):
+    """長さ・文字集合ごとの1秒あたりの生成数（generate_password と generate_batch）"""
+    flags_of = lambda o: [o[k] for k in ("use_upper", "use_lower", "use_digits", "use_symbols",
+                                         "exclude_ambiguous")]
+    results = []
+    for config in configs:
+        options = CONFIGS[config]
+        for length in lengths:
+            for name, make in (("generate_password", lambda: generate_password(length, *flags_of(options))),
+                               ("generate_batch", lambda: generate_batch(65536, length, **options))):
+                per_call = 65536 if name == "generate_batch" else 1
+                make()  # 1回目（読み込みなど）は測らない
+                done = 0
+                start = time.perf_counter()
+                while time.perf_counter() - start < seconds:
+                    make()
+                    done += per_call
+                elapsed = time.perf_counter() - start
+                results.append({"generator": name, "config": config, "length": length,
+                                "per_sec": done / elapsed, "mb_per_sec": done * length / elapsed / 1e6})
+    return results
+
+
+def compare(bench, baseline, slowdown=SLOWDOWN):
+    """前回の結果と比べて、遅くなりすぎた項目のリスト"""
+    before = {(r["generator"], r["config"], r["length"]): r["per_sec"] for r in baseline.get("bench", [])}
+    worse = []
+    for r in bench:
+        old = before.get((r["generator"], r["config"], r["length"]))
+        if old and r["per_sec"] < old * (1 - slowdown):
+            worse.append(dict(r, baseline_per_sec=old, ratio=r["per_sec"] / old))
+    return worse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Day04: パスワード生成の速さと偏りの検査")
+    parser.add_argument("--samples", type=int, default=2_000_000, help="偏りの検定に使うパスワードの数")
+    parser.add_argument("-l", "--length", type=int, default=16, help="偏りの検定に使う長さ")
+    parser.add_argument("--alpha", type=float, default=1e-3, help="有意水準（検定全体で）")
+    parser.add_argument("--seconds", type=float, default=0.5, help="速さの測定1項目あたりの秒数")
+    parser.add_argument("--skip-bench", action="store_true", help="速さを測らない")
+    parser.add_argument("--skip-uniformity", action="store_true", help="偏りを検定しない")
+    parser.add_argument("--json", default=None, help="結果を書き出す JSON ファイル（- で標準出力）")
+    parser.add_argument("--baseline", default=None, help="比べる前回の JSON")
+    args = parser.parse_args(argv)
+    out = sys.stderr if args.json == "-" else sys.stdout  # JSON を標準出力に出すときは、表は標準エラーへ
+
+    report = {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+              "created": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    failed = False
+    if not args.skip_uniformity:
+        report["uniformity"] = run_uniformity(args.samples, args.length, alpha=args.alpha)
+        print(f"{'生成器':<20}{'設定':<10}{'個数':>11}{'最小p値':>11}  {'結果'}", file=out)
+        for r in report["uniformity"]:
+            verdict = "偏りあり" if r["biased"] else "偏りなし"
+            mark = "OK" if r["ok"] else "NG"
+            print(f"{r['generator']:<20}{r['config']:<10}{r['samples']:>12,}{r['min_p']:>11.2e}  "
+                  f"{mark} {verdict}（{r['worst_test']}）", file=out)
+            failed |= not r["ok"]
+    if not args.skip_bench:
+        report["bench"] = run_bench(seconds=args.seconds)
+        print(f"\n{'生成器':<20}{'設定':<14}{'長さ':>4}{'個/秒':>16}", file=out)
+        for r in report["bench"]:
+            print(f"{r['generator']:<20}{r['config']:<14}{r['length']:>5}{r['per_sec']:>16,.0f}", file=out)
+        if args.baseline:
+            with open(args.baseline, encoding="utf-8") as f:
+                worse = compare(report["bench"], json.load(f))
+            report["regressions"] = worse
+            for r in worse:
+                print(f"遅くなった: {r['generator']} {r['config']} 長さ{r['length']}  "
+                      f"{r['baseline_per_sec']:,.0f} → {r['per_sec']:,.0f} 個/秒（{r['ratio']:.0%}）", file=out)
+            failed |= bool(worse)
+    report["ok"] = not failed
+    if args.json == "-":
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=1)
+        print()
+    elif args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
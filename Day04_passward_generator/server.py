@@ -0,0 +1,252 @@
+# Day04: パスワード生成のローカルHTTPサービス（asyncio / JSON）
+# 使い方例:
+#   python server.py                                   # http://127.0.0.1:8765 で待ち受け
+#   curl "http://127.0.0.1:8765/generate?length=20&symbols=1&count=3"
+#   curl -d '{"length": 16, "count": 1000, "strength": true}' http://127.0.0.1:8765/generate
+#   curl -d '{"passwords": ["P@ssw0rd", "kT7#qP2!xW9m"]}' http://127.0.0.1:8765/strength
+#   python loadtest.py                                 # 負荷テスト（p50/p99 と 1秒あたりのリクエスト数）
+#
+# 外部ライブラリなしで asyncio.start_server の上に最小限の HTTP/1.1（keep-alive 対応）を載せている。
+# 乱数は RefillingPool にためておき、残りが少なくなったら裏で os.urandom を呼んで足すので、
+# リクエストの処理中にシステムコールを待つことはない（使い切ったときだけその場で読む）。
+# 強さの採点（1個 0.4ms ほど × 最大1万個）は別スレッドで行い、その間も他の接続の応答を止めない。
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from passgen import EntropyPool, check_options, generate_batch, to_strings
+
+MAX_COUNT = 10_000      # 1リクエストで作れる個数の上限
+MAX_LENGTH = 256
+MAX_BODY = 1 << 20
+OPTION_KEYS = {"upper": "use_upper", "lower": "use_lower", "digits": "use_digits", "symbols": "use_symbols",
+               "exclude_ambiguous": "exclude_ambiguous"}
+DEFAULTS = {"use_upper": True, "use_lower": True, "use_digits": True, "use_symbols": False,
+            "exclude_ambiguous": True}
+
+
+class RefillingPool(EntropyPool):
+    """裏で補充される乱数バッファ
+
+    残りが low バイトを切ったら、イベントループとは別のスレッドで os.urandom(block) を呼んで足す。
+    take() は（使い切っていなければ）メモリからコピーするだけ。
+    """
+
+    def __init__(self, block=1 << 20, low=4 << 20, high=16 << 20):
+        super().__init__(block)
+        self.low = low
+        self.high = high
+        self.buf = bytearray(os.urandom(high))
+        self.pos = 0
+        self.misses = 0  # 補充が間に合わずその場で読んだ回数
+        self.refills = 0
+        self._wake = None
+
+    def available(self):
+        return len(self.buf) - self.pos
+
+    def take(self, n):
+        if self.available() < n:
+            self.misses += 1
+            self.buf += os.urandom(max(self.block, n))
+        out = bytes(self.buf[self.pos:self.pos + n])
+        self.pos += n
+        if self.pos >= self.high // 2:
+            del self.buf[:self.pos]  # 使い終わった前半を捨てる
+            self.pos = 0
+        if self._wake is not None and self.available() < self.low:
+            self._wake.set()
+        return out
+
+    async def refill_forever(self):
+        loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        while True:
+            if self.available() >= self.high:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            data = await loop.run_in_executor(None, os.urandom, self.block)
+            self.buf += data
+            self.refills += 1
+
+
+def _flag(v):
+    if isinstance(v, bool):
+        return v
+    return str(v).lower() in ("1", "true", "yes", "on")
+
+
+def parse_options(params):
+    """JSON / クエリのパラメータ → (length, count, options, strength)。おかしければ ValueError"""
+    try:
+        length = int(params.get("length", 16))
+        count = int(params.get("count", 1))
+    except (TypeError, ValueError):
+        raise ValueError("length と count は整数で指定してください。") from None
+    if not 1 <= length <= MAX_LENGTH:
+        raise ValueError(f"length は 1〜{MAX_LENGTH} にしてください。")
+    if not 1 <= count <= MAX_COUNT:
+        raise ValueError(f"count は 1〜{MAX_COUNT} にしてください。")
+    options = dict(DEFAULTS)
+    for key, name in OPTION_KEYS.items():
+        for k in (key, name):  # "symbols" でも "use_symbols" でもよい
+            if k in params:
+                options[name] = _flag(params[k])
+    check_options(length, **options)
+    return length, count, options, _flag(params.get("strength", False))
+
+
+class Service:
+    def __init__(self, pool):
+        self.pool = pool
+        self.requests = 0
+        self.generated = 0
+        self.started = time.time()
+        # 採点用のスレッドは1つだけ（辞書の初回読み込みが重ならないように。GIL があるので増やしても速くならない）
+        self.scorer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="strength")
+
+    async def generate(self, params):
+        length, count, options, with_strength = parse_options(params)
+        pwds = to_strings(generate_batch(count, length, entropy=self.pool, **options))
+        self.generated += count
+        out = {"passwords": pwds}
+        if with_strength:
+            out["strength"] = await self._score_all(pwds)
+        return out
+
+    async def strength(self, params):
+        pwds = params.get("passwords")
+        if isinstance(params.get("password"), str):
+            pwds = [params["password"]]
+        if not isinstance(pwds, list) or not all(isinstance(p, str) for p in pwds) or len(pwds) > MAX_COUNT:
+            raise ValueError(f'"password" か "passwords"（文字列のリスト、{MAX_COUNT}個まで）を指定してください。')
+        return {"strength": await self._score_all(pwds)}
+
+    async def _score_all(self, pwds):
+        """イベントループを止めないよう、採点は採点用のスレッドでまとめて行う"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.scorer, lambda: [self._score(p) for p in pwds])
+
+    @staticmethod
+    def _score(pwd):
+        from strength import estimate  # NumPy と辞書の読み込みは初めて使うときだけ
+
+        r = estimate(pwd)
+        return {"score": r["score"], "bits": round(r["bits"], 2), "guesses": r["guesses"]}
+
+    def stats(self, params):
+        return {"requests": self.requests, "generated": self.generated, "uptime_sec": time.time() - self.started,
+                "entropy_available": self.pool.available(), "entropy_refills": self.pool.refills,
+                "entropy_misses": self.pool.misses}
+
+    async def route(self, method, target, body):
+        """(ステータス, JSON にする値) を返す"""
+        url = urlsplit(target)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if method == "POST" and body:
+            try:
+                data = json.loads(body)
+            except ValueError:
+                return 400, {"error": "JSONとして読めません。"}
+            if not isinstance(data, dict):
+                return 400, {"error": "JSONはオブジェクト（{...}）で送ってください。"}
+            params.update(data)
+        handler = {"/generate": self.generate, "/strength": self.strength, "/stats": self.stats,
+                   "/health": lambda p: {"ok": True}}.get(url.path)
+        if handler is None:
+            return 404, {"error": f"{url.path} はありません。"}
+        if method not in ("GET", "POST"):
+            return 405, {"error": "GET か POST を使ってください。"}
+        try:
+            result = handler(params)
+            if inspect.isawaitable(result):
+                result = await result
+            return 200, result
+        except ValueError as e:
+            return 400, {"error": str(e)}
+
+    async def handle(self, reader, writer):
+        """1つの接続で、閉じられるまでリクエストを順に処理する（keep-alive）"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    k, sep, v = line.partition(":")
+                    if sep:
+                        headers[k.strip().lower()] = v.strip()
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    status, payload = 400, {"error": "Content-Length が正しくありません。"}
+                    keep = False
+                elif length > MAX_BODY:
+                    status, payload = 413, {"error": "本文が大きすぎます。"}
+                    keep = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    self.requests += 1
+                    status, payload = await self.route(method, target, body)
+                    keep = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep else 'close'}\r\n\r\n".encode("latin-1") + data)
+                await writer.drain()
+                if not keep:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host, port, pool=None, ready=None):
+    pool = pool or RefillingPool()
+    service = Service(pool)
+    refill = asyncio.create_task(pool.refill_forever())
+    server = await asyncio.start_server(service.handle, host, port)
+    if ready is not None:
+        ready.set_result(server.sockets[0].getsockname()[1])
+    else:
+        print(f"http://{host}:{server.sockets[0].getsockname()[1]} で待ち受けています（Ctrl+C で終了）")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        refill.cancel()
+        service.scorer.shutdown(wait=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Day04: パスワード生成のローカルHTTPサービス")
+    parser.add_argument("--host", default="127.0.0.1", help="待ち受けるアドレス（既定はこのPCだけ）")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pool-mb", type=int, default=16, help="ためておく乱数の量（MB）")
+    args = parser.parse_args(argv)
+    pool = RefillingPool(high=args.pool_mb << 20, low=max(1, args.pool_mb // 4) << 20)
+    try:
+        asyncio.run(serve(args.host, args.port, pool))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
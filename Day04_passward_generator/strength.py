@@ -0,0 +1,515 @@
+# Day04: パスワードの強さを「当てるまでに必要な推測回数」で見積もる
+# 使い方例:
+#   python strength.py check "P@ssw0rd2024"        # 見つかったパターンと推測回数を表示
+#   python strength.py audit passwords.txt         # ファイルの全行をまとめて採点（強さの分布）
+#   python strength.py build words.txt --name mywords  # 辞書（1行1語・よく使われる順）から索引を作る
+#
+# パスワードを「辞書の単語（逆さ・l33t置換も）」「キーボードの並び」「繰り返し」「連番」「日付」
+# 「総当たり」の部品に分け、推測回数の積が一番小さくなる分け方を動的計画法で探す（zxcvbn と同じ考え方）。
+# 辞書は dicts/*.txt から作った「固定長(16バイト)の単語を並べ替えた配列」と「順位」の .npy を
+# メモリマップで開くだけなので、起動時に全部を読み込まない。部分文字列をまとめて1回の二分探索
+# （numpy.searchsorted）で引くので、1つのパスワードは1ミリ秒かからずに採点できる。
+import argparse
+import math
+import os
+import re
+import sys
+import time
+from datetime import date
+
+import numpy as np
+
+DICT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dicts")
+WIDTH = 16        # 索引に入れる単語の最大バイト数
+MIN_WORD = 3      # これより短い部分は辞書で引かない
+REFERENCE_YEAR = date.today().year
+MIN_GUESSES = 50  # 2文字以上の部品1つの推測回数の下限
+
+# l33t置換を元に戻す表（1 は i と l の両方を試す）
+L33T = [str.maketrans("4@31!0$57+|9", "aaeiiossttlg"),
+        str.maketrans("4@31!0$57+|9", "aaeliossttlg")]
+SHIFTED = '~!@#$%^&*()_+{}|:"<>?'
+UNSHIFTED = "`1234567890-=[]\\;',./"
+KEYBOARD = ["`1234567890-=", "qwertyuiop[]\\", "asdfghjkl;'", "zxcvbnm,./"]
+
+
+# ---------------------------
+# 辞書の索引（並べ替えた固定長配列 + メモリマップ）
+# ---------------------------
+def build_index(src, name=None, out_dir=DICT_DIR):
+    """1行1語（よく使われる順）のテキストから <name>.words.npy / <name>.ranks.npy を作る"""
+    name = name or os.path.splitext(os.path.basename(src))[0]
+    seen = {}
+    with open(src, encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            w = line.strip().lower().encode("utf-8")
+            if w and len(w) <= WIDTH and w not in seen:
+                seen[w] = len(seen) + 1  # 順位（1が一番よく使われる）
+    words = np.array(sorted(seen), dtype=f"S{WIDTH}")
+    ranks = np.array([seen[w] for w in words], dtype=np.uint32)
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, f"{name}.words.npy"), words)
+    np.save(os.path.join(out_dir, f"{name}.ranks.npy"), ranks)
+    return name, words.size
+
+
+class Dictionary:
+    """メモリマップした並べ替え済みの単語配列。lookup() で複数の候補をまとめて引く"""
+
+    def __init__(self, name, words, ranks):
+        self.name = name
+        self.words = words
+        self.ranks = ranks
+
+    @classmethod
+    def open(cls, name, dict_dir=DICT_DIR):
+        base = os.path.join(dict_dir, name)
+        # メモリマップのまま普通の ndarray として扱う（np.memmap の添字アクセスは少し遅い）
+        words = np.load(base + ".words.npy", mmap_mode="r").view(np.ndarray)
+        ranks = np.load(base + ".ranks.npy", mmap_mode="r").view(np.ndarray)
+        return cls(name, words, ranks)
+
+    def lookup(self, cands):
+        """cands（bytes の配列）のうち辞書にあるものの (候補の番号, 順位)"""
+        if not self.words.size or not cands.size:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.uint32)
+        pos = self.words.searchsorted(cands)
+        np.minimum(pos, self.words.size - 1, out=pos)
+        hit = np.flatnonzero(self.words[pos] == cands)
+        return hit, self.ranks[pos[hit]]
+
+
+_dicts = None
+
+
+def load_dictionaries(dict_dir=DICT_DIR):
+    """dicts/*.txt の索引を開く（無い・古いときはその場で作る）"""
+    global _dicts
+    if _dicts is not None:
+        return _dicts
+    names = set()
+    for fn in os.listdir(dict_dir):
+        if fn.endswith(".txt"):
+            name = fn[:-4]
+            src = os.path.join(dict_dir, fn)
+            idx = os.path.join(dict_dir, name + ".words.npy")
+            if not os.path.exists(idx) or os.path.getmtime(idx) < os.path.getmtime(src):
+                build_index(src, name, dict_dir)
+            names.add(name)
+        elif fn.endswith(".words.npy"):
+            names.add(fn[:-len(".words.npy")])
+    _dicts = [Dictionary.open(name, dict_dir) for name in sorted(names)]
+    return _dicts
+
+
+# ---------------------------
+# パターンの検出
+# ---------------------------
+def _ncr(n, k):
+    return math.comb(n, k) if 0 <= k <= n else 0
+
+
+def _upper_variations(token):
+    """大文字小文字の付け方の数（全部小文字=1、先頭だけ/末尾だけ/全部大文字=2）"""
+    if token.islower() or not any(c.isalpha() for c in token):
+        return 1
+    if token.isupper() or (token[0].isupper() and token[1:].islower()) or (
+            token[-1].isupper() and token[:-1].islower()):
+        return 2
+    up = sum(c.isupper() for c in token)
+    low = sum(c.islower() for c in token)
+    return sum(_ncr(up + low, i) for i in range(1, min(up, low) + 1))
+
+
+def _lower(s):
+    """1文字ずつ小文字にする。"İ" のように小文字で2文字になるものはそのまま残し、長さを変えない"""
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in s)
+
+
+def _l33t_variations(token, word):
+    """置換した文字の種類ごとに「どれを置き換えたか」の数をかける"""
+    total = 1
+    low = _lower(token)
+    for sub in set(c for c, w in zip(low, word) if c != w):
+        plain = word[low.index(sub)]
+        s = low.count(sub)
+        u = word.count(plain) - s
+        total *= sum(_ncr(s + u, i) for i in range(1, min(s, u) + 1)) if u else 2
+    return max(total, 2)
+
+
+def dictionary_matches(pwd, dicts):
+    """辞書の単語（そのまま / 逆さ / l33t置換）になっている部分"""
+    lower = _lower(pwd)  # 位置がずれないよう長さを保つ
+    n = len(pwd)
+    texts = [(lower, False, False)]
+    rev = lower[::-1]
+    texts.append((rev, True, False))
+    for table in L33T:
+        sub = lower.translate(table)
+        if sub != lower and all(t != sub for t, _, _ in texts):
+            texts.append((sub, False, True))
+    # 全部の「始まり × 長さ」の部分文字列を (個数, WIDTH) のバイト配列として一度に作る。
+    # 長さより後ろは 0 で埋める（NumPy の S型は末尾の 0 を無視して比べる）。
+    # 位置がずれないよう、ASCII 以外の文字は "?" にして引く（辞書はASCIIの単語だけ当たる）
+    buf = np.zeros((len(texts), n + WIDTH), dtype=np.uint8)
+    for r, (t, _, _) in enumerate(texts):
+        buf[r, :n] = np.frombuffer(t.encode("ascii", "replace"), dtype=np.uint8)
+    win = np.lib.stride_tricks.as_strided(buf, (len(texts), n, WIDTH), buf.strides + buf.strides[1:])  # (文, 始まり, WIDTH)
+    lengths = np.arange(MIN_WORD, WIDTH + 1)
+    keep = np.arange(WIDTH) < lengths[:, None]                                    # (長さ, WIDTH)
+    grid = win[:, :, None, :] * keep                                              # (文, 始まり, 長さ, WIDTH)
+    starts = np.arange(n)[:, None]
+    valid = np.broadcast_to(starts + lengths <= n, grid.shape[:3])
+    r_idx, i_idx, l_idx = np.nonzero(valid)
+    arr = np.ascontiguousarray(grid[valid]).view(f"S{WIDTH}").ravel()
+    out = []
+    for d in dicts:
+        hit, ranks = d.lookup(arr)
+        for k, rank in zip(hit.tolist(), ranks.tolist()):
+            t, reversed_, l33t = texts[r_idx[k]]
+            i = int(i_idx[k])
+            j = i + int(lengths[l_idx[k]])
+            word = t[i:j][::-1] if reversed_ else t[i:j]
+            if reversed_:
+                i, j = n - j, n - i
+            token = pwd[i:j]
+            guesses = rank * _upper_variations(token)
+            if l33t:
+                guesses *= _l33t_variations(token, word)
+            if reversed_:
+                guesses *= 2
+            out.append({"pattern": "dictionary", "i": i, "j": j, "token": token, "guesses": guesses,
+                        "word": word, "dict": d.name, "rank": rank, "reversed": reversed_, "l33t": l33t})
+    return out
+
+
+def _key_pos():
+    pos = {}
+    for r, row in enumerate(KEYBOARD):
+        for c, ch in enumerate(row):
+            pos[ch] = (r, c)
+    return pos
+
+
+KEY_POS = _key_pos()
+UNSHIFT = str.maketrans(SHIFTED, UNSHIFTED)
+KEY_STARTS = len(KEY_POS)
+KEY_DEGREE = 4.6  # 1つのキーの隣のキーの平均の数（だいたい）
+
+
+def _adjacent(a, b):
+    """QWERTY で隣り合っているか（1段下は左に半キーずれている）"""
+    pa, pb = KEY_POS.get(a), KEY_POS.get(b)
+    if pa is None or pb is None or a == b:
+        return None
+    dr, dc = pb[0] - pa[0], pb[1] - pa[1]
+    if dr == 0 and abs(dc) == 1:
+        return ("h", dc)
+    if dr == 1 and dc in (-1, 0):
+        return ("d", dc)
+    if dr == -1 and dc in (0, 1):
+        return ("u", dc)
+    return None
+
+
+def spatial_matches(pwd):
+    """キーボードの隣のキーを順に押した部分（qwerty, 1qaz, zxcvb など。3文字以上）"""
+    keys = _lower(pwd).translate(UNSHIFT)
+    out = []
+    i = 0
+    n = len(pwd)
+    while i < n - 2:
+        j, turns, last = i + 1, 0, None
+        while j < n:
+            d = _adjacent(keys[j - 1], keys[j])
+            if d is None:
+                break
+            if d != last:
+                turns += 1
+                last = d
+            j += 1
+        if j - i >= 3:
+            token = pwd[i:j]
+            length = j - i
+            guesses = 0
+            for k in range(2, length + 1):
+                for t in range(1, min(turns, k - 1) + 1):
+                    guesses += _ncr(k - 1, t - 1) * KEY_STARTS * KEY_DEGREE ** t
+            shifted = sum(c in SHIFTED or c.isupper() for c in token)
+            if shifted:
+                unshifted = length - shifted
+                guesses *= 2 if unshifted == 0 else sum(_ncr(length, k) for k in range(1, min(shifted, unshifted) + 1))
+            out.append({"pattern": "spatial", "i": i, "j": j, "token": token, "guesses": guesses, "turns": turns})
+            i = j - 1
+        else:
+            i += 1
+    return out
+
+
+def sequence_matches(pwd):
+    """abc / 1234 / zyx / 2468 のように文字コードが一定の差で並ぶ部分（3文字以上）"""
+    out = []
+    n = len(pwd)
+    i = 0
+    while i < n - 2:
+        delta = ord(pwd[i + 1]) - ord(pwd[i])
+        j = i + 1
+        while j < n and ord(pwd[j]) - ord(pwd[j - 1]) == delta:
+            j += 1
+        if 1 <= abs(delta) <= 5 and j - i >= 3:
+            token = pwd[i:j]
+            first = token[0]
+            if first in "aAzZ019":
+                base = 4  # 最初に試される始まり
+            elif first.isdigit():
+                base = 10
+            else:
+                base = 26
+            guesses = base * len(token) * (2 if delta < 0 else 1)
+            out.append({"pattern": "sequence", "i": i, "j": j, "token": token, "guesses": guesses})
+        i = j - 1 if j - i >= 3 else i + 1
+    return out
+
+
+REPEAT_GREEDY = re.compile(r"(.+)\1+", re.S)
+REPEAT_LAZY = re.compile(r"(.+?)\1+", re.S)
+
+
+def repeat_matches(pwd):
+    """aaaa / abcabc のように同じものを繰り返した部分。推測回数 = 元の部分の推測回数 × 回数"""
+    out = []
+    pos = 0
+    while pos < len(pwd):
+        g = REPEAT_GREEDY.search(pwd, pos)
+        if not g:
+            break
+        lz = REPEAT_LAZY.search(pwd, pos)
+        m = g if len(g.group(0)) > len(lz.group(0)) else lz
+        # 繰り返しの単位は一番短いもの（abcabc → abc）
+        unit = REPEAT_LAZY.fullmatch(m.group(1))
+        base = unit.group(1) if unit else m.group(1)
+        count = len(m.group(0)) // len(base)
+        if len(base) < MIN_WORD:
+            base_guesses = cardinality(base) ** len(base)
+        else:
+            base_guesses = estimate(base, _inner=True)["guesses"]
+        out.append({"pattern": "repeat", "i": m.start(), "j": m.end(), "token": m.group(0),
+                    "guesses": base_guesses * count, "base": base, "count": count})
+        pos = m.end()
+    return out
+
+
+DATE_SEP = re.compile(r"(\d{1,4})([-/._ ])(\d{1,2})\2(\d{1,4})")
+YEAR = re.compile(r"(?:19|20)\d\d")
+
+
+def _year(y):
+    if y < 100:
+        y += 1900 if y > 50 else 2000
+    return y if 1900 <= y <= 2050 else None
+
+
+def _valid_date(parts):
+    """(年, 月, 日) の並び方を全部試して、ありえる日付なら年を返す"""
+    a, b, c = parts
+    for y, m, d in ((a, b, c), (c, b, a), (c, a, b)):
+        if 1 <= m <= 12 and 1 <= d <= 31:
+            yy = _year(y) if (y >= 1000 or y < 100) else None
+            if yy:
+                return yy
+    return None
+
+
+def _date_guesses(year, sep):
+    return 365 * max(abs(year - REFERENCE_YEAR), 20) * (4 if sep else 1)
+
+
+def date_matches(pwd):
+    """日付（19900101, 1990-1-1, 01/01/90 など）と西暦（1990, 2024）"""
+    out = []
+    n = len(pwd)
+    for i in range(n):
+        if not pwd[i].isdigit():
+            continue
+        for j in range(i + 4, min(n, i + 10) + 1):
+            token = pwd[i:j]
+            if not token[-1].isdigit():
+                continue
+            year = None
+            sep = False
+            if token.isdigit():
+                if 4 <= len(token) <= 8:
+                    for k1 in range(1, len(token) - 1):
+                        for k2 in range(k1 + 1, len(token)):
+                            parts = token[:k1], token[k1:k2], token[k2:]
+                            if all(len(p) <= 4 for p in parts) and any(len(p) in (2, 4) for p in (parts[0], parts[2])):
+                                year = _valid_date(tuple(int(p) for p in parts))
+                                if year:
+                                    break
+                        if year:
+                            break
+            else:
+                m = DATE_SEP.fullmatch(token)
+                if m:
+                    year = _valid_date((int(m.group(1)), int(m.group(3)), int(m.group(4))))
+                    sep = True
+            if year:
+                out.append({"pattern": "date", "i": i, "j": j, "token": token,
+                            "guesses": _date_guesses(year, sep), "year": year})
+    for m in YEAR.finditer(pwd):
+        year = int(m.group(0))
+        out.append({"pattern": "year", "i": m.start(), "j": m.end(), "token": m.group(0),
+                    "guesses": max(abs(year - REFERENCE_YEAR), 20)})
+    return out
+
+
+# ---------------------------
+# 見積もり
+# ---------------------------
+def cardinality(pwd):
+    """総当たりで試す文字の種類数（使われている文字の種類から）"""
+    card = 0
+    if any(c.islower() for c in pwd): card += 26
+    if any(c.isupper() for c in pwd): card += 26
+    if any(c.isdigit() for c in pwd): card += 10
+    if any(not c.isalnum() and ord(c) < 128 for c in pwd): card += 33
+    if any(ord(c) > 127 for c in pwd): card += 100
+    return max(card, 10)
+
+
+def estimate(pwd, dicts=None, _inner=False):
+    """パスワードの推測回数を見積もる
+
+    戻り値の辞書: guesses（推測回数）, bits（log2）, score（0〜5）, sequence（選ばれた部品の並び）
+    """
+    n = len(pwd)
+    if n == 0:
+        return {"password": pwd, "guesses": 1, "bits": 0.0, "score": 0, "sequence": []}
+    if dicts is None:
+        dicts = load_dictionaries()
+    matches = dictionary_matches(pwd, dicts) + spatial_matches(pwd) + sequence_matches(pwd) + date_matches(pwd)
+    if not _inner:
+        matches += repeat_matches(pwd)
+    ending = [[] for _ in range(n + 1)]
+    for m in matches:
+        if m["j"] - m["i"] < n:  # 一部分だけの部品は最低 MIN_GUESSES 回とする（zxcvbn と同じ）
+            m["guesses"] = max(m["guesses"], MIN_GUESSES)
+        ending[m["j"]].append(m)
+
+    # best[j] = pwd[:j] を表す一番少ない推測回数（log2）、部品の数、最後の部品
+    card = cardinality(pwd)
+    bf_bits = math.log2(card)
+    best = [(0.0, 0, None)] + [None] * n
+    for j in range(1, n + 1):
+        prev_bits, prev_k, prev_m = best[j - 1]
+        if prev_m is not None and prev_m["pattern"] == "bruteforce":
+            cand = (prev_bits + bf_bits, prev_k, {"pattern": "bruteforce", "i": prev_m["i"], "j": j})
+        else:
+            cand = (prev_bits + bf_bits, prev_k + 1, {"pattern": "bruteforce", "i": j - 1, "j": j})
+        for m in ending[j]:
+            bits, k, _ = best[m["i"]]
+            c = (bits + math.log2(m["guesses"]), k + 1, m)
+            if c[0] + math.log2(math.factorial(c[1])) < cand[0] + math.log2(math.factorial(cand[1])):
+                cand = c
+        best[j] = cand
+
+    seq = []
+    j = n
+    while j > 0:
+        m = best[j][2]
+        if m["pattern"] == "bruteforce":
+            m = dict(m, token=pwd[m["i"]:m["j"]], guesses=card ** (m["j"] - m["i"]))
+        seq.append(m)
+        j = m["i"]
+    seq.reverse()
+    k = len(seq)
+    bits = sum(math.log2(m["guesses"]) for m in seq) + math.log2(math.factorial(k))
+    return {"password": pwd, "guesses": 2 ** bits, "bits": bits, "score": score_of(bits), "sequence": seq}
+
+
+# 推測回数（log10）でのスコアの境目: 0 とても弱い 〜 5 とても強い
+SCORE_LOG10 = (3, 6, 8, 10, 12)
+
+
+def score_of(bits):
+    log10 = bits * math.log10(2)
+    return sum(log10 >= t for t in SCORE_LOG10)
+
+
+def crack_time(guesses, per_sec=1e10):
+    """オフラインで1秒に per_sec 回試されたときの時間のめやす"""
+    sec = guesses / per_sec
+    for unit, size in (("年", 365 * 86400), ("日", 86400), ("時間", 3600), ("分", 60), ("秒", 1)):
+        if sec >= size:
+            return f"{sec / size:,.0f}{unit}" if sec / size < 1e6 else f"{sec / size:.1e}{unit}"
+    return "一瞬"
+
+
+PATTERN_LABELS = {"dictionary": "辞書の単語", "spatial": "キーボードの並び", "sequence": "連番",
+                  "repeat": "繰り返し", "date": "日付", "year": "西暦", "bruteforce": "ランダム"}
+
+
+def describe(m):
+    label = PATTERN_LABELS[m["pattern"]]
+    if m["pattern"] == "dictionary":
+        extra = [f"{m['dict']} の {m['rank']} 番目"]
+        if m["reversed"]:
+            extra.append("逆さ")
+        if m["l33t"]:
+            extra.append(f"l33t置換（{m['word']}）")
+        label += "（" + "・".join(extra) + "）"
+    elif m["pattern"] == "repeat":
+        label += f"（{m['base']} × {m['count']}）"
+    return f"{m['token']!r:<20} {label:<30} 推測 {m['guesses']:.3g} 回"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Day04: パスワードの強さの見積もり")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("check", help="パスワードを採点して内訳を表示")
+    p.add_argument("passwords", nargs="+")
+    p = sub.add_parser("audit", help="ファイルの全行をまとめて採点")
+    p.add_argument("file")
+    p.add_argument("--worst", type=int, default=10, help="弱い順に表示する数")
+    p = sub.add_parser("build", help="単語リスト（1行1語・よく使われる順）から辞書の索引を作る")
+    p.add_argument("file")
+    p.add_argument("--name", default=None, help="辞書の名前（省略時はファイル名）")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "build":
+        start = time.perf_counter()
+        name, count = build_index(args.file, args.name)
+        print(f"{name}: {count:,} 語の索引を {DICT_DIR} に作りました（{time.perf_counter() - start:.1f} 秒）")
+        return
+
+    dicts = load_dictionaries()
+    if args.cmd == "check":
+        for pwd in args.passwords:
+            start = time.perf_counter()
+            r = estimate(pwd, dicts)
+            elapsed = time.perf_counter() - start
+            print(f"{pwd}: 推測回数 {r['guesses']:.3g}（{r['bits']:.1f} ビット）スコア {r['score']}/5"
+                  f"  破られるまで {crack_time(r['guesses'])}  ({elapsed * 1e3:.2f} ms)")
+            for m in r["sequence"]:
+                print(f"  - {describe(m)}")
+        return
+
+    with open(args.file, encoding="utf-8", errors="replace") as f:
+        pwds = [line.rstrip("\r\n") for line in f if line.strip()]
+    start = time.perf_counter()
+    results = [estimate(p, dicts) for p in pwds]
+    elapsed = time.perf_counter() - start
+    hist = [0] * 6
+    for r in results:
+        hist[r["score"]] += 1
+    print(f"=== {len(results):,} 個（{elapsed / max(1, len(results)) * 1e6:.0f} µs/個） ===")
+    for s, c in enumerate(hist):
+        print(f"  スコア {s}: {c:>8,}  {c / max(1, len(results)) * 100:5.1f}%")
+    print("弱い順:")
+    for r in sorted(results, key=lambda r: r["bits"])[:args.worst]:
+        print(f"  {r['bits']:6.1f} ビット  {r['password']}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
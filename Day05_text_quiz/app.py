@@ -1,8 +1,23 @@
 # Day05: テキストクイズ（CSV版）
+# 使い方例:
+#   python app.py                          # questions.csv から5問
+#   python app.py -n 10 --file big.csv     # 別の問題集から10問
+#   python app.py --no-cache               # キャッシュを使わず CSV を直接読む
+#   python app.py --strict                 # 打ち間違いを許さない（表記ゆれは吸収する）
+#   python app.py --time-limit 10          # 1問10秒。締め切りで打ち切り、残り時間を表示
+#   python app.py --srs                    # 間隔反復：復習の時期が来た問題から出題し、成績を残す
+#   python bank.py bench                   # 100万問の問題集での読み込み時間の比較
+import argparse
 import csv
+import os
 import random
 import time
 
+import bank
+import srs
+import timed
+from matcher import AnswerKey
+
 def load_questions(path="questions.csv"):
     """CSVから[{"q":..., "a":...}, ...]を作る"""
     items = []
@@ -17,51 +32,117 @@ def load_questions(path="questions.csv"):
         raise ValueError("問題が読み込めませんでした。questions.csvを確認してください。")
     return items
 
-def ask_one(item, time_limit=None):
-    """1問出題。time_limit(秒)があれば制限時間を適用"""
+def ask_one(item, time_limit=None, reader=None):
+    """1問出題。time_limit(秒)があれば制限時間を適用
+
+    reader（timed.TimedReader）があれば締め切りの瞬間に入力を打ち切る。
+    無ければ input() で読み、答えた後で時間を確かめる。
+    (正解か, 回答秒, 判定 "exact"/"close"/"wrong"/"timeout") を返す。
+    """
     print("\nQ.", item["q"])
     if time_limit:
         print(f"(制限時間: {time_limit}秒)")
 
-    start = time.time()
-    user = input("あなたの答え> ").strip()
-    elapsed = time.time() - start
-
-    if time_limit and elapsed > time_limit:
-        print(f"時間切れ… ({elapsed:.1f}秒) 正解は「{item['a']}」")
-        return False, elapsed
+    key = item.get("key") or AnswerKey.parse(item["a"])
+    if reader is not None:
+        user, elapsed, timeout = reader.read_line("あなたの答え> ", time_limit)
+        if user is None and not timeout:
+            raise EOFError
+    else:
+        start = time.perf_counter_ns()
+        user = input("あなたの答え> ")
+        elapsed = (time.perf_counter_ns() - start) / 1e9
+        timeout = bool(time_limit) and elapsed > time_limit
+    if timeout:
+        print(f"時間切れ… ({elapsed:.3f}秒) 正解は「{key.display}」")
+        return False, elapsed, "timeout"
+    user = user.strip()
 
-    if user.lower() == item["a"].lower():
+    verdict, matched, _ = key.check(user)
+    if verdict == "exact":
         print("正解！🎉")
-        return True, elapsed
+        return True, elapsed, verdict
+    elif verdict == "close":
+        print(f"正解！🎉（惜しい、正しくは「{matched}」）")
+        return True, elapsed, verdict
     else:
-        print(f"不正解… 正解は「{item['a']}」")
-        return False, elapsed
+        print(f"不正解… 正解は「{key.display}」")
+        return False, elapsed, verdict
 
-def main():
-    print("=== テキストクイズ（CSV版） ===")
-    qa = load_questions("questions.csv")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Day05: テキストクイズ（CSV版）")
+    parser.add_argument("--file", default="questions.csv", help="問題集のCSV（question,answer 列）")
+    parser.add_argument("-n", "--num", type=int, default=5, help="出題数")
+    parser.add_argument("--time-limit", type=float, default=0, help="制限時間（秒）。0なら無効")
+    parser.add_argument("--seed", type=int, default=None, help="乱数シード（出題順の再現用）")
+    parser.add_argument("--no-cache", action="store_true", help="キャッシュ（cache/*.qbank）を使わない")
+    parser.add_argument("--strict", action="store_true", help="打ち間違いを正解にしない")
+    parser.add_argument("--srs", action="store_true",
+                        help="間隔反復（SM-2）で出題し、成績を progress.db に残す")
+    parser.add_argument("--new", type=int, default=None, help="--srs で1回に出す新しい問題の上限")
+    args = parser.parse_args(argv)
+    if args.num < 1:
+        parser.error("-n/--num は1以上にしてください。")
 
-    # 問題をシャッフル
-    random.shuffle(qa)
+    print("=== テキストクイズ（CSV版） ===")
+    rng = random.Random(args.seed)
+    scheduler = None
+    if args.srs:
+        # 成績に合わせて選ぶ（復習の時期が来た問題 → 新しい問題）
+        scheduler = srs.Scheduler(bank.open_bank(args.file), deck=os.path.abspath(args.file))
+        qa = scheduler.next_questions(args.num, args.new, rng)
+        if not qa:
+            print("今は復習する問題がありません。")
+            scheduler.close()
+            scheduler.bank.close()
+            return
+        reviews = sum(item["review"] for item in qa)
+        print(f"復習 {reviews}問 + 新しい問題 {len(qa) - reviews}問")
+    else:
+        # 全問を読んでシャッフルする代わりに、出題する分だけ抽選する（bank.py）
+        qa = bank.pick(args.file, args.num, rng, use_cache=not args.no_cache)
+    # 答え合わせ用に、正解（| 区切りの別解を含む）の正規化を先に済ませておく（matcher.py）
+    for item in qa:
+        item["key"] = AnswerKey.parse(item["a"], fuzzy=not args.strict)
 
     # 設定（必要に応じて変更）
-    NUM_QUESTIONS = min(5, len(qa))  # 出題数
-    TIME_LIMIT = 0                   # 0なら無効（例: 10 で10秒制限）
-    print(f"出題数: {NUM_QUESTIONS} / 全{len(qa)}問\n")
+    NUM_QUESTIONS = len(qa)          # 出題数
+    TIME_LIMIT = args.time_limit     # 0なら無効（例: 10 で10秒制限）
+    print(f"出題数: {NUM_QUESTIONS}\n")
 
     correct = 0
     times = []
-    for i in range(NUM_QUESTIONS):
-        ok, sec = ask_one(qa[i], time_limit=TIME_LIMIT)
-        correct += int(ok)
-        times.append(sec)
+    # 制限時間があるときは締め切りで打ち切れる入力を使う（Windows では従来どおり後から判定）
+    reader = timed.TimedReader() if TIME_LIMIT and timed.available() else None
+    try:
+        for i in range(NUM_QUESTIONS):
+            ok, sec, verdict = ask_one(qa[i], time_limit=TIME_LIMIT, reader=reader)
+            correct += int(ok)
+            times.append(sec)
+            if scheduler is not None:
+                days = scheduler.record(qa[i], verdict, sec, TIME_LIMIT)
+                print(f"（次は {days:g}日後）")
+    except EOFError:
+        print("\n入力が終わったので中断します。")
+    finally:
+        if reader is not None:
+            reader.close()
+        if scheduler is not None:
+            scheduler.flush()  # ためた成績をまとめて書く
+            summary = scheduler.summary()
+            scheduler.close()
+            scheduler.bank.close()
 
     avg_time = sum(times)/len(times) if times else 0.0
+    rate = correct/NUM_QUESTIONS*100 if NUM_QUESTIONS else 0.0
     print("\n=== 結果 ===")
-    print(f"正解 {correct}/{NUM_QUESTIONS}  ({correct/NUM_QUESTIONS*100:.1f}%)")
+    print(f"正解 {correct}/{NUM_QUESTIONS}  ({rate:.1f}%)")
     if TIME_LIMIT:
-        print(f"平均回答時間: {avg_time:.2f} 秒")
+        print(f"平均回答時間: {avg_time:.3f} 秒")
+        print("回答時間: " + "  ".join(f"{t * 1e3:.1f}ms" for t in times))
+    if scheduler is not None:
+        print(f"記録: 出題済み {summary['cards']}/{summary['questions']}問  覚えた {summary['learned']}問  "
+              f"24時間以内の復習 {summary['due_24h']}問")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
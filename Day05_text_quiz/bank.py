@@ -0,0 +1,280 @@
+# Day05: 問題集のコンパイル済みキャッシュと、巨大な問題集からの抽選
+# 使い方例:
+#   python bank.py build questions.csv             # cache/questions.qbank を作る（app.py は自動で作る）
+#   python bank.py show questions.csv -n 3         # キャッシュから3問を抽選して表示
+#   python bank.py bench --rows 1000000            # 100万問のCSVで「読み込み＋5問抽選」の時間を比べる
+#
+# CSV を毎回すべて辞書のリストにするのをやめ、初回に「問題文・答えを UTF-8 で並べたデータ部」と
+# 「各文字列の開始位置（バイト）の表」を1つのバイナリにまとめる（cache/<名前>.qbank）。
+# 次からはメモリマップで開いて表の位置を読むだけなので、何問あっても開くのは一瞬で、
+# 実際に出題する問題だけを文字列に戻す。抽選は番号だけを選ぶ（random.sample）ので、
+# 100万問から5問でも時間とメモリは5問ぶん。
+# CSV のサイズ・更新時刻が変わっていたら中身の SHA-1 を計算し、違っていれば作り直す。
+import argparse
+import csv
+import hashlib
+import math
+import mmap
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+from array import array
+
+MAGIC = b"QBANK\0\0\0"
+VERSION = 1
+# magic, version, 問題数, CSVのサイズ, CSVの更新時刻(ns), CSVのSHA-1
+HEADER = struct.Struct("<8sIQQq20s")
+STAMP_AT = struct.calcsize("<8sIQ")  # CSVのサイズ・更新時刻が書いてある位置
+CACHE_DIR = "cache"
+
+
+def cache_path(csv_path):
+    d = os.path.join(os.path.dirname(os.path.abspath(csv_path)), CACHE_DIR)
+    return os.path.join(d, os.path.splitext(os.path.basename(csv_path))[0] + ".qbank")
+
+
+def file_sha1(path, chunk=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        while True:
+            b = f.read(chunk)
+            if not b:
+                return h.digest()
+            h.update(b)
+
+
+def iter_csv(path):
+    """CSV を1行ずつ読んで (問題文, 答え) を返す（空の行は飛ばす）"""
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            q = (row.get("question") or "").strip()
+            a = (row.get("answer") or "").strip()
+            if q and a:
+                yield q, a
+
+
+def build(csv_path, dst=None):
+    """CSV からキャッシュを作る。問題数を返す
+
+    データ部は一時ファイルへ順に書き、位置の表（8バイト×(2×問題数+1)）だけをメモリに持つ。
+    最後に「ヘッダー・表・データ部」をまとめて書き、置き換えは os.replace で一度に行う。
+    """
+    dst = dst or cache_path(csv_path)
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    st = os.stat(csv_path)
+    digest = file_sha1(csv_path)
+    offsets = array("Q", [0])
+    pos = 0
+    with tempfile.TemporaryFile() as data:
+        for q, a in iter_csv(csv_path):
+            for s in (q, a):
+                b = s.encode("utf-8")
+                data.write(b)
+                pos += len(b)
+                offsets.append(pos)
+        count = (len(offsets) - 1) // 2
+        if count == 0:
+            raise ValueError(f"問題が読み込めませんでした。{csv_path} を確認してください。")
+        data.seek(0)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dst), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(HEADER.pack(MAGIC, VERSION, count, st.st_size, st.st_mtime_ns, digest))
+                offsets.tofile(out)
+                while True:
+                    b = data.read(1 << 20)
+                    if not b:
+                        break
+                    out.write(b)
+            os.replace(tmp, dst)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    return count
+
+
+class QuestionBank:
+    """コンパイル済みの問題集（メモリマップ）。bank[i] で i 番目を {"q": ..., "a": ...} として取り出す"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, self.size, self.mtime_ns, self.sha1 = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"{path} は問題集のキャッシュではありません。")
+        self.count = count
+        start = HEADER.size
+        self._offsets = memoryview(self._mm)[start:start + 8 * (2 * count + 1)].cast("Q")
+        self._data = start + 8 * (2 * count + 1)
+
+    def __len__(self):
+        return self.count
+
+    def _text(self, k):
+        a, b = self._offsets[k], self._offsets[k + 1]
+        return self._mm[self._data + a:self._data + b].decode("utf-8")
+
+    def __getitem__(self, i):
+        if not -self.count <= i < self.count:
+            raise IndexError(i)
+        i %= self.count
+        return {"id": i, "q": self._text(2 * i), "a": self._text(2 * i + 1)}
+
+    def question(self, i):
+        """i 番目の問題文だけを取り出す"""
+        return self._text(2 * i)
+
+    def sample(self, k, rng=random):
+        """k 問を重複なしで抽選（番号だけ選ぶので問題数によらない）"""
+        return [self[i] for i in rng.sample(range(self.count), min(k, self.count))]
+
+    def close(self):
+        self._offsets.release()
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _fresh(bank, st):
+    return bank.size == st.st_size and bank.mtime_ns == st.st_mtime_ns
+
+
+def open_bank(csv_path, rebuild=False):
+    """CSV に対応するキャッシュを開く（無い・古いときは作り直す）"""
+    dst = cache_path(csv_path)
+    st = os.stat(csv_path)
+    if not rebuild:
+        try:
+            bank = QuestionBank(dst)
+        except (OSError, ValueError, struct.error):
+            bank = None
+        if bank is not None:
+            if _fresh(bank, st):
+                return bank
+            # 更新時刻だけ変わった（touch・コピーなど）なら中身を比べて、同じなら印だけ付け直す
+            same = bank.sha1 == file_sha1(csv_path)
+            bank.close()
+            if same:
+                with open(dst, "r+b") as f:
+                    f.seek(STAMP_AT)
+                    f.write(struct.pack("<Qq", st.st_size, st.st_mtime_ns))
+                return QuestionBank(dst)
+    build(csv_path, dst)
+    return QuestionBank(dst)
+
+
+def reservoir_sample(items, k, rng=random):
+    """長さの分からない items から k 個を一様に選ぶ（Algorithm L：読み飛ばす数をまとめて決める）
+
+    キャッシュを使わず CSV を直接読むとき用。メモリは k 個ぶんだけ。
+    """
+    it = iter(items)
+    res = []
+    for x in it:
+        res.append(x)
+        if len(res) == k:
+            break
+    if len(res) < k or k == 0:
+        rng.shuffle(res)
+        return res
+    w = math.exp(math.log(rng.random()) / k)
+    while True:
+        skip = int(math.log(rng.random()) / math.log(1 - w))
+        for _ in range(skip):
+            if next(it, StopIteration) is StopIteration:
+                rng.shuffle(res)
+                return res
+        x = next(it, StopIteration)
+        if x is StopIteration:
+            rng.shuffle(res)
+            return res
+        res[rng.randrange(k)] = x
+        w *= math.exp(math.log(rng.random()) / k)
+
+
+def pick(csv_path, k, rng=random, use_cache=True):
+    """出題する k 問を返す（キャッシュを使うか、CSV を流し読みして選ぶ）"""
+    if use_cache:
+        with open_bank(csv_path) as bank:
+            return bank.sample(k, rng)
+    chosen = reservoir_sample(iter_csv(csv_path), k, rng)
+    if not chosen:
+        raise ValueError(f"問題が読み込めませんでした。{csv_path} を確認してください。")
+    return [{"id": None, "q": q, "a": a} for q, a in chosen]
+
+
+def write_sample_csv(path, rows, seed=0):
+    """ベンチマーク用に rows 問のCSVを作る"""
+    rng = random.Random(seed)
+    words = ["random", "len", "if", "for", "while", "import", "def", "class", "list", "dict", "print"]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["question", "answer"])
+        for i in range(rows):
+            w.writerow([f"問題{i}: Pythonのキーワード・関数を答えよ（{rng.random():.6f}）", rng.choice(words)])
+
+
+def bench(rows=1_000_000, k=5):
+    from app import load_questions
+
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "big.csv")
+        write_sample_csv(path, rows)
+        mb = os.path.getsize(path) / 1e6
+
+        def timed(fn):
+            start = time.perf_counter()
+            fn()
+            return time.perf_counter() - start
+
+        def full():
+            qa = load_questions(path)
+            random.shuffle(qa)
+            return qa[:k]
+
+        print(f"{rows:,}問（{mb:.0f}MB）から{k}問を選ぶ時間")
+        print(f"  全部読んでシャッフル（従来）    : {timed(full) * 1e3:>10.1f} ms")
+        print(f"  CSVを流し読み＋リザーバ抽選     : {timed(lambda: pick(path, k, use_cache=False)) * 1e3:>10.1f} ms")
+        print(f"  キャッシュ作成（初回のみ）      : {timed(lambda: build(path)) * 1e3:>10.1f} ms")
+        print(f"  キャッシュを開いて抽選（2回目～）: {timed(lambda: pick(path, k)) * 1e3:>10.3f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Day05: 問題集のコンパイル済みキャッシュ")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("build", help="キャッシュを作る")
+    p.add_argument("csv")
+    p = sub.add_parser("show", help="キャッシュから抽選して表示")
+    p.add_argument("csv")
+    p.add_argument("-n", type=int, default=5)
+    p.add_argument("--seed", type=int, default=None)
+    p = sub.add_parser("bench", help="大きなCSVで時間を比べる")
+    p.add_argument("--rows", type=int, default=1_000_000)
+    p.add_argument("-n", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    try:
+        if args.cmd == "build":
+            start = time.perf_counter()
+            n = build(args.csv)
+            print(f"{n:,}問 → {cache_path(args.csv)}（{time.perf_counter() - start:.2f}秒）")
+        elif args.cmd == "show":
+            for item in pick(args.csv, args.n, random.Random(args.seed)):
+                print(f"[{item['id']}] {item['q']}  →  {item['a']}")
+        else:
+            bench(args.rows, args.n)
+    except (OSError, ValueError) as e:
+        sys.exit(str(e))
+
+
+if __name__ == "__main__":
+    main()
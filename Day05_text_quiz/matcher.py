@@ -0,0 +1,202 @@
+# Day05: 答え合わせ（表記ゆれの吸収と、打ち間違いの許容）
+# 使い方例:
+#   python matcher.py "random()" "ＲＡＮＤＯＭ"       # 正解 "random()" に "ＲＡＮＤＯＭ" は合っているか
+#   python matcher.py "りんご|林檎|apple" "リンゴ"    # | で区切ると別解をいくつでも書ける
+#   python matcher.py --bench                       # 1回の採点にかかる時間
+#
+# 答えは読み込み時に1回だけ「正規化」しておく（AnswerKey）。
+#   NFKC（全角英数→半角、半角カナ→全角）→ 大文字小文字をそろえる → カタカナをひらがなに →
+#   空白・記号（かっこ、句読点など）を取り除く
+# これで「ＲＡＮＤＯＭ」「random()」「 Random 」「リンゴ/りんご」は同じ答えになる。
+# ただし意味の変わる記号は残す（"C++" と "C#"、"3.14" の小数点、"-5" のマイナス）。
+# 正規化した形が完全に一致しなければ、長さに応じて数文字までの打ち間違い（編集距離）を許す。
+# 数字を含む答え（年号・数値など）は1文字違いでも別の答えなので、打ち間違いは許さない。
+# 編集距離は許す数 k の帯だけを計算し、k を超えた時点で打ち切る。別解は長さ順に並べておき、
+# 長さの差が k を超えるものは比べない。別解が多いときは「k 文字以内を消した形」の索引を引いて
+# 候補を数個に絞ってから比べる。
+import argparse
+import bisect
+import re
+import time
+import unicodedata
+
+SEPARATOR = "|"  # CSV の answer 列で別解を区切る文字
+# 文字・数字（かな・漢字を含む）以外を消す。グループ1（+ と #、数字の間の小数点、数字の前のマイナス）は残す
+_STRIP = re.compile(r"([+#]|(?<=\d)\.(?=\d)|(?<![^\W_])-(?=\d))|[\W_]")
+_FOLD = {c: c - 0x60 for c in range(ord("ァ"), ord("ヶ") + 1)}  # カタカナ → ひらがな
+_FOLD[ord("−")] = "-"  # 数学のマイナス記号（NFKC では変わらない）もハイフンに
+
+
+def normalize(text):
+    s = unicodedata.normalize("NFKC", text).casefold().translate(_FOLD)
+    stripped = _STRIP.sub(lambda m: m.group(1) or "", s)
+    # 記号だけの答え（"+" や "==" など）は記号を消すと空になるので、空白だけ除く
+    return stripped or "".join(s.split())
+
+
+def max_typos(length):
+    """正規化した答えの長さごとに許す打ち間違いの数（短い答えは完全一致のみ）"""
+    if length <= 3:
+        return 0
+    if length <= 7:
+        return 1
+    return 2
+
+
+def typo_limit(norm):
+    """正規化した正解 norm に許す打ち間違いの数（数字を含む答えは 1990 と 1991 のように別物なので 0）"""
+    if any(c.isdigit() for c in norm):
+        return 0
+    return max_typos(len(norm))
+
+
+def bounded_distance(a, b, k):
+    """a と b の編集距離（挿入・削除・置換・隣どうしの入れ替え）。k を超えるなら k+1 を返す
+
+    対角線から ±k の帯だけを計算し、行の最小値が k を超えたらそこで打ち切る。
+    """
+    la, lb = len(a), len(b)
+    if abs(la - lb) > k:
+        return k + 1
+    if la > lb:
+        a, b, la, lb = b, a, lb, la
+    big = k + 1
+    before = None
+    prev = [j if j <= k else big for j in range(lb + 1)]
+    for i in range(1, la + 1):
+        lo, hi = max(1, i - k), min(lb, i + k)
+        cur = [big] * (lb + 1)
+        cur[0] = i if i <= k else big
+        ca = a[i - 1]
+        best = cur[0]
+        for j in range(lo, hi + 1):
+            cb = b[j - 1]
+            d = prev[j - 1] + (ca != cb)
+            if prev[j] + 1 < d:
+                d = prev[j] + 1
+            if cur[j - 1] + 1 < d:
+                d = cur[j - 1] + 1
+            if before is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb and before[j - 2] + 1 < d:
+                d = before[j - 2] + 1  # 入れ替え（rnadom → random）
+            cur[j] = d
+            if d < best:
+                best = d
+        if best > k:
+            return big
+        before, prev = prev, cur
+    return min(prev[lb], big)
+
+
+def deletions(s, k):
+    """s から k 文字以内を消してできる文字列すべて（s 自身を含む）"""
+    out = {s}
+    edge = {s}
+    for _ in range(k):
+        edge = {t[:i] + t[i + 1:] for t in edge for i in range(len(t))} - out
+        out |= edge
+    return out
+
+
+class AnswerKey:
+    """1問ぶんの正解（別解を含む）。読み込み時に作っておき、check() で採点する"""
+
+    __slots__ = ("display", "exact", "by_len", "lens", "fuzzy", "index")
+    INDEX_OVER = 64  # 別解がこれより多ければ「消してできる文字列」の索引を作る
+
+    def __init__(self, answers, fuzzy=True):
+        answers = [a.strip() for a in answers if a.strip()]
+        if not answers:
+            raise ValueError("正解が空です。")
+        self.display = answers[0]
+        self.exact = {}
+        for a in answers:
+            self.exact.setdefault(normalize(a), a)
+        self.by_len = sorted((len(n), n) for n in self.exact)
+        self.lens = [n for n, _ in self.by_len]
+        self.fuzzy = fuzzy
+        self.index = None
+        if fuzzy and len(self.exact) > self.INDEX_OVER:
+            # 距離 k 以内の2つの文字列は、どちらも k 文字以内を消すと同じ文字列になる（SymSpell の考え方）
+            self.index = {}
+            for norm in self.exact:
+                for d in deletions(norm, typo_limit(norm)):
+                    self.index.setdefault(d, []).append(norm)
+
+    @classmethod
+    def parse(cls, text, fuzzy=True):
+        """CSV の answer 列（"len|len()" のように | 区切りで別解）から作る"""
+        return cls(text.split(SEPARATOR), fuzzy)
+
+    def _candidates(self, u, k):
+        if self.index is None:
+            lo = bisect.bisect_left(self.lens, len(u) - k)
+            hi = bisect.bisect_right(self.lens, len(u) + k)
+            return [norm for _, norm in self.by_len[lo:hi]]
+        found = set()
+        for d in deletions(u, k):
+            found.update(self.index.get(d, ()))
+        return sorted(found, key=lambda n: (abs(len(n) - len(u)), n))
+
+    def check(self, user):
+        """(判定, 一番近い正解, 編集距離)。判定は "exact"（一致）/ "close"（打ち間違い）/ "wrong" """
+        u = normalize(user)
+        if not u:
+            return "wrong", self.display, None
+        hit = self.exact.get(u)
+        if hit is not None:
+            return "exact", hit, 0
+        k = max_typos(len(u))
+        if not self.fuzzy or k == 0:
+            return "wrong", self.display, None
+        best, best_d = None, k + 1
+        for norm in self._candidates(u, k):
+            limit = min(best_d - 1, typo_limit(norm))
+            if limit < 1:
+                continue
+            d = bounded_distance(u, norm, limit)
+            if d <= limit:
+                best, best_d = norm, d
+                if d == 1:
+                    break
+        if best is None:
+            return "wrong", self.display, None
+        return "close", self.exact[best], best_d
+
+
+def bench(n=20_000):
+    import random
+    import string
+
+    rng = random.Random(0)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12))) for _ in range(10_000)]
+    key = AnswerKey.parse("random()|乱数|らんだむ")
+    big = AnswerKey(words + ["random"])
+    cases = [("exact", key, "random"), ("full-width", key, "ＲＡＮＤＯＭ（）"), ("typo", key, "randon"),
+             ("wrong", key, "shuffle"), ("10k aliases exact", big, words[1234].upper()),
+             ("10k aliases typo", big, "rnadom"), ("10k aliases wrong", big, "zzzzzzzzzz")]
+    for label, k, text in cases:
+        start = time.perf_counter()
+        for _ in range(n):
+            r = k.check(text)
+        per = (time.perf_counter() - start) / n
+        print(f"{label:<20}{text!r:<22}{r[0]:<7}{per * 1e6:>8.2f} µs")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Day05: 答え合わせ（表記ゆれ・打ち間違いの許容）")
+    parser.add_argument("answer", nargs="?", help="正解（| で区切って別解）")
+    parser.add_argument("user", nargs="?", help="回答")
+    parser.add_argument("--strict", action="store_true", help="打ち間違いを許さない")
+    parser.add_argument("--bench", action="store_true", help="1回の採点にかかる時間")
+    args = parser.parse_args(argv)
+    if args.bench:
+        bench()
+        return
+    if args.answer is None or args.user is None:
+        parser.error("正解と回答を指定してください。")
+    verdict, matched, dist = AnswerKey.parse(args.answer, fuzzy=not args.strict).check(args.user)
+    print(f"{verdict}  （正解: {matched}  正規化: {normalize(args.user)!r}  編集距離: {dist}）")
+
+
+if __name__ == "__main__":
+    main()
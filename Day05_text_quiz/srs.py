@@ -0,0 +1,280 @@
+# Day05: 間隔反復（SM-2 方式）で出題する問題を選ぶ・成績を SQLite に残す
+# 使い方例:
+#   python app.py --srs                    # 復習の時期が来た問題から出題（足りなければ新しい問題）
+#   python app.py --srs --new 10 -n 20     # 1回20問、そのうち新しい問題は10問まで
+#   python srs.py stats                    # 問題集ごとの覚えた数・今日の復習数
+#   python srs.py bench --cards 300000     # 30万問・長い履歴での「次の問題選び」の時間
+#
+# 1問ごとに「覚えやすさ(ease)・次の間隔(日)・連続正解数・次の出題日時(due)」を progress.db に持つ。
+# 出題は due が過ぎたものを due の早い順に取る（(deck, due) の索引を引くだけなので問題数によらない）。
+# 答えた結果はメモリにためておき、最後（または一定数ごと）に1つのトランザクションでまとめて書く。
+# 問題は「問題文の先頭8バイトのハッシュ」で見分けるので、CSV の並び替えや追加をしても成績は残る。
+import argparse
+import hashlib
+import os
+import random
+import sqlite3
+import sys
+import time
+
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "progress.db")
+DAY = 86400.0
+FLUSH_EVERY = 256  # ためておく回答の数（これを超えたら書く）
+FAST = 5.0         # これより速く完全一致で答えたら「楽に思い出せた」（quality 5）
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS decks (
+    deck   TEXT PRIMARY KEY,
+    digest BLOB            -- 最後に問題番号をそろえたときの問題集の SHA-1
+);
+CREATE TABLE IF NOT EXISTS cards (
+    deck     TEXT    NOT NULL,
+    qkey     INTEGER NOT NULL,  -- 問題文のハッシュ（64ビット）
+    qid      INTEGER NOT NULL,  -- 問題集の中の番号（問題集が変わったら付け直す）
+    ease     REAL    NOT NULL,
+    interval REAL    NOT NULL,  -- 日
+    reps     INTEGER NOT NULL,  -- 連続正解数
+    lapses   INTEGER NOT NULL,
+    due      REAL    NOT NULL,  -- 次の出題日時（UNIX秒）
+    seen     INTEGER NOT NULL,
+    correct  INTEGER NOT NULL,
+    latency  REAL    NOT NULL,  -- 回答時間の平均（秒）
+    PRIMARY KEY (deck, qkey)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cards_due ON cards (deck, due);
+CREATE TABLE IF NOT EXISTS reviews (
+    deck    TEXT    NOT NULL,
+    qkey    INTEGER NOT NULL,
+    ts      REAL    NOT NULL,
+    quality INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    latency REAL    NOT NULL
+);
+"""
+
+
+def question_key(text):
+    """問題文 → 64ビットの符号付き整数（SQLite の INTEGER に入る）"""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+def quality_of(verdict, elapsed, time_limit=0):
+    """採点結果と回答時間 → SM-2 の quality（0〜5）"""
+    if verdict == "timeout":
+        return 0
+    if verdict == "wrong":
+        return 1
+    if verdict == "close":
+        return 3
+    fast = min(FAST, time_limit / 3) if time_limit else FAST
+    return 5 if elapsed <= fast else 4
+
+
+def sm2(ease, interval, reps, quality):
+    """SM-2 の更新。(ease, interval(日), reps, 間違えたか) を返す"""
+    ease = max(1.3, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    if quality < 3:
+        return ease, 1.0, 0, True
+    reps += 1
+    if reps == 1:
+        interval = 1.0
+    elif reps == 2:
+        interval = 6.0
+    else:
+        interval = round(interval * ease, 2)
+    return ease, interval, reps, False
+
+
+class Scheduler:
+    """1つの問題集（deck）についての出題選び・記録"""
+
+    def __init__(self, bank, db_path=DB_PATH, deck=None, now=time.time):
+        self.bank = bank
+        self.deck = deck or os.path.abspath(bank.path)
+        self.now = now
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.cards = {}    # 今回の出題で読んだカード qkey -> 状態
+        self.pending = []  # まだ書いていない回答
+        self._sync()
+
+    def _sync(self):
+        """問題集の中身が変わっていたら、成績のある問題の番号を付け直す（変わっていなければ何もしない）"""
+        row = self.db.execute("SELECT digest FROM decks WHERE deck = ?", (self.deck,)).fetchone()
+        if row and row[0] == self.bank.sha1:
+            return
+        known = {k for (k,) in self.db.execute("SELECT qkey FROM cards WHERE deck = ?", (self.deck,))}
+        if known:
+            moved = []
+            for i in range(len(self.bank)):
+                k = question_key(self.bank.question(i))
+                if k in known:
+                    moved.append((i, self.deck, k))
+            with self.db:
+                self.db.execute("UPDATE cards SET qid = -1 WHERE deck = ?", (self.deck,))  # 消えた問題
+                self.db.executemany("UPDATE cards SET qid = ? WHERE deck = ? AND qkey = ?", moved)
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO decks VALUES (?, ?)", (self.deck, self.bank.sha1))
+
+    def due(self, limit):
+        """復習の時期が来た問題（due の早い順）"""
+        rows = self.db.execute(
+            "SELECT qkey, qid, ease, interval, reps, lapses, due, seen, correct, latency FROM cards "
+            "WHERE deck = ? AND due <= ? AND qid >= 0 ORDER BY due LIMIT ?",
+            (self.deck, self.now(), limit)).fetchall()
+        return rows
+
+    def next_questions(self, k, new=None, rng=random):
+        """出題する k 問。復習が先、残りを新しい問題（最大 new 問）で埋める"""
+        new = k if new is None else new
+        out = []
+        for qkey, qid, *state in self.due(k):
+            item = self.bank[qid]
+            self.cards[qkey] = state
+            out.append(dict(item, qkey=qkey, review=True))
+        want = min(k - len(out), new)
+        tried = 0
+        # 新しい問題は番号を抽選し、成績のある問題ならやり直す（大きな問題集ならほぼ1回で決まる）
+        while want > 0 and tried < 20 * k:
+            tried += 1
+            i = rng.randrange(len(self.bank))
+            item = self.bank[i]
+            qkey = question_key(item["q"])
+            if qkey in self.cards or self.db.execute(
+                    "SELECT 1 FROM cards WHERE deck = ? AND qkey = ?", (self.deck, qkey)).fetchone():
+                continue
+            self.cards[qkey] = None
+            out.append(dict(item, qkey=qkey, review=False))
+            want -= 1
+        return out
+
+    def record(self, item, verdict, elapsed, time_limit=0):
+        """1問の結果をためる。次の出題までの日数を返す"""
+        quality = quality_of(verdict, elapsed, time_limit)
+        now = self.now()
+        state = self.cards.get(item["qkey"])
+        if state is None:
+            ease, interval, reps, lapses, _, seen, correct, latency = 2.5, 0.0, 0, 0, now, 0, 0, 0.0
+        else:
+            ease, interval, reps, lapses, _, seen, correct, latency = state
+        ease, interval, reps, lapsed = sm2(ease, interval, reps, quality)
+        ok = verdict in ("exact", "close")
+        latency = (latency * seen + elapsed) / (seen + 1)
+        state = [ease, interval, reps, lapses + lapsed, now + interval * DAY, seen + 1, correct + ok, latency]
+        self.cards[item["qkey"]] = state
+        self.pending.append((item["qkey"], item["id"], state, now, quality, ok, elapsed))
+        if len(self.pending) >= FLUSH_EVERY:
+            self.flush()
+        return interval
+
+    def flush(self):
+        """ためた回答を1つのトランザクションで書く"""
+        if not self.pending:
+            return
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO cards VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (deck, qkey) DO UPDATE SET qid = excluded.qid, ease = excluded.ease, "
+                "interval = excluded.interval, reps = excluded.reps, lapses = excluded.lapses, "
+                "due = excluded.due, seen = excluded.seen, correct = excluded.correct, latency = excluded.latency",
+                [(self.deck, qkey, qid, *state) for qkey, qid, state, *_ in self.pending])
+            self.db.executemany(
+                "INSERT INTO reviews VALUES (?, ?, ?, ?, ?, ?)",
+                [(self.deck, qkey, ts, quality, ok, elapsed)
+                 for qkey, _, _, ts, quality, ok, elapsed in self.pending])
+        self.pending.clear()
+
+    def summary(self):
+        now = self.now()
+        total, due_now, due_day, learned = self.db.execute(
+            "SELECT count(*), sum(due <= ?), sum(due <= ?), sum(reps >= 2) FROM cards WHERE deck = ?",
+            (now, now + DAY, self.deck)).fetchone()
+        return {"cards": total, "due_now": due_now or 0, "due_24h": due_day or 0, "learned": learned or 0,
+                "questions": len(self.bank)}
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def stats(db_path=DB_PATH):
+    db = sqlite3.connect(db_path)
+    now = time.time()
+    rows = db.execute(
+        "SELECT deck, count(*), sum(due <= ?), sum(reps >= 2), sum(seen), sum(correct), avg(ease) "
+        "FROM cards GROUP BY deck", (now,)).fetchall()
+    db.close()
+    if not rows:
+        print("まだ記録がありません。python app.py --srs で始めましょう。")
+    for deck, n, due, learned, seen, correct, ease in rows:
+        print(f"{deck}\n  出題済み {n:,}問  覚えた {learned or 0:,}問  今すぐ復習 {due or 0:,}問  "
+              f"正答率 {correct / seen * 100 if seen else 0:.1f}%  平均ease {ease:.2f}")
+
+
+def bench(cards=300_000, history=10, k=20):
+    """cards 問すべてに成績と history 回ぶんの履歴がある状態で、出題選びと記録の時間を測る"""
+    import tempfile
+
+    import bank as bankmod
+
+    with tempfile.TemporaryDirectory() as d:
+        csv_path = os.path.join(d, "big.csv")
+        bankmod.write_sample_csv(csv_path, cards)
+        qb = bankmod.open_bank(csv_path)
+        db_path = os.path.join(d, "progress.db")
+        rng = random.Random(0)
+        now = time.time()
+        with Scheduler(qb, db_path) as s:
+            start = time.perf_counter()
+            rows, reviews = [], []
+            for i in range(cards):
+                qkey = question_key(qb.question(i))
+                rows.append((s.deck, qkey, i, 2.5, 6.0, 2, 0, now + rng.uniform(-30, 30) * DAY, history, history,
+                             3.0))
+                reviews += [(s.deck, qkey, now - h * DAY, 4, 1, 3.0) for h in range(history)]
+            with s.db:
+                s.db.executemany("INSERT INTO cards VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                s.db.executemany("INSERT INTO reviews VALUES (?, ?, ?, ?, ?, ?)", reviews)
+            print(f"準備: {cards:,}問・履歴 {cards * history:,}件（{time.perf_counter() - start:.1f}秒）")
+            times = []
+            for _ in range(50):
+                start = time.perf_counter()
+                items = s.next_questions(k)
+                for item in items:
+                    s.record(item, "exact", 2.0)
+                s.flush()
+                times.append(time.perf_counter() - start)
+                s.cards.clear()
+            times.sort()
+            print(f"{k}問を選んで記録する時間: 中央値 {times[len(times) // 2] * 1e3:.2f} ms  "
+                  f"最大 {times[-1] * 1e3:.2f} ms")
+        qb.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Day05: 間隔反復の記録")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("stats", help="問題集ごとの記録")
+    p.add_argument("--db", default=DB_PATH)
+    p = sub.add_parser("bench", help="大きな記録での出題選びの時間")
+    p.add_argument("--cards", type=int, default=300_000)
+    p.add_argument("--history", type=int, default=10, help="1問あたりの過去の回答数")
+    args = parser.parse_args(argv)
+    if args.cmd == "stats":
+        if not os.path.exists(args.db):
+            sys.exit("まだ記録がありません。python app.py --srs で始めましょう。")
+        stats(args.db)
+    else:
+        bench(args.cards, args.history)
+
+
+if __name__ == "__main__":
+    main()
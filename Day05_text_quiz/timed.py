@@ -0,0 +1,162 @@
+# Day05: 制限時間つきの入力（締め切りで打ち切り・残り時間を表示）
+# 使い方例:
+#   python app.py --time-limit 10          # 10秒で打ち切り。残り秒数を入力行に表示しつづける
+#   python timed.py 5                      # 5秒の入力を1回だけ試す
+#
+# input() は Enter が押されるまで戻ってこないので、「時間を過ぎたか」は答えた後にしか分からない。
+# ここでは端末を cbreak モード（1文字ずつ・エコーなし）にし、selectors で
+# 「キーが来る」か「次の表示更新（0.1秒ごと）」か「締め切り」まで待つ。スレッドは使わない。
+# 文字の表示・Backspace・Enter は自分で処理し、締め切りの瞬間に入力途中でも打ち切る。
+# 時間は time.monotonic_ns（締め切り）と time.perf_counter_ns（回答時間）で測る。
+# 端末でない（パイプなど）ときは表示の更新はせず、締め切りまでに1行届くかだけを見る。
+# 普通のファイル（< answers.txt）は epoll に登録できず、いつでもすぐ読めるので selectors を使わずに読む。
+import codecs
+import os
+import selectors
+import stat
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import termios
+    import tty
+except ImportError:  # Windows など termios が無い環境
+    termios = None
+    tty = None
+
+TICK = 0.1  # 残り時間の表示を更新する間隔（秒）
+ENTER = ("\r", "\n")
+BACKSPACE = ("\x7f", "\b")
+KILL_LINE = "\x15"  # Ctrl-U
+EOF_KEY = "\x04"    # Ctrl-D
+
+
+@contextmanager
+def cbreak(fd):
+    """端末を cbreak モードにする（終了時に必ず戻す）。端末でなければ何もしない"""
+    if termios is None or not os.isatty(fd):
+        yield False
+        return
+    old = termios.tcgetattr(fd)
+    try:
+        tty.setcbreak(fd)  # 行バッファとエコーを無効化（Ctrl-Cは有効のまま）
+        yield True
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, old)
+
+
+class TimedReader:
+    """締め切りつきで1行読む。読みすぎた分（パイプで次の行が届いている等）は次回に回す"""
+
+    def __init__(self, fd=None, out=None):
+        self.fd = sys.stdin.fileno() if fd is None else fd
+        self.out = out or sys.stdout
+        self.tty = termios is not None and os.isatty(self.fd)
+        if stat.S_ISREG(os.fstat(self.fd).st_mode):
+            self.sel = None  # 普通のファイルは待たずに読める
+        else:
+            self.sel = selectors.DefaultSelector()
+            self.sel.register(self.fd, selectors.EVENT_READ)
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.pending = ""  # 読んだがまだ使っていない文字
+        self.eof = False
+
+    def close(self):
+        if self.sel is not None:
+            self.sel.close()
+
+    def _draw(self, prompt, text, left_ns):
+        if not self.tty:
+            return
+        head = "" if left_ns is None else f"[残り {max(0, left_ns) / 1e9:4.1f}秒] "
+        self.out.write(f"\r\x1b[K{head}{prompt}{text}")
+        self.out.flush()
+
+    def _fill(self, timeout):
+        """timeout 秒まで入力を待って pending に足す。何か届いたら True"""
+        if self.eof:
+            return False
+        if self.sel is not None and not self.sel.select(timeout):
+            return False
+        data = os.read(self.fd, 4096)
+        if not data:
+            self.eof = True
+            self.pending += self.decoder.decode(b"", final=True)
+            return True
+        self.pending += self.decoder.decode(data)
+        return True
+
+    def read_line(self, prompt, limit=None):
+        """(入力した文字列, 経過秒, 時間切れか) を返す。時間切れ・入力終了なら文字列は None
+
+        経過秒は プロンプトを出してから Enter を読んだ瞬間まで（perf_counter_ns、ns 単位）。
+        """
+        start = time.perf_counter_ns()
+        deadline = None if not limit else time.monotonic_ns() + int(limit * 1e9)
+        if not self.tty:
+            self.out.write(prompt)
+            self.out.flush()
+        text = []
+        with cbreak(self.fd):
+            while True:
+                # ためてある文字を処理する
+                while self.pending:
+                    ch, self.pending = self.pending[0], self.pending[1:]
+                    if ch in ENTER:
+                        elapsed = (time.perf_counter_ns() - start) / 1e9
+                        if ch == "\r" and self.pending.startswith("\n"):
+                            self.pending = self.pending[1:]
+                        self.out.write("\n")
+                        self.out.flush()
+                        return "".join(text), elapsed, False
+                    if ch in BACKSPACE:
+                        if text:
+                            text.pop()
+                    elif ch == KILL_LINE:
+                        text.clear()
+                    elif ch == EOF_KEY and not text:
+                        self.eof = True
+                    elif ch.isprintable():
+                        text.append(ch)
+                if self.eof:
+                    # 最後の行が改行なしで終わっていたら、それを答えとして扱う
+                    self.out.write("\n")
+                    return "".join(text) if text else None, (time.perf_counter_ns() - start) / 1e9, False
+                left = None if deadline is None else deadline - time.monotonic_ns()
+                if left is not None and left <= 0:
+                    self._draw(prompt, "".join(text), 0)
+                    self.out.write("\n")
+                    self.out.flush()
+                    return None, (time.perf_counter_ns() - start) / 1e9, True
+                self._draw(prompt, "".join(text), left)
+                if self.tty and left is not None:
+                    wait = min(TICK, left / 1e9)
+                else:
+                    wait = None if left is None else left / 1e9
+                self._fill(wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def available():
+    """このOSで selectors による標準入力の待ち受けが使えるか（Windows は不可）"""
+    return termios is not None
+
+
+def main(argv=None):
+    limit = float((argv or sys.argv[1:] or ["5"])[0])
+    with TimedReader() as r:
+        text, sec, timeout = r.read_line("入力> ", limit)
+    if timeout:
+        print(f"時間切れ（{sec * 1e3:.3f} ms）")
+    else:
+        print(f"{text!r}（{sec * 1e3:.3f} ms）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+# Day06: 問題CSVの読み込み（列ごとにまとめて検査）と、中身のハッシュで引くキャッシュ
+# 使い方例:
+#   python loader.py questions.csv             # 読み込んで有効な問題数と時間を表示
+#   python loader.py --bench --rows 500000     # 50万問のCSVで従来（iterrows）と比べる
+#
+# 1行ずつ iterrows() で辞書にするのをやめ、pandas の列の操作（str.strip / isdigit / 範囲の比較）で
+# 全行をまとめて検査する。CSV は pyarrow で CHUNK_BYTES ずつ読み、塊ごとに検査してからつなぐ。
+# 読み込んだ問題集（読み取り専用の QuestionSet）は「CSVのバイト列の SHA-1」をキーにして
+# プロセス全体で共有のキャッシュに置く（BankCache、古いものから捨てる）。同じCSVを選び直しても、
+# 別のセッションが同じCSVを使っても読み直さない。Streamlit の再実行でもモジュールは読み込み直されないので、キャッシュは残る。
+import argparse
+import hashlib
+import io
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+
+NEEDED = ["question", "choice1", "choice2", "choice3", "choice4", "answer"]
+CHOICES = NEEDED[1:5]
+CHUNK_BYTES = 16 << 20  # CSVをこの大きさずつ読んで検査する
+MAX_BANKS = 8         # キャッシュに置く問題集の数
+MAX_ROWS = 5_000_000  # キャッシュに置く問題数の合計
+
+
+class QuestionSet:
+    """検査済みの問題集。bank[i] で {'q', 'choices', 'answer_idx'} の辞書を返す
+
+    全セッションで1つを共有する読み取り専用の入れ物。文字列の列は pyarrow の配列
+    （連結した UTF-8 と開始位置の表）で、行ごとの Python の文字列・辞書は作らない。
+    正解の位置は書き込み禁止の int8 配列。
+    """
+
+    def __init__(self, frame):
+        self.columns = tuple(pa.array(frame[c], type=pa.large_string()) for c in NEEDED[:5])
+        answer_idx = frame["answer_idx"].to_numpy(dtype=np.int8, copy=True)
+        answer_idx.flags.writeable = False
+        self.answer_idx = answer_idx  # (n,) 正解の位置 0〜3
+
+    def __len__(self):
+        return len(self.answer_idx)
+
+    def __getitem__(self, i):
+        q, c1, c2, c3, c4 = (col[i].as_py() for col in self.columns)
+        return {"q": q, "choices": [c1, c2, c3, c4], "answer_idx": int(self.answer_idx[i])}
+
+    @property
+    def nbytes(self):
+        return sum(col.nbytes for col in self.columns) + self.answer_idx.nbytes
+
+    def to_items(self):
+        cols = [col.to_pylist() for col in self.columns]
+        return [{"q": q, "choices": [c1, c2, c3, c4], "answer_idx": int(a)}
+                for q, c1, c2, c3, c4, a in zip(*cols, self.answer_idx)]
+
+
+ANSWER_IDX = {"1": 0, "2": 1, "3": 2, "4": 3}
+
+
+def parse_frame(df):
+    """文字列の DataFrame（NEEDED 列）→ 有効な行だけの DataFrame（answer は answer_idx 0〜3 に）
+
+    条件は従来どおり「問題文と4つの選択肢が空でない」「answer が 1〜4 の数字」。
+    """
+    out = pd.DataFrame({c: df[c].str.strip() for c in NEEDED[:5]})
+    ans = df["answer"].str.strip()
+    idx = ans.map(ANSWER_IDX)
+    # "01" や全角の "２" も従来は int() で通っていたので、残りの数字だけ1つずつ変換する
+    rest = ans[idx.isna()]
+    rest = rest[rest.str.isdigit()]
+    if len(rest):
+        idx[rest.index] = [int(a) - 1 for a in rest]
+    ok = idx.between(0, 3)
+    for c in NEEDED[:5]:
+        ok &= out[c] != ""
+    out = out[ok]
+    out["answer_idx"] = idx[ok].astype(np.int8)
+    return out
+
+
+def read_bank(data, chunk_bytes=CHUNK_BYTES):
+    """CSV のバイト列 → QuestionSet。列が足りない・有効な問題が無いときは ValueError
+
+    pyarrow の CSV リーダーで chunk_bytes ずつ読み、塊ごとに検査してからつなぐ。
+    """
+    reader = pa_csv.open_csv(
+        io.BytesIO(data), read_options=pa_csv.ReadOptions(block_size=chunk_bytes),
+        # 引用符の中の改行（複数行の問題文）を許し、列の数が合わない行は従来（pandas）と同じく飛ばす
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True, invalid_row_handler=lambda row: "skip"),
+        convert_options=pa_csv.ConvertOptions(column_types={c: pa.string() for c in NEEDED},
+                                              strings_can_be_null=False))
+    if not all(col in reader.schema.names for col in NEEDED):
+        raise ValueError("CSVのヘッダーは question,choice1,choice2,choice3,choice4,answer が必要です。")
+    parts = [parse_frame(batch.select(NEEDED).to_pandas()) for batch in reader]
+    frame = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+    if len(frame) == 0:
+        raise ValueError("有効な問題がありません。CSVの内容を確認してください。")
+    return QuestionSet(frame)
+
+
+class BankCache:
+    """中身のハッシュ → QuestionSet。件数・問題数の上限を超えたら使われていない順に捨てる"""
+
+    def __init__(self, max_banks=MAX_BANKS, max_rows=MAX_ROWS):
+        self.max_banks = max_banks
+        self.max_rows = max_rows
+        self._banks = OrderedDict()
+        self._lock = threading.Lock()  # Streamlit はセッションごとに別スレッドで動く
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, data):
+        key = hashlib.sha1(data).hexdigest()
+        with self._lock:
+            bank = self._banks.get(key)
+            if bank is not None:
+                self._banks.move_to_end(key)
+                self.hits += 1
+                return bank
+        bank = read_bank(data)  # 読み込みの間はロックを持たない（同時に同じCSVなら2回読むだけ）
+        with self._lock:
+            self.misses += 1
+            self._banks[key] = bank
+            self._banks.move_to_end(key)
+            while len(self._banks) > 1 and (len(self._banks) > self.max_banks or
+                                            sum(len(b) for b in self._banks.values()) > self.max_rows):
+                self._banks.popitem(last=False)
+        return bank
+
+    def clear(self):
+        with self._lock:
+            self._banks.clear()
+
+
+cache = BankCache()
+
+
+def load(file):
+    """パス・ファイルオブジェクト（Streamlit のアップロードを含む）・バイト列・文字列から読み込む"""
+    if isinstance(file, str):
+        with open(file, "rb") as f:
+            data = f.read()
+    elif isinstance(file, bytes):
+        data = file
+    elif hasattr(file, "getvalue"):
+        data = file.getvalue()
+        data = data.encode("utf-8") if isinstance(data, str) else data
+    else:
+        data = file.read()
+        data = data.encode("utf-8") if isinstance(data, str) else data
+    return cache.get(data)
+
+
+def load_iterrows(file):
+    """従来の読み込み方（1行ずつ iterrows）。bench の比較用"""
+    df = pd.read_csv(file)
+    items = []
+    for _, row in df.iterrows():
+        q = str(row["question"]).strip()
+        choices = [str(row[f"choice{i}"]).strip() for i in range(1, 5)]
+        ans = str(row["answer"]).strip()
+        if not (q and all(choices) and ans.isdigit()):
+            continue
+        idx = int(ans) - 1
+        if idx not in (0, 1, 2, 3):
+            continue
+        items.append({"q": q, "choices": choices, "answer_idx": idx})
+    return items
+
+
+def sample_csv(rows, seed=0):
+    """ベンチマーク用の CSV（バイト列）。1%くらい不正な行を混ぜる"""
+    rng = random.Random(seed)
+    words = ["random", "len", "lower", "keys", "range", "math", "time", "os", "size", "items", "count"]
+    out = io.StringIO()
+    out.write(",".join(NEEDED) + "\n")
+    for i in range(rows):
+        ch = rng.sample(words, 4)
+        ans = rng.choice("12345") if rng.random() < 0.01 else rng.choice("1234")
+        out.write(f"問題{i}: {ch[int(ans) % 4]} はどれ？,{ch[0]},{ch[1]},{ch[2]},{ch[3]},{ans}\n")
+    return out.getvalue().encode("utf-8")
+
+
+def bench(rows=500_000, old_rows=20_000):
+    data = sample_csv(rows)
+    small = sample_csv(old_rows)
+    start = time.perf_counter()
+    old = load_iterrows(io.BytesIO(small))
+    old_sec = (time.perf_counter() - start) * rows / old_rows
+    same = old == read_bank(small).to_items()
+    cache.clear()
+    start = time.perf_counter()
+    bank = load(data)
+    new_sec = time.perf_counter() - start
+    start = time.perf_counter()
+    load(data)
+    hit_sec = time.perf_counter() - start
+    print(f"{rows:,}行（{len(data) / 1e6:.0f}MB）、有効 {len(bank):,}問")
+    print(f"  従来（iterrows、{old_rows:,}行から換算）: {old_sec:>8.2f} 秒")
+    print(f"  列ごとにまとめて検査                 : {new_sec:>8.2f} 秒")
+    print(f"  キャッシュから（同じCSVをもう一度）  : {hit_sec * 1e3:>8.1f} ms（ハッシュ計算のみ）")
+    print(f"  従来と結果が一致: {'はい' if same else 'いいえ'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Day06: 問題CSVの読み込み")
+    parser.add_argument("csv", nargs="?", default="questions.csv")
+    parser.add_argument("--bench", action="store_true", help="大きなCSVで従来の方法と比べる")
+    parser.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args(argv)
+    if args.bench:
+        bench(args.rows)
+        return
+    start = time.perf_counter()
+    try:
+        bank = load(args.csv)
+    except (OSError, ValueError) as e:
+        sys.exit(str(e))
+    print(f"{len(bank):,}問（{(time.perf_counter() - start) * 1e3:.1f} ms）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# Day06: 同時に何人まで使えるかの負荷テスト（ブラウザ・ネットワークなし）
+# 使い方例:
+#   python loadtest.py                                     # 200人 × 20操作を、5問 / 1万問 / 10万問の問題集で
+#   python loadtest.py --sessions 500 --banks 5,500000 --json result.json
+#   python loadtest.py --baseline result.json              # 前回より遅く・重くなっていたら終了コード 1
+#
+# Streamlit の AppTest（rerun_bench.FragmentRunner）でセッションを --sessions 個作り、全員が1操作ずつ
+# 順番に進める（ラウンドロビン）。各セッションは 開く → CSVをアップロードして「このCSVで開始」→
+# 答える / スキップ / 次へ をくり返し、最後まで行ったら「もう一度」。クイズ部分のボタンはブラウザと同じく
+# fragment だけを再実行する。時間は1操作ごとのスクリプトの実行時間（rerun_bench と同じ測り方）。
+# サーバーはセッションごとにスレッドを使うが、スクリプトは GIL のため1つずつしか進まないので、
+# 「1秒に何操作さばけるか」から「--think 秒に1回押す人が何人まで待たされずに使えるか」を見積もる。
+# メモリは全セッションを生かしたまま RSS の最大値を測る（AppTest が持つ画面の情報も含むので、実際より少し多め）。
+import argparse
+import gc
+import json
+import logging
+import platform
+import random
+import statistics
+import sys
+import time
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import loader
+from order import rss_mb
+from rerun_bench import click, find_button, percentile, rerun
+
+SKIP_RATE = 0.2          # 答えずに「次へ」を押す（スキップ）割合
+SLOWDOWN = 0.30          # --baseline と比べてスループットがこれ以上落ちたら失敗
+MEMORY_GROWTH = 0.30     # --baseline と比べて1セッションあたりのメモリがこれ以上増えたら失敗
+KINDS = ["開く", "アップロード", "回答", "スキップ", "次へ", "もう一度"]
+
+# AppTest の外（メインスレッド）からセッションを触ると出る警告を止める（レベルは Streamlit が設定し直すのでフィルターで）
+logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(
+    lambda record: "missing ScriptRunContext" not in record.getMessage())
+
+
+class Learner:
+    """1人ぶんの操作。step() で次の1操作を行い (種類, 記録) を返す"""
+
+    def __init__(self, app_path, data, rng, timeout=60):
+        self.at = AppTest.from_file(app_path, default_timeout=timeout)
+        self.data = data
+        self.rng = rng
+        self.timeout = timeout
+        self.stage = "open"
+
+    def step(self):
+        at, rng = self.at, self.rng
+        if self.stage == "open":
+            self.stage = "upload"
+            return "開く", rerun(at, timeout=self.timeout)
+        if self.stage == "upload":
+            self.stage = "quiz"
+            at.file_uploader[0].upload("questions.csv", self.data, "text/csv")
+            rec = click(at, find_button(at, "このCSVで開始"), timeout=self.timeout)
+            if not at.success:
+                raise RuntimeError("CSVを読み込めませんでした: " + " ".join(e.value for e in at.error))
+            return "アップロード", rec
+        restart = find_button(at, "🔁")
+        if restart is not None:
+            return "もう一度", click(at, restart, fragment=True)
+        choices = [b for b in at.button if b.key and b.key.startswith("c") and not b.disabled]
+        if choices:
+            if rng.random() < SKIP_RATE:
+                return "スキップ", click(at, find_button(at, "▶"), fragment=True)
+            return "回答", click(at, rng.choice(choices), fragment=True)
+        # 回答済み：「次へ」か「スキップ」（回答後はどちらも次の問題へ進む）
+        return "次へ", click(at, find_button(at, rng.choice(["▶", "⏭"])), fragment=True)
+
+
+def run_bank(app_path, rows, sessions, actions, think, seed=0):
+    """rows 問の問題集で sessions 人 × actions 操作。結果の辞書を返す"""
+    data = loader.sample_csv(rows, seed=seed)
+    loader.cache.clear()
+    gc.collect()
+    base = rss_mb()
+    peak = base
+    rng = random.Random(seed)
+    learners = [Learner(app_path, data, random.Random(rng.getrandbits(64))) for _ in range(sessions)]
+    records = {k: [] for k in KINDS}
+    start = time.perf_counter()
+    for _ in range(actions):
+        for learner in learners:
+            kind, rec = learner.step()
+            records[kind].append(rec)
+        peak = max(peak, rss_mb())
+    wall = time.perf_counter() - start
+    done = [r for rec in records.values() for r in rec]
+    busy = sum(r["sec"] for r in done)
+    quiz = [r for k in ("回答", "スキップ", "次へ", "もう一度") for r in records[k]]
+    per_sec = len(quiz) / sum(r["sec"] for r in quiz) if quiz else 0.0
+    result = {
+        "rows": rows, "questions": len(loader.load(data)), "sessions": sessions, "actions": actions,
+        "csv_mb": len(data) / 1e6,
+        "kinds": {k: {"n": len(rec),
+                      "p50_ms": percentile([r["sec"] for r in rec], 0.5) * 1e3,
+                      "p90_ms": percentile([r["sec"] for r in rec], 0.9) * 1e3,
+                      "p99_ms": percentile([r["sec"] for r in rec], 0.99) * 1e3,
+                      "cpu_ms": statistics.mean(r["cpu"] for r in rec) * 1e3,
+                      "kb": statistics.mean(r["bytes"] for r in rec) / 1e3}
+                  for k, rec in records.items() if rec},
+        "per_sec": per_sec,                  # クイズ部分の操作を1秒に何回さばけるか（スクリプトの実行時間から）
+        "all_per_sec": len(done) / busy,     # アップロード・開くも含めて
+        "wall_per_sec": len(done) / wall,    # AppTest の準備なども含めた実際の速さ（参考）
+        "capacity": int(per_sec * think),    # think 秒に1回押す人なら何人まで
+        "base_mb": base,
+        "peak_mb": peak,
+        "mb_per_session": (peak - base) / sessions,
+    }
+    del learners
+    gc.collect()
+    return result
+
+
+def compare(banks, baseline, slowdown=SLOWDOWN, growth=MEMORY_GROWTH):
+    """前回の結果と比べて、遅く・重くなりすぎた項目のリスト"""
+    before = {(r["rows"], r["sessions"]): r for r in baseline.get("banks", [])}
+    worse = []
+    for r in banks:
+        old = before.get((r["rows"], r["sessions"]))
+        if old is None:
+            continue
+        if r["per_sec"] < old["per_sec"] * (1 - slowdown):
+            worse.append({"rows": r["rows"], "item": "操作/秒", "before": old["per_sec"], "after": r["per_sec"]})
+        if r["mb_per_session"] > max(old["mb_per_session"], 0.1) * (1 + growth):
+            worse.append({"rows": r["rows"], "item": "MB/セッション",
+                          "before": old["mb_per_session"], "after": r["mb_per_session"]})
+    return worse
+
+
+def print_bank(r, think, out=sys.stdout):
+    print(f"\n問題集 {r['questions']:,}問（CSV {r['csv_mb']:.1f}MB）、{r['sessions']}人 × {r['actions']}操作", file=out)
+    print(f"  {'操作':<8}{'回数':>7}{'中央値':>10}{'p90':>9}{'p99':>9}{'CPU':>9}{'送信':>9}", file=out)
+    for k, s in r["kinds"].items():
+        print(f"  {k:<8}{s['n']:>7,}{s['p50_ms']:>8.2f}ms{s['p90_ms']:>7.2f}ms{s['p99_ms']:>7.2f}ms"
+              f"{s['cpu_ms']:>7.2f}ms{s['kb']:>7.1f}KB", file=out)
+    print(f"  スループット: クイズの操作 {r['per_sec']:,.0f} 回/秒（開く・アップロード込み {r['all_per_sec']:,.0f} 回/秒、"
+          f"AppTest込み {r['wall_per_sec']:,.0f} 回/秒）", file=out)
+    print(f"  {think:g}秒に1回押す人なら約 {r['capacity']:,} 人まで（1コア）", file=out)
+    print(f"  メモリ: RSS {r['base_mb']:,.0f}MB → 最大 {r['peak_mb']:,.0f}MB、"
+          f"1セッションあたり {r['mb_per_session']:.2f}MB", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Day06: 同時セッションの負荷テスト")
+    parser.add_argument("--app", default="app.py")
+    parser.add_argument("--sessions", type=int, default=200, help="同時に使う人数")
+    parser.add_argument("--actions", type=int, default=20, help="1人あたりの操作回数（開く・アップロードを含む）")
+    parser.add_argument("--banks", default="5,10000,100000", help="問題集の行数（カンマ区切り）")
+    parser.add_argument("--think", type=float, default=5.0, help="1人が次に押すまでの秒数（人数の見積もり用）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="結果を書き出す JSON ファイル（- で標準出力）")
+    parser.add_argument("--baseline", default=None, help="比べる前回の JSON")
+    args = parser.parse_args(argv)
+    out = sys.stderr if args.json == "-" else sys.stdout  # JSON を標準出力に出すときは、表は標準エラーへ
+
+    report = {"python": platform.python_version(), "streamlit": st.__version__, "machine": platform.machine(),
+              "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "banks": []}
+    for rows in (int(x) for x in args.banks.split(",")):
+        r = run_bank(args.app, rows, args.sessions, args.actions, args.think, args.seed)
+        report["banks"].append(r)
+        print_bank(r, args.think, out)
+    failed = False
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            worse = compare(report["banks"], json.load(f))
+        report["regressions"] = worse
+        for w in worse:
+            print(f"悪くなった: {w['rows']:,}行 {w['item']}  {w['before']:,.2f} → {w['after']:,.2f}", file=out)
+        failed = bool(worse)
+    report["ok"] = not failed
+    if args.json == "-":
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=1)
+        print()
+    elif args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# Day06: セッションごとの出題順・選択肢の並び（問題集は共有のまま、並びだけを持つ）
+# 使い方例:
+#   python order.py                                    # 20問の問題集での出題順の例
+#   python order.py --bench --rows 500000 --sessions 200   # セッションを増やしたときのメモリ
+#
+# 以前は各セッションが問題の辞書のリストを丸ごと持ち、その場でシャッフルしていたので、
+# メモリは「セッション数 × 問題数」で増えた。今は問題集（loader.QuestionSet）をプロセスで1つだけ持ち、
+# 各セッションは QuizOrder（シード・問題数・答えた記録）だけを持つ。
+# k 問目に出す問題の番号は、シードで決まる「0〜n-1 の並べ替え」（小さなファイステル暗号と
+# サイクルウォーク）で毎回計算するので、並びの配列を作らない。選択肢の並び（4! = 24 通り）も
+# シードと k から決める。セッションのメモリは出題した問題の数にしか比例しない。
+import argparse
+import os
+import secrets
+import sys
+import time
+from itertools import permutations
+
+MASK64 = (1 << 64) - 1
+ROUNDS = 4
+CHOICE_PERMS = tuple(permutations(range(4)))  # 選択肢の並び 24 通り
+UNANSWERED = 255  # answers の「まだ答えていない」
+
+
+def _mix(x):
+    """64ビットの値をよく混ぜる（splitmix64 の最後の部分）"""
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9 & MASK64
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EB & MASK64
+    return x ^ (x >> 31)
+
+
+class QuizOrder:
+    """1セッションぶんの出題順。order[k] で k 問目に出す問題の番号、choice_perm(k) で選択肢の並び
+
+    answers には k 問目で選んだ選択肢（並べ替えた後の位置。UNANSWERED なら未回答・スキップ）を1バイトずつ残す。
+    """
+
+    __slots__ = ("n", "seed", "_half", "_mask", "answers")
+
+    def __init__(self, n, seed=None):
+        if n <= 0:
+            raise ValueError("問題がありません。")
+        self.n = n
+        self.seed = secrets.randbits(64) if seed is None else seed & MASK64
+        bits = max(2, (n - 1).bit_length())
+        self._half = (bits + 1) // 2
+        self._mask = (1 << self._half) - 1
+        self.answers = bytearray()
+
+    def __len__(self):
+        return self.n
+
+    def _permute(self, x):
+        """0〜4^half-1 の中の並べ替え（ファイステル構造なので必ず1対1）"""
+        half, mask = self._half, self._mask
+        left, right = x >> half, x & mask
+        for r in range(ROUNDS):
+            left, right = right, left ^ (_mix(self.seed ^ (r << 56) ^ right) & mask)
+        return (left << half) | right
+
+    def __getitem__(self, k):
+        """k 問目（0始まり）に出す問題の番号。範囲の外に出たら、もう一度並べ替える（サイクルウォーク）"""
+        if not 0 <= k < self.n:
+            raise IndexError(k)
+        x = self._permute(k)
+        while x >= self.n:
+            x = self._permute(x)
+        return x
+
+    def choice_perm(self, k):
+        """k 問目の選択肢の並び（元の位置のタプル。perm[i] が i 番目に表示する元の選択肢）"""
+        return CHOICE_PERMS[_mix(self.seed ^ 0xC401CE ^ (k * 0x9E3779B97F4A7C15 & MASK64)) % 24]
+
+    def answer(self, k, choice):
+        """k 問目の回答を記録（並べ替えた後の位置。None ならスキップ）"""
+        if len(self.answers) <= k:
+            self.answers.extend(b"\xff" * (k + 1 - len(self.answers)))
+        self.answers[k] = UNANSWERED if choice is None else choice
+
+    def nbytes(self):
+        return sys.getsizeof(self) + sys.getsizeof(self.answers)
+
+
+def session_bytes_old(bank):
+    """以前のやり方（問題の辞書のリストをセッションごとに持つ）の1セッションぶんのバイト数"""
+    import tracemalloc
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = bank.to_items()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del items
+    return used
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        return float("nan")
+
+
+def bench(rows=500_000, sessions=200, asked=50):
+    import loader
+
+    bank = loader.load(loader.sample_csv(rows))
+    print(f"問題集 {len(bank):,}問（共有・{bank.nbytes / 1e6:.1f}MB）")
+    old = session_bytes_old(bank)
+    base = rss_mb()
+    start = time.perf_counter()
+    orders = []
+    for s in range(sessions):
+        o = QuizOrder(len(bank))
+        for k in range(asked):
+            item = bank[o[k]]
+            perm = o.choice_perm(k)
+            o.answer(k, perm.index(item["answer_idx"]))
+        orders.append(o)
+    per_q = (time.perf_counter() - start) / (sessions * asked)
+    per_session = sum(o.nbytes() for o in orders) / sessions
+    print(f"以前: 1セッションあたり {old / 1e6:,.1f}MB（{sessions}人なら {old * sessions / 1e9:,.1f}GB）")
+    print(f"今  : 1セッションあたり {per_session:,.0f}バイト（{asked}問回答後）、"
+          f"{sessions}人ぶんで RSS +{rss_mb() - base:.1f}MB")
+    print(f"1問を取り出す時間: {per_q * 1e6:.1f} µs")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Day06: セッションごとの出題順")
+    parser.add_argument("--bench", action="store_true", help="セッション数を増やしたときのメモリを測る")
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+    if args.bench:
+        bench(args.rows, args.sessions)
+        return
+    o = QuizOrder(20, args.seed)
+    print("出題順:", [o[k] for k in range(20)])
+    print("選択肢:", [o.choice_perm(k) for k in range(5)])
+
+
+if __name__ == "__main__":
+    main()
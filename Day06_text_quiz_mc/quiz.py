@@ -0,0 +1,113 @@
+# Day06: クイズの進行（画面に依存しない状態の管理）
+# 使い方例:
+#   python quiz.py                  # サンプル問題を端末で解く（Streamlit なしで同じ進行を確かめる）
+#   python quiz.py questions.csv    # 自分の問題集で
+#
+# 状態は「回答待ち」「回答済み」「終了」の3つだけで、変えられるのは choose（答える）・
+# next（次へ。回答待ちならスキップ）・restart（最初から）の3つの操作だけ。
+# app.py はこの状態を表示し、ボタンの on_click からこれらを呼ぶだけにした。
+# 状態を変えてから描くので、描き直しは st.rerun() を使わずに1回で済む。
+import sys
+
+from order import QuizOrder
+
+ANSWERING = "answering"  # 回答待ち
+ANSWERED = "answered"    # 回答済み（選択肢はロック）
+FINISHED = "finished"    # 全問終了
+
+
+class QuizSession:
+    """1人ぶんのクイズの進行。問題集（loader.QuestionSet）は共有のまま、並びは QuizOrder が持つ"""
+
+    def __init__(self, questions, seed=None):
+        self.restart(questions, seed)
+
+    def restart(self, questions=None, seed=None):
+        """最初から（questions を渡せば問題集を切り替える）。出題順は新しく作り直す"""
+        if questions is not None:
+            self.questions = questions
+        self.order = QuizOrder(len(self.questions), seed)
+        self.index = 0            # 何問目か（0始まり）
+        self.correct = 0          # 正解数
+        self.last_choice = None   # 直前に選んだ選択肢番号
+        self._current = None      # (index, 表示する1問) のキャッシュ
+
+    @property
+    def total(self):
+        return len(self.questions)
+
+    @property
+    def state(self):
+        if self.index >= self.total:
+            return FINISHED
+        return ANSWERING if self.last_choice is None else ANSWERED
+
+    @property
+    def locked(self):
+        return self.state == ANSWERED
+
+    @property
+    def finished(self):
+        return self.state == FINISHED
+
+    @property
+    def rate(self):
+        return self.correct / self.total * 100 if self.total else 0.0
+
+    def current(self):
+        """今の問題 {'number', 'q', 'choices', 'correct_idx'}（選択肢は並べ替え済み）"""
+        if self._current is None or self._current[0] != self.index:
+            item = self.questions[self.order[self.index]]
+            perm = self.order.choice_perm(self.index)
+            self._current = (self.index, {
+                "number": self.index + 1,
+                "q": item["q"],
+                "choices": [item["choices"][p] for p in perm],
+                "correct_idx": perm.index(item["answer_idx"]),
+            })
+        return self._current[1]
+
+    def choose(self, choice_idx):
+        """回答する。正解なら True。回答待ちでなければ何もせず None"""
+        if self.state != ANSWERING:
+            return None
+        self.last_choice = choice_idx
+        self.order.answer(self.index, choice_idx)
+        ok = choice_idx == self.current()["correct_idx"]
+        if ok:
+            self.correct += 1
+        return ok
+
+    def next(self):
+        """次の問題へ。回答待ちのままならスキップとして記録する"""
+        if self.state == FINISHED:
+            return
+        if self.state == ANSWERING:
+            self.order.answer(self.index, None)
+        self.index += 1
+        self.last_choice = None
+
+
+def main(argv=None):
+    import loader
+
+    argv = sys.argv[1:] if argv is None else argv
+    try:
+        quiz = QuizSession(loader.load(argv[0] if argv else "questions.csv"))
+    except (OSError, ValueError) as e:
+        sys.exit(str(e))
+    while not quiz.finished:
+        cur = quiz.current()
+        print(f"Q{cur['number']}/{quiz.total}. {cur['q']}")
+        for i, ch in enumerate(cur["choices"], 1):
+            print(f"  {i}. {ch}")
+        ans = input("番号（空でスキップ）> ").strip()
+        if ans in ("1", "2", "3", "4"):
+            ok = quiz.choose(int(ans) - 1)
+            print("正解！" if ok else f"不正解… 正解は {cur['choices'][cur['correct_idx']]}")
+        quiz.next()
+    print(f"結果: {quiz.correct} / {quiz.total}（正答率 {quiz.rate:.1f}%）")
+
+
+if __name__ == "__main__":
+    main()
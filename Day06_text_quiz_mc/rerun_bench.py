@@ -0,0 +1,146 @@
+# Day06: ボタン1回あたりの再実行コストを測る（ブラウザなし・Streamlit の AppTest で）
+# 使い方例:
+#   python rerun_bench.py                              # app.py で「全体を再実行」と「fragment だけ」を比べる
+#   python rerun_bench.py --before old_app.py --clicks 300   # 以前の app.py とも比べる
+#
+# AppTest はボタンを押すと毎回スクリプト全体を実行する。ブラウザでは @st.fragment の中のボタンなら
+# その fragment だけが再実行されるので、ここでは実行の依頼（RerunData）に fragment の ID を入れて同じ動きにする。
+# 1クリックごとに、スクリプトの実行時間（開始〜終了のイベントの間。st.rerun() の2回目も含む）・
+# その間のスクリプトのスレッドの CPU 時間・ブラウザへ送るメッセージのバイト数を記録する。
+# AppTest は実行のたびに ScriptCache を作り直して app.py をコンパイルし直すが、サーバーでは
+# コンパイルは1回だけなので、ここでは1つの ScriptCache を使い回してサーバーと同じ条件にする。
+# 「AppTest込み」はスレッドの起動や結果の解析も含めた時間で、参考の数字。
+import argparse
+import dataclasses
+import statistics
+import time
+
+from streamlit.runtime.scriptrunner import ScriptRunnerEvent
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.runtime.scriptrunner_utils.script_requests import ScriptRequests
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1 import app_test as _app_test
+from streamlit.testing.v1 import local_script_runner as _local_script_runner
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+STOPPED = {ScriptRunnerEvent.SCRIPT_STOPPED_WITH_SUCCESS, ScriptRunnerEvent.SCRIPT_STOPPED_FOR_RERUN,
+           ScriptRunnerEvent.SCRIPT_STOPPED_WITH_COMPILE_ERROR, ScriptRunnerEvent.FRAGMENT_STOPPED_WITH_SUCCESS}
+
+
+class FragmentRunner(LocalScriptRunner):
+    """fragment_ids が空でなければ、その fragment だけを再実行する ScriptRunner。実行時間も測る"""
+
+    fragment_ids = []  # 次の実行で再実行する fragment の ID
+    last = {}          # 直前の実行の {"sec", "cpu", "bytes"}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        FragmentRunner.last = {"sec": 0.0, "cpu": 0.0, "bytes": 0}
+        self._started = None
+        self.on_event.connect(self._time_script, weak=False)
+
+    def _time_script(self, sender, event, **kwargs):
+        # イベントはスクリプトのスレッドから送られるので、thread_time はスクリプトの CPU 時間になる
+        if event == ScriptRunnerEvent.SCRIPT_STARTED:
+            self._started = (time.perf_counter(), time.thread_time())
+        elif event in STOPPED and self._started is not None:
+            FragmentRunner.last["sec"] += time.perf_counter() - self._started[0]
+            FragmentRunner.last["cpu"] += time.thread_time() - self._started[1]
+            self._started = None
+
+    def request_rerun(self, rerun_data):
+        if FragmentRunner.fragment_ids:
+            # 起動時に入る「全体を再実行」の依頼と合わさると全体が走るので、依頼を空にしてから入れる
+            self._requests = ScriptRequests()
+            rerun_data = dataclasses.replace(rerun_data, fragment_id_queue=list(FragmentRunner.fragment_ids))
+        return super().request_rerun(rerun_data)
+
+    def forward_msgs(self):
+        msgs = super().forward_msgs()
+        FragmentRunner.last["bytes"] = sum(m.ByteSize() for m in msgs)
+        return msgs
+
+
+# このプロセスの AppTest だけが対象
+_script_cache = ScriptCache()
+_app_test.LocalScriptRunner = FragmentRunner
+_app_test.ScriptCache = _local_script_runner.ScriptCache = lambda: _script_cache
+
+
+def fragment_ids(at):
+    """今のアプリに登録されている fragment の ID（app.py はクイズ部分の1つだけ）"""
+    return list(at._fragment_storage._fragments)
+
+
+def click(at, widget, fragment=False, timeout=10):
+    """widget を押して再実行し、{"sec", "cpu", "bytes", "total"} を返す"""
+    widget.click()
+    return rerun(at, fragment, timeout)
+
+
+def rerun(at, fragment=False, timeout=10):
+    """再実行して（fragment なら fragment だけ）、{"sec", "cpu", "bytes", "total"} を返す"""
+    FragmentRunner.fragment_ids = fragment_ids(at) if fragment else []
+    start = time.perf_counter()
+    try:
+        at.run(timeout=timeout)
+    finally:
+        FragmentRunner.fragment_ids = []
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return dict(FragmentRunner.last, total=time.perf_counter() - start)
+
+
+def find_button(at, prefix):
+    for b in at.button:
+        if b.label.startswith(prefix) and not b.disabled:
+            return b
+    return None
+
+
+def play(app_path, clicks, fragment):
+    """答える→次へ を clicks 回。終わったら「もう一度」。種類ごとの記録を返す"""
+    at = AppTest.from_file(app_path, default_timeout=10).run()
+    records = {"回答": [], "次へ": [], "もう一度": []}
+    for n in range(clicks):
+        restart = find_button(at, "🔁")
+        if restart is not None:
+            records["もう一度"].append(click(at, restart, fragment))
+            continue
+        choice = [b for b in at.button if b.key and b.key.startswith("c")]
+        records["回答"].append(click(at, choice[n % len(choice)], fragment))
+        records["次へ"].append(click(at, find_button(at, "▶"), fragment))
+    return records
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def summarize(name, records):
+    for kind, rec in records.items():
+        if not rec:
+            continue
+        sec = [r["sec"] for r in rec]
+        print(f"  {name:<12} {kind:<5} 実行 中央値 {percentile(sec, 0.5) * 1e3:5.2f} ms"
+              f"  p90 {percentile(sec, 0.9) * 1e3:5.2f} ms"
+              f"  CPU {statistics.mean(r['cpu'] for r in rec) * 1e3:5.2f} ms"
+              f"  送信 {statistics.mean(r['bytes'] for r in rec) / 1e3:4.1f} KB"
+              f"  （AppTest込み {percentile([r['total'] for r in rec], 0.5) * 1e3:4.1f} ms、{len(rec)}回）")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Day06: クリック1回あたりの再実行コスト")
+    parser.add_argument("--app", default="app.py")
+    parser.add_argument("--before", help="比べる以前の app.py（全体を再実行するだけ）")
+    parser.add_argument("--clicks", type=int, default=200, help="答える→次へ を何回くり返すか")
+    args = parser.parse_args(argv)
+    if args.before:
+        summarize("以前", play(args.before, args.clicks, fragment=False))
+    summarize("全体を再実行", play(args.app, args.clicks, fragment=False))
+    summarize("fragment", play(args.app, args.clicks, fragment=True))
+
+
+if __name__ == "__main__":
+    main()